@@ -1,299 +1,554 @@
 # api/api_routes.py
-from flask import Blueprint, jsonify, request
-from core.db_connection import get_connection
+from flask import Blueprint, Response, jsonify, request
+from core.analytics import DEFAULT_WINDOW, TREND_THRESHOLD, classify_trend, product_analytics
+from core.db_connection import connection, pool_stats
 from core.category_mapping import extract_leaf_category
+from core.downsampling import lttb
+from core.market_value import find_market_values
+from core.price_rollups import ROLLUPS
+from core.refresh_scheduler import RefreshScheduler
+from core.response_cache import get_response_cache, product_scope, PRODUCTS_SCOPE
+from api.cache import cached
+from api.product_list import (
+    BOOL_VALUES, STREAM_FORMATS, build_list_query, build_page, parse_filters, product_select, row_to_dict,
+    stream_products
+)
 
 api_bp = Blueprint('api', __name__, url_prefix='/api')
 
+# Colonnes communes à la liste et au détail (voir api/product_list.py). Le dernier prix
+# vient de la projection product_latest_price (voir core/latest_price.py) au lieu de
+# deux sous-requêtes corrélées sur price_history par produit.
+PRODUCT_SELECT = product_select()
+
+def row_to_produit(row):
+    """
+    Convertit une ligne de PRODUCT_SELECT en dictionnaire JSON.
+    """
+    return row_to_dict(row)
+
 @api_bp.route('/produits', methods=['GET'])
+@cached(PRODUCTS_SCOPE)
 def get_produits():
-    conn = get_connection()
-    cursor = conn.cursor()
-    
-    # Récupérer le paramètre status dans la query string (valeurs possibles: active, ended)
-    status_filter = request.args.get('status', None)
-    where_clause = ""
-    params = []
-    if status_filter == 'active':
-        where_clause = "WHERE p.ended = 0"
-    elif status_filter == 'ended':
-        where_clause = "WHERE p.ended = 1"
-
-    query = f"""
-        SELECT p.product_id,
-               p.item_id,
-               p.title,
-               p.item_condition,
-               p.normalized_condition,
-               p.signed,
-               p.in_box,
-               p.url,
-               p.image_url,
-               p.seller_username,
-               p.ended,
-               p.category,
-               p.listing_type,
-               p.bids_count,
-               p.time_remaining,
-               c.name AS leaf_name,
-               (
-                 SELECT ph.price
-                 FROM price_history ph
-                 WHERE ph.product_id = p.product_id
-                 ORDER BY ph.date_scraped DESC
-                 LIMIT 1
-               ) AS last_price,
-               (
-                 SELECT DATE_FORMAT(MAX(ph.date_scraped), '%Y-%m-%d')
-                 FROM price_history ph
-                 WHERE ph.product_id = p.product_id
-               ) AS last_scraped_date,
-               p.buy_it_now_price
+    """
+    Liste des produits, filtrée et triée côté serveur :
+      GET /api/produits?status=active&listing_type=Auction&min_price=10&sort=price-asc
+                       &fields=product_id,title,price,image_url&limit=48
+    Avec limit ou cursor, renvoie une page {items, next_cursor, limit} ; next_cursor
+    se repasse tel quel (avec les mêmes filtres et tri) pour la page suivante.
+    Sans, renvoie le tableau complet (compatibilité avec les anciens clients).
+
+    ?stream=ndjson (un produit par ligne) ou ?stream=json (tableau) envoie toute la
+    liste filtrée en flux, sans la charger en mémoire (exports, gros catalogues).
+    """
+    stream = request.args.get("stream")
+    paginate = not stream and ("limit" in request.args or "cursor" in request.args)
+    try:
+        if stream and stream not in STREAM_FORMATS:
+            raise ValueError(f"Format de flux inconnu (valeurs possibles : {', '.join(STREAM_FORMATS)})")
+        query, params, fields, sort, limit = build_list_query(request.args, paginate)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    if stream:
+        # Réponse chunked, jamais mise en cache (voir api/cache.py)
+        response = Response(stream_products(query, params, fields, stream), mimetype=STREAM_FORMATS[stream])
+        response.headers["X-Accel-Buffering"] = "no"  # pas de mise en tampon par nginx
+        return response
+
+    with connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(query, params)
+        rows = cursor.fetchall()
+        cursor.close()
+
+    if paginate:
+        return jsonify(build_page(rows, fields, sort, limit))
+    return jsonify([row_to_dict(row, fields) for row in rows])
+
+@api_bp.route('/produits/summary', methods=['GET'])
+@cached(PRODUCTS_SCOPE)
+def get_produits_summary():
+    """
+    Statistiques de la liste filtrée (mêmes filtres que /produits) : nombre de
+    produits, prix moyen / min / max et nombre de produits en hausse / baisse.
+    Le frontend paginé ne voit qu'une partie des produits et ne peut plus les calculer.
+    """
+    try:
+        conditions, params, needs_price = parse_filters(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    where = ("WHERE " + " AND ".join(conditions)) if conditions else ""
+    join = "JOIN" if needs_price else "LEFT JOIN"
+    filtered = f"""
         FROM product p
-        LEFT JOIN category c ON p.category_id = c.category_id
-        {where_clause}
-    """
-    cursor.execute(query, params)
-    rows = cursor.fetchall()
-    cursor.close()
-    conn.close()
-
-    result = []
-    for row in rows:
-        product_id           = row[0]
-        item_id              = row[1]
-        title                = row[2]
-        item_condition       = row[3]
-        normalized_condition = row[4]
-        signed               = row[5]
-        in_box_val           = row[6]  # Valeur brute (0, 1, ou None)
-        url                  = row[7]
-        image_url            = row[8]
-        seller_username      = row[9]
-        ended                = row[10]
-        listing_type         = row[12]
-        bids_count           = row[13]
-        time_remaining       = row[14]
-        leaf_name            = row[15]
-        last_price           = row[16]
-        last_scraped_date    = row[17]
-        buy_it_now_price     = row[18]
-
-        # Conversion in_box : 0/1/None => bool ou None
-        if in_box_val is None:
-            in_box_bool = None
-        else:
-            in_box_bool = bool(in_box_val)
-
-        result.append({
-            "product_id": product_id,
-            "item_id": item_id,
-            "title": title,
-            "item_condition": item_condition,
-            "normalized_condition": normalized_condition,
-            "signed": bool(signed),
-            "in_box": in_box_bool,  # <-- On renvoie le booléen ou None
-            "url": url,
-            "image_url": image_url,
-            "seller_username": seller_username,
-            "ended": bool(ended),
-            "listing_type": listing_type,
-            "bids_count": bids_count,
-            "time_remaining": time_remaining,
-            "price": float(last_price) if last_price is not None else None,
-            "last_scraped_date": last_scraped_date,
-            "buy_it_now_price": float(buy_it_now_price) if buy_it_now_price is not None else None
-        })
-
-    return jsonify(result)
+        {join} product_latest_price lp ON lp.product_id = p.product_id
+        {where}
+    """
+
+    with connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(f"SELECT COUNT(*), AVG(lp.price), MIN(lp.price), MAX(lp.price) {filtered}", params)
+        count, avg_price, min_price, max_price = cursor.fetchone()
+
+        # Même règle que classify_trend : premier relevé (ouverture de la première semaine,
+        # voir core/price_rollups.py) contre dernier relevé (projection) ;
+        # sans historique, le produit est stable
+        cursor.execute(f"""
+            SELECT COALESCE(SUM(variation > %s), 0), COALESCE(SUM(variation < %s), 0)
+            FROM (
+                SELECT CASE WHEN first_week.open_at < lp.date_scraped AND first_week.open_price > 0
+                            THEN (lp.price - first_week.open_price) / first_week.open_price * 100
+                            ELSE 0 END AS variation
+                FROM (
+                    SELECT product_id, MIN(period_start) AS first_period
+                    FROM price_rollup_weekly
+                    WHERE product_id IN (SELECT p.product_id {filtered})
+                    GROUP BY product_id
+                ) first_periods
+                JOIN price_rollup_weekly first_week
+                  ON first_week.product_id = first_periods.product_id
+                 AND first_week.period_start = first_periods.first_period
+                JOIN product_latest_price lp ON lp.product_id = first_periods.product_id
+            ) variations
+        """, [TREND_THRESHOLD, -TREND_THRESHOLD] + params)
+        rising, falling = cursor.fetchone()
+        cursor.close()
+
+    return jsonify({
+        "count": count,
+        "avg_price": float(avg_price) if avg_price is not None else None,
+        "min_price": float(min_price) if min_price is not None else None,
+        "max_price": float(max_price) if max_price is not None else None,
+        "rising": int(rising),
+        "falling": int(falling),
+        "stable": count - int(rising) - int(falling),
+    })
 
 @api_bp.route('/produits/<int:product_id>', methods=['GET'])
+@cached(product_scope)
 def get_produit(product_id):
     """
     Retourne le détail d'un produit (un seul).
     On récupère également normalized_condition, signed, in_box, ended, etc.
     """
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute("""
-        SELECT p.product_id,
-               p.item_id,
-               p.title,
-               p.item_condition,
-               p.normalized_condition,
-               p.signed,
-               p.in_box,
-               p.url,
-               p.image_url,
-               p.seller_username,
-               p.ended,
-               p.category,
-               p.listing_type,
-               p.bids_count,
-               p.time_remaining,
-               c.name AS leaf_name,
-               (
-                 SELECT ph.price
-                 FROM price_history ph
-                 WHERE ph.product_id = p.product_id
-                 ORDER BY ph.date_scraped DESC
-                 LIMIT 1
-               ) AS last_price,
-               (
-                 SELECT DATE_FORMAT(MAX(ph.date_scraped), '%Y-%m-%d')
-                 FROM price_history ph
-                 WHERE ph.product_id = p.product_id
-               ) AS last_scraped_date,
-               p.buy_it_now_price
-        FROM product p
-        LEFT JOIN category c ON p.category_id = c.category_id
-        WHERE p.product_id = %s
-    """, (product_id,))
-    row = cursor.fetchone()
-    cursor.close()
-    conn.close()
+    with connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(f"""
+            {PRODUCT_SELECT}
+            WHERE p.product_id = %s
+        """, (product_id,))
+        row = cursor.fetchone()
+        cursor.close()
 
     if row:
-        product_id           = row[0]
-        item_id              = row[1]
-        title                = row[2]
-        item_condition       = row[3]
-        normalized_condition = row[4]
-        signed               = row[5]
-        in_box_val           = row[6]  # Valeur brute
-        url                  = row[7]
-        image_url            = row[8]
-        seller_username      = row[9]
-        ended                = row[10]
-        listing_type         = row[12]
-        bids_count           = row[13]
-        time_remaining       = row[14]
-        leaf_name            = row[15]
-        last_price           = row[16]
-        last_scraped_date    = row[17]
-        buy_it_now_price     = row[18]
-
-        # Conversion in_box : 0/1/None => bool ou None
-        if in_box_val is None:
-            in_box_bool = None
-        else:
-            in_box_bool = bool(in_box_val)
-
-        result = {
-            "product_id": product_id,
-            "item_id": item_id,
-            "title": title,
-            "item_condition": item_condition,
-            "normalized_condition": normalized_condition,
-            "signed": bool(signed),
-            "in_box": in_box_bool,
-            "url": url,
-            "image_url": image_url,
-            "seller_username": seller_username,
-            "ended": bool(ended),
-            "listing_type": listing_type,
-            "bids_count": bids_count,
-            "time_remaining": time_remaining,
-            "price": float(last_price) if last_price is not None else None,
-            "last_scraped_date": last_scraped_date,
-            "buy_it_now_price": float(buy_it_now_price) if buy_it_now_price is not None else None
-        }
-        return jsonify(result)
+        return jsonify(row_to_produit(row))
     else:
         return jsonify({"error": "Produit non trouvé"}), 404
 
+# Nombre maximal de produits par appel à /produits/trends et /produits/analytics
+MAX_TREND_IDS = 500
+
+def fetch_trends(cursor, product_ids, points=0):
+    """
+    Calcule la tendance de plusieurs produits en une seule requête ensembliste.
+    Seules les deux extrémités de l'historique sont lues : le premier relevé via
+    l'agrégat de la première semaine (price_rollup_weekly, voir core/price_rollups.py)
+    et le dernier via product_latest_price.
+    Si points > 0, ajoute une série "sparkline" d'au plus `points` moyennes couvrant
+    tout l'historique.
+    Retourne {product_id: {...}} ; les produits sans historique sont absents.
+    """
+    if not product_ids:
+        return {}
+    placeholders = ", ".join(["%s"] * len(product_ids))
+
+    cursor.execute(f"""
+        SELECT lp.product_id,
+               first_week.open_price AS first_price,
+               lp.price AS last_price,
+               first_week.open_at < lp.date_scraped AS has_history
+        FROM (
+            SELECT product_id, MIN(period_start) AS first_period
+            FROM price_rollup_weekly
+            WHERE product_id IN ({placeholders})
+            GROUP BY product_id
+        ) first_periods
+        JOIN price_rollup_weekly first_week
+          ON first_week.product_id = first_periods.product_id
+         AND first_week.period_start = first_periods.first_period
+        JOIN product_latest_price lp ON lp.product_id = first_periods.product_id
+    """, list(product_ids))
+
+    trends = {}
+    for product_id, first_price, last_price, has_history in cursor.fetchall():
+        if not has_history or first_price is None or last_price is None:
+            trends[product_id] = {"trend": "stable"}  # Pas assez de données, on assume stable
+            continue
+        trend, variation = classify_trend(first_price, last_price)
+        trends[product_id] = {
+            "trend": trend,
+            "variation": variation,
+            "first_price": float(first_price),
+            "last_price": float(last_price)
+        }
+
+    if points > 0:
+        for product_id, avg_price in fetch_sparklines(cursor, list(product_ids), points):
+            if product_id in trends:
+                trends[product_id].setdefault("sparkline", []).append(round(float(avg_price), 2))
+
+    return trends
+
+def fetch_sparklines(cursor, product_ids, points):
+    """
+    Découpe chaque historique en `points` tranches chronologiques et en garde la moyenne.
+    Les produits suivis depuis au moins `points` jours sont découpés sur leurs agrégats
+    journaliers (moyenne exacte des relevés de chaque tranche de jours) ; les autres,
+    trop courts pour cette résolution, sur leurs relevés bruts.
+    Retourne des lignes (product_id, moyenne) triées par produit puis tranche.
+    """
+    placeholders = ", ".join(["%s"] * len(product_ids))
+    cursor.execute(f"""
+        SELECT product_id, COUNT(*)
+        FROM price_rollup_daily
+        WHERE product_id IN ({placeholders})
+        GROUP BY product_id
+    """, product_ids)
+    day_counts = dict(cursor.fetchall())
+    rollup_ids = [pid for pid in product_ids if day_counts.get(pid, 0) >= points]
+    raw_ids = [pid for pid in product_ids if day_counts.get(pid, 0) < points]
+
+    rows = []
+    if rollup_ids:
+        cursor.execute(f"""
+            SELECT product_id, SUM(sum_price) / SUM(price_count)
+            FROM (
+                SELECT product_id, sum_price, price_count,
+                       NTILE(%s) OVER (PARTITION BY product_id ORDER BY period_start) AS bucket
+                FROM price_rollup_daily
+                WHERE product_id IN ({", ".join(["%s"] * len(rollup_ids))})
+            ) buckets
+            GROUP BY product_id, bucket
+            ORDER BY product_id, bucket
+        """, [points] + rollup_ids)
+        rows.extend(cursor.fetchall())
+    if raw_ids:
+        cursor.execute(f"""
+            SELECT product_id, AVG(price)
+            FROM (
+                SELECT product_id, price,
+                       NTILE(%s) OVER (PARTITION BY product_id ORDER BY date_scraped) AS bucket
+                FROM price_history
+                WHERE product_id IN ({", ".join(["%s"] * len(raw_ids))})
+            ) buckets
+            GROUP BY product_id, bucket
+            ORDER BY product_id, bucket
+        """, [points] + raw_ids)
+        rows.extend(cursor.fetchall())
+    return rows
+
 @api_bp.route('/produits/<int:product_id>/price-trend', methods=['GET'])
+@cached(product_scope)
 def get_price_trend(product_id):
     """
     Retourne la tendance de prix d'un produit en comparant le premier et dernier prix.
     """
-    conn = get_connection()
-    cursor = conn.cursor()
-    
-    # Récupérer tous les prix triés par date
-    cursor.execute("""
-        SELECT price 
-        FROM price_history 
-        WHERE product_id = %s 
-        ORDER BY date_scraped ASC
-    """, (product_id,))
-    
-    prices = cursor.fetchall()
-    cursor.close()
-    conn.close()
-
-    if len(prices) < 2:
-        return jsonify({"trend": "stable"})  # Pas assez de données, on assume stable
-
-    first_price = prices[0][0]
-    last_price = prices[-1][0]
-    
-    # Calculer le pourcentage de variation
-    if first_price > 0:
-        variation = ((last_price - first_price) / first_price) * 100
+    with connection() as conn:
+        cursor = conn.cursor()
+        trends = fetch_trends(cursor, [product_id])
+        cursor.close()
+
+    trend = trends.get(product_id, {"trend": "stable"})
+    return jsonify({key: trend[key] for key in ("trend", "variation") if key in trend})
+
+@api_bp.route('/produits/trends', methods=['GET', 'POST'])
+@cached(PRODUCTS_SCOPE)
+def get_price_trends():
+    """
+    Tendances (et séries sparkline optionnelles) pour une liste de produits,
+    pour remplacer les appels /price-trend et /historique-prix carte par carte.
+      GET  /api/produits/trends?ids=1,2,3&points=12
+      POST /api/produits/trends  {"ids": [1, 2, 3], "points": 12}
+    """
+    if request.method == 'POST':
+        payload = request.get_json(silent=True) or {}
+        raw_ids = payload.get("ids", [])
+        raw_points = payload.get("points", 0)
     else:
-        variation = 0
-    
-    # Utiliser un seuil de ±3% pour considérer une variation comme significative
-    if variation > 3:
-        trend = "up"
-    elif variation < -3:
-        trend = "down"
+        raw_ids = [i for i in request.args.get("ids", "").split(",") if i.strip()]
+        raw_points = request.args.get("points", 0)
+
+    try:
+        product_ids = list(dict.fromkeys(int(i) for i in raw_ids))
+        points = max(0, min(int(raw_points), 100))
+    except (TypeError, ValueError):
+        return jsonify({"error": "Paramètres ids/points invalides"}), 400
+    if len(product_ids) > MAX_TREND_IDS:
+        return jsonify({"error": f"{MAX_TREND_IDS} produits maximum par appel"}), 400
+
+    with connection() as conn:
+        cursor = conn.cursor()
+        trends = fetch_trends(cursor, product_ids, points)
+        cursor.close()
+
+    # Clés en chaîne pour le JSON ; les produits sans historique sont considérés stables
+    return jsonify({str(pid): trends.get(pid, {"trend": "stable"}) for pid in product_ids})
+
+@api_bp.route('/produits/analytics', methods=['GET', 'POST'])
+@cached(PRODUCTS_SCOPE)
+def get_produits_analytics():
+    """
+    Indicateurs de prix d'une liste de produits, calculés en une passe vectorisée
+    (voir core/analytics.py) : tendance, variation, min / max / moyenne,
+    moyenne glissante des `window` derniers relevés et volatilité.
+      GET  /api/produits/analytics?ids=1,2,3&window=7
+      POST /api/produits/analytics  {"ids": [1, 2, 3], "window": 7}
+    """
+    if request.method == 'POST':
+        payload = request.get_json(silent=True) or {}
+        raw_ids = payload.get("ids", [])
+        raw_window = payload.get("window", DEFAULT_WINDOW)
     else:
-        trend = "stable"
-        
-    return jsonify({
-        "trend": trend,
-        "variation": variation
-    })
+        raw_ids = [i for i in request.args.get("ids", "").split(",") if i.strip()]
+        raw_window = request.args.get("window", DEFAULT_WINDOW)
 
-@api_bp.route('/produits/<int:product_id>/historique-prix', methods=['GET'])
-def get_historique_prix(product_id):
-    conn = get_connection()
-    cursor = conn.cursor()
+    try:
+        product_ids = list(dict.fromkeys(int(i) for i in raw_ids))
+        window = max(1, min(int(raw_window), 365))
+    except (TypeError, ValueError):
+        return jsonify({"error": "Paramètres ids/window invalides"}), 400
+    if len(product_ids) > MAX_TREND_IDS:
+        return jsonify({"error": f"{MAX_TREND_IDS} produits maximum par appel"}), 400
+
+    with connection() as conn:
+        cursor = conn.cursor()
+        analytics = product_analytics(cursor, product_ids, window)
+        cursor.close()
+
+    # Les produits sans historique sont absents
+    return jsonify({str(pid): analytics[pid] for pid in product_ids if pid in analytics})
+
+# Nombre maximal de clusters renvoyés par /market-value
+MAX_MARKET_CLUSTERS = 200
+
+@api_bp.route('/market-value', methods=['GET'])
+@cached(PRODUCTS_SCOPE)
+def get_market_value():
+    """
+    Valeur de marché par cluster d'annonces (voir core/market_value.py) : médiane,
+    moyenne tronquée et quantiles du dernier prix de chaque annonce du cluster.
+      /api/market-value?keyword=doctor doom&figure=561&condition=Used&in_box=true&signed=false&limit=20
+    """
+    args = request.args
+    try:
+        flags = {
+            name: BOOL_VALUES[args[name].strip().lower()] if args.get(name) else None
+            for name in ("in_box", "signed")
+        }
+        limit = max(1, min(int(args.get("limit", 50)), MAX_MARKET_CLUSTERS))
+    except (KeyError, ValueError):
+        return jsonify({"error": "Paramètres in_box/signed (true/false) ou limit invalides"}), 400
+
+    with connection() as conn:
+        cursor = conn.cursor()
+        clusters = find_market_values(
+            cursor, keyword=args.get("keyword"), figure=args.get("figure"),
+            condition=args.get("condition"), limit=limit, **flags
+        )
+        cursor.close()
+    return jsonify(clusters)
+
+@api_bp.route('/produits/<int:product_id>/market-value', methods=['GET'])
+@cached(PRODUCTS_SCOPE)
+def get_produit_market_value(product_id):
+    """
+    Valeur de marché du cluster d'un produit et écart (%) de son dernier prix à la médiane.
+    """
+    with connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT cluster_id, price FROM product_market_price WHERE product_id = %s", (product_id,))
+        row = cursor.fetchone()
+        clusters = find_market_values(cursor, cluster_ids=[row[0]], limit=1) if row else []
+        cursor.close()
+
+    if not clusters:
+        return jsonify({"error": "Aucune valeur de marché pour ce produit"}), 404
+    cluster = clusters[0]
+    price = float(row[1])
+    cluster["price"] = price
+    # Pas d'écart sans médiane exploitable (cluster vide ou médiane arrondie à 0)
+    median = cluster["median"]
+    cluster["vs_median"] = round((price - median) / median * 100, 2) if median else None
+    return jsonify(cluster)
+
+# Points renvoyés par défaut / au plus en mode lttb
+DEFAULT_CHART_POINTS = 500
+MAX_CHART_POINTS = 5000
+# Modes de réduction : daily / weekly sont lus dans les agrégats (core/price_rollups.py)
+DOWNSAMPLE_MODES = ("daily", "weekly", "lttb")
+
+def fetch_price_stats(cursor, product_id):
+    """
+    Statistiques de tout l'historique, lues dans les agrégats hebdomadaires
+    (une ligne par semaine au lieu d'un relevé par passage) : nombre de relevés,
+    moyenne / min / max, premier et dernier prix. La moyenne des 7 derniers relevés
+    vient des relevés bruts (7 lignes via l'index (product_id, date_scraped)).
+    Retourne None si le produit n'a aucun relevé.
+    """
     cursor.execute("""
-        SELECT DATE_FORMAT(date_scraped, '%Y-%m-%d') as date_scraped, price
-        FROM price_history
+        SELECT SUM(price_count), SUM(sum_price) / SUM(price_count), MIN(min_price), MAX(max_price),
+               (SELECT open_price FROM price_rollup_weekly
+                WHERE product_id = %s
+                ORDER BY period_start ASC LIMIT 1) AS first_price,
+               (SELECT close_price FROM price_rollup_weekly
+                WHERE product_id = %s
+                ORDER BY period_start DESC LIMIT 1) AS last_price,
+               (SELECT AVG(price) FROM (
+                    SELECT price FROM price_history
+                    WHERE product_id = %s AND price IS NOT NULL
+                    ORDER BY date_scraped DESC LIMIT 7
+               ) last_points) AS seven_day_avg
+        FROM price_rollup_weekly
         WHERE product_id = %s
-        ORDER BY date_scraped ASC
-    """, (product_id,))
-    rows = cursor.fetchall()
-    cursor.close()
-    conn.close()
-
-    prices = [float(row[1]) for row in rows]
-    dates = [row[0] for row in rows]
-    if not prices:
-        return jsonify({"dates": [], "prices": [], "stats": {}, "trend": "N/A"})
-
-    # Statistiques avancées
-    avg_price = sum(prices) / len(prices)
-    min_price = min(prices)
-    max_price = max(prices)
-    
-    # Calculer la variation en pourcentage entre le premier et le dernier prix
-    variation = ((prices[-1] - prices[0]) / prices[0] * 100) if prices[0] != 0 else 0
-    
-    seven_day_avg = sum(prices[-7:]) / min(len(prices), 7) if prices else 0
-    
-    # Déterminer la tendance en fonction de la variation
-    if variation > 3:
-        trend = "up"
-    elif variation < -3:
-        trend = "down"
-    else:
-        trend = "stable"
+    """, (product_id, product_id, product_id, product_id))
+    count, avg_price, min_price, max_price, first_price, last_price, seven_day_avg = cursor.fetchone()
+    if not count:
+        return None
 
-    data = {
-        "dates": dates,
-        "prices": prices,
+    # Variation entre le premier et le dernier prix, et tendance correspondante
+    trend, variation = classify_trend(first_price, last_price)
+    return {
+        "count": int(count),
+        "trend": trend,
         "stats": {
-            "avg_price": avg_price,
-            "min_price": min_price,
-            "max_price": max_price,
+            "avg_price": float(avg_price),
+            "min_price": float(min_price),
+            "max_price": float(max_price),
             "variation": variation,
-            "seven_day_avg": seven_day_avg
-        },
-        "trend": trend
+            "seven_day_avg": float(seven_day_avg)
+        }
     }
-    return jsonify(data)
\ No newline at end of file
+
+def fetch_ohlc(cursor, product_id, resolution):
+    """
+    Un point par jour ou par semaine lu dans les agrégats : ouverture / plus haut /
+    plus bas / clôture, moyenne et nombre de relevés.
+    """
+    table = ROLLUPS[resolution][0]
+    cursor.execute(f"""
+        SELECT DATE_FORMAT(period_start, '%Y-%m-%d'), open_price, max_price, min_price,
+               close_price, sum_price / price_count, price_count
+        FROM {table}
+        WHERE product_id = %s
+        ORDER BY period_start
+    """, (product_id,))
+    return [
+        {
+            "date": day,
+            "open": float(open_price),
+            "high": float(high),
+            "low": float(low),
+            "close": float(close_price),
+            "avg": round(float(avg_price), 2),
+            "count": count
+        }
+        for day, open_price, high, low, close_price, avg_price, count in cursor.fetchall()
+    ]
+
+@api_bp.route('/produits/<int:product_id>/historique-prix', methods=['GET'])
+@cached(product_scope)
+def get_historique_prix(product_id):
+    """
+    Historique de prix d'un produit et statistiques de tout l'historique (calculées en SQL).
+    Par défaut, tous les relevés sont renvoyés. Pour un volume borné :
+      ?downsample=daily|weekly       un point par jour / semaine (clôture) + bougies "ohlc"
+      ?downsample=lttb&points=500    au plus `points` relevés choisis par LTTB
+    """
+    mode = request.args.get("downsample")
+    try:
+        points = int(request.args.get("points", DEFAULT_CHART_POINTS))
+    except ValueError:
+        return jsonify({"error": "Paramètre points invalide"}), 400
+    if mode is not None and mode not in DOWNSAMPLE_MODES:
+        return jsonify({"error": f"Mode inconnu (valeurs possibles : {', '.join(DOWNSAMPLE_MODES)})"}), 400
+    points = max(3, min(points, MAX_CHART_POINTS))
+
+    with connection() as conn:
+        cursor = conn.cursor()
+        summary = fetch_price_stats(cursor, product_id)
+        if summary is None:
+            cursor.close()
+            return jsonify({"dates": [], "prices": [], "stats": {}, "trend": "N/A"})
+
+        data = {"stats": summary["stats"], "trend": summary["trend"]}
+        if mode in ROLLUPS:
+            ohlc = fetch_ohlc(cursor, product_id, mode)
+            data.update({
+                "dates": [bucket["date"] for bucket in ohlc],
+                "prices": [bucket["close"] for bucket in ohlc],
+                "ohlc": ohlc
+            })
+        elif mode == "lttb":
+            cursor.execute("""
+                SELECT UNIX_TIMESTAMP(date_scraped), DATE_FORMAT(date_scraped, '%Y-%m-%d %H:%i'), price
+                FROM price_history
+                WHERE product_id = %s AND price IS NOT NULL
+                ORDER BY date_scraped ASC
+            """, (product_id,))
+            labels = {}
+            series = []
+            for timestamp, label, price in cursor.fetchall():
+                series.append((float(timestamp), float(price)))
+                labels[series[-1][0]] = label
+            sampled = lttb(series, points)
+            data.update({
+                "dates": [labels[timestamp] for timestamp, _price in sampled],
+                "prices": [price for _timestamp, price in sampled]
+            })
+        else:
+            cursor.execute("""
+                SELECT DATE_FORMAT(date_scraped, '%Y-%m-%d') as date_scraped, price
+                FROM price_history
+                WHERE product_id = %s AND price IS NOT NULL
+                ORDER BY date_scraped ASC
+            """, (product_id,))
+            rows = cursor.fetchall()
+            data.update({
+                "dates": [row[0] for row in rows],
+                "prices": [float(row[1]) for row in rows]
+            })
+        cursor.close()
+
+    if mode:
+        data["downsample"] = mode
+        data["points_total"] = summary["count"]
+    return jsonify(data)
+
+@api_bp.route('/stats/db-pool', methods=['GET'])
+def get_db_pool_stats():
+    """
+    Statistiques du pool de connexions MySQL du worker courant
+    (connexions ouvertes / utilisées, attentes, temps d'attente) pour le dimensionner.
+    """
+    return jsonify(pool_stats())
+
+@api_bp.route('/stats/refresh-scheduler', methods=['GET'])
+def get_refresh_scheduler_stats():
+    """
+    État de la file de refresh (produits en file / dus par motif) et fetchs
+    économisés par les passages planifiés par rapport à un balayage complet.
+    """
+    with connection() as conn:
+        cursor = conn.cursor()
+        stats = RefreshScheduler().stats(cursor)
+        cursor.close()
+    return jsonify(stats)
+
+@api_bp.route('/stats/cache', methods=['GET'])
+def get_cache_stats():
+    """
+    Statistiques du cache de réponses du worker courant : hits / misses / 304
+    et taux de hit par endpoint.
+    """
+    return jsonify(get_response_cache().stats())
@@ -0,0 +1,78 @@
+# api/cache.py
+"""
+Décorateur de cache des endpoints (voir core/response_cache.py).
+
+Les réponses 200 sont mises en cache avec un ETag ; une requête portant
+If-None-Match reçoit un 304 sans corps si la réponse n'a pas changé. Le header
+Cache-Control: no-cache fait revalider le navigateur à chaque appel, donc le
+frontend ne retélécharge que les listes réellement modifiées.
+"""
+
+import hashlib
+import logging
+from functools import wraps
+
+from flask import Response, request
+
+from core.response_cache import get_response_cache
+
+logger = logging.getLogger(__name__)
+
+
+def _request_args():
+    """Arguments de la requête, normalisés (ordre des paramètres sans effet)."""
+    args = "&".join(f"{key}={value}" for key, value in sorted(request.args.items(multi=True)))
+    if request.method == "POST":
+        body = request.get_data() or b""
+        args += "|" + hashlib.sha1(body).hexdigest()
+    return args
+
+
+def _conditional(response, name, cache):
+    response.headers["Cache-Control"] = "no-cache"
+    response = response.make_conditional(request)
+    if response.status_code == 304:
+        cache.count_not_modified(name)
+    return response
+
+
+def cached(*scopes):
+    """
+    Met en cache la réponse de l'endpoint. Chaque portée est une chaîne ou une fonction
+    des arguments de la route (ex. lambda product_id: f"product:{product_id}").
+    """
+    def decorator(view):
+        name = view.__name__
+
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            cache = get_response_cache()
+            if not cache.enabled:
+                return view(*args, **kwargs)
+            try:
+                cache.sync()
+                resolved = [scope(**kwargs) if callable(scope) else scope for scope in scopes]
+                key = cache.key(name, resolved, f"{kwargs}|{_request_args()}")
+                entry = cache.get(name, key)
+            except Exception as e:
+                # Cache indisponible (table absente, Redis arrêté...) : on sert sans cache
+                logger.warning(f"[cache] {name} servi sans cache : {e}")
+                return view(*args, **kwargs)
+
+            if entry is not None:
+                body, mimetype, etag = entry
+                response = Response(body, mimetype=mimetype)
+                response.set_etag(etag)
+                return _conditional(response, name, cache)
+
+            response = view(*args, **kwargs)
+            if (not isinstance(response, Response) or response.status_code != 200
+                    or response.is_streamed or response.direct_passthrough):
+                return response  # Les réponses en flux ne sont pas mises en cache
+            body = response.get_data()
+            etag = hashlib.sha1(body).hexdigest()
+            cache.set(key, (body, response.mimetype, etag))
+            response.set_etag(etag)
+            return _conditional(response, name, cache)
+        return wrapper
+    return decorator
@@ -0,0 +1,354 @@
+# api/product_list.py
+"""
+Construction des requêtes de GET /api/produits : projection de champs, filtres,
+tri et pagination par curseur (keyset).
+
+Une page reprend après la dernière ligne de la précédente
+(WHERE (clé de tri, product_id) > (valeurs du curseur)) au lieu d'un OFFSET :
+une page profonde coûte autant que la première (parcours d'index borné par LIMIT)
+et une insertion entre deux appels ne décale pas les pages suivantes.
+
+Le mode flux (stream_products) écrit la liste sans la matérialiser : les lignes sont
+lues par lots sur un curseur non bufferisé et sérialisées au fil de l'eau. Il sert
+à ?stream=ndjson|json et à l'export hors ligne (export_catalog.py).
+
+Les paramètres invalides lèvent ValueError avec un message destiné au client (400).
+"""
+
+import base64
+import binascii
+import json
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+
+import mysql.connector
+
+from core.db_connection import connection
+
+
+def _optional_bool(value):
+    return bool(value) if value is not None else None
+
+
+def _optional_float(value):
+    return float(value) if value is not None else None
+
+
+# Champs exposés : nom JSON -> (expression SQL, conversion éventuelle)
+PRODUCT_FIELDS = {
+    "product_id":           ("p.product_id", None),
+    "item_id":              ("p.item_id", None),
+    "title":                ("p.title", None),
+    "item_condition":       ("p.item_condition", None),
+    "normalized_condition": ("p.normalized_condition", None),
+    "signed":               ("p.signed", bool),
+    "in_box":               ("p.in_box", _optional_bool),  # 0/1/None => bool ou None
+    "url":                  ("p.url", None),
+    "image_url":            ("p.image_url", None),
+    "seller_username":      ("p.seller_username", None),
+    "ended":                ("p.ended", bool),
+    "listing_type":         ("p.listing_type", None),
+    "bids_count":           ("p.bids_count", None),
+    "time_remaining":       ("p.time_remaining", None),
+    "price":                ("lp.price", _optional_float),
+    "last_scraped_date":    ("DATE_FORMAT(lp.date_scraped, '%Y-%m-%d')", None),
+    "buy_it_now_price":     ("p.buy_it_now_price", _optional_float),
+}
+ALL_FIELDS = tuple(PRODUCT_FIELDS)
+
+# Tris proposés par le frontend : nom -> (colonne, décroissant). product_id départage
+# toujours les égalités, dans le même sens que la colonne (un seul parcours d'index).
+# NULL est la plus petite valeur pour MySQL : en tête en ASC, en fin en DESC.
+SORTS = {
+    "default":    (None, False),
+    "price-asc":  ("lp.price", False),
+    "price-desc": ("lp.price", True),
+    "date-desc":  ("lp.date_scraped", True),
+    "date-asc":   ("lp.date_scraped", False),
+}
+
+DEFAULT_PAGE_SIZE = 48
+MAX_PAGE_SIZE = 200
+
+# Formats du mode flux : nom -> type MIME
+STREAM_FORMATS = {
+    "ndjson": "application/x-ndjson",  # un produit JSON par ligne
+    "json": "application/json",        # tableau JSON généré au fil de l'eau
+}
+# Lignes lues par fetchmany (et écrites par morceau de réponse)
+STREAM_BATCH_SIZE = 1000
+
+BOOL_VALUES = {"1": True, "true": True, "yes": True, "0": False, "false": False, "no": False}
+
+
+def product_select(fields=ALL_FIELDS, extra=(), join="LEFT JOIN"):
+    """
+    SELECT des champs demandés (+ expressions `extra` en fin de ligne).
+    Avec join="JOIN", seuls les produits ayant un relevé de prix sont lus, ce qui
+    permet à MySQL de parcourir product_latest_price dans l'ordre de son index.
+    """
+    columns = ",\n           ".join([PRODUCT_FIELDS[name][0] for name in fields] + list(extra))
+    return f"""
+    SELECT {columns}
+    FROM product p
+    {join} product_latest_price lp ON lp.product_id = p.product_id
+"""
+
+
+def row_to_dict(row, fields=ALL_FIELDS):
+    """Convertit les premières colonnes d'une ligne de product_select en dictionnaire JSON."""
+    produit = {}
+    # zip s'arrête aux champs : les colonnes `extra` éventuelles sont ignorées
+    for name, value in zip(fields, row):
+        convert = PRODUCT_FIELDS[name][1]
+        produit[name] = convert(value) if convert else value
+    return produit
+
+
+def parse_fields(raw):
+    """fields=title,price,... -> tuple de champs (tous si absent)."""
+    if not raw:
+        return ALL_FIELDS
+    fields = tuple(dict.fromkeys(name.strip() for name in raw.split(",") if name.strip()))
+    unknown = [name for name in fields if name not in PRODUCT_FIELDS]
+    if unknown:
+        raise ValueError(f"Champs inconnus : {', '.join(unknown)}")
+    return fields
+
+
+def _parse_bool(name, raw):
+    try:
+        return BOOL_VALUES[raw.strip().lower()]
+    except KeyError:
+        raise ValueError(f"Paramètre {name} invalide (true/false attendu)")
+
+
+def _parse_list(raw):
+    return [value.strip() for value in raw.split(",") if value.strip()]
+
+
+def _parse_number(name, raw, kind=float):
+    try:
+        value = kind(raw)
+    except (TypeError, ValueError, InvalidOperation):
+        raise ValueError(f"Paramètre {name} invalide")
+    if isinstance(value, Decimal) and not value.is_finite():
+        raise ValueError(f"Paramètre {name} invalide")
+    return value
+
+
+def parse_filters(args):
+    """
+    Filtres de la query string -> (conditions SQL, paramètres, prix requis).
+      status=active|ended, normalized_condition=New,Used, listing_type=Auction,...,
+      signed=true, in_box=false, category=<category_id>[,...], min_price, max_price,
+      q=<texte> (titre ou vendeur).
+    `prix requis` indique qu'un filtre porte sur le dernier prix (jointure interne possible).
+    """
+    conditions = []
+    params = []
+    needs_price = False
+
+    status = args.get("status")
+    if status == "active":
+        conditions.append("p.ended = 0")
+    elif status == "ended":
+        conditions.append("p.ended = 1")
+    elif status not in (None, "", "all"):
+        raise ValueError("Paramètre status invalide (active, ended ou all)")
+
+    for name in ("normalized_condition", "listing_type"):
+        values = _parse_list(args.get(name, ""))
+        if values:
+            conditions.append(f"p.{name} IN ({', '.join(['%s'] * len(values))})")
+            params.extend(values)
+
+    for name in ("signed", "in_box"):
+        if args.get(name):
+            conditions.append(f"p.{name} = %s")
+            params.append(int(_parse_bool(name, args[name])))
+
+    categories = [_parse_number("category", value, int) for value in _parse_list(args.get("category", ""))]
+    if categories:
+        conditions.append(f"p.category_id IN ({', '.join(['%s'] * len(categories))})")
+        params.extend(categories)
+
+    for name, operator in (("min_price", ">="), ("max_price", "<=")):
+        if args.get(name):
+            conditions.append(f"lp.price {operator} %s")
+            params.append(_parse_number(name, args[name], Decimal))
+            needs_price = True
+
+    term = (args.get("q") or "").strip()
+    if term:
+        pattern = "%" + term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+        conditions.append("(p.title LIKE %s OR p.seller_username LIKE %s)")
+        params.extend([pattern, pattern])
+
+    return conditions, params, needs_price
+
+
+def parse_sort(raw):
+    sort = raw or "default"
+    if sort not in SORTS:
+        raise ValueError(f"Tri inconnu (valeurs possibles : {', '.join(SORTS)})")
+    return sort
+
+
+def parse_limit(raw):
+    limit = _parse_number("limit", raw, int) if raw else DEFAULT_PAGE_SIZE
+    return max(1, min(limit, MAX_PAGE_SIZE))
+
+
+# --- Curseur ---
+
+def encode_cursor(sort, value, product_id):
+    """Curseur opaque : tri, valeur de la clé de tri et product_id de la dernière ligne."""
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    elif isinstance(value, Decimal):
+        value = str(value)
+    payload = json.dumps([sort, value, product_id], separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(payload).decode("ascii").rstrip("=")
+
+
+def decode_cursor(sort, cursor):
+    """-> (valeur de la clé de tri, product_id). Le curseur doit venir du même tri."""
+    try:
+        payload = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        cursor_sort, value, product_id = json.loads(payload)
+        product_id = int(product_id)
+        column = SORTS[sort][0]
+        if value is not None:
+            if column == "lp.price":
+                value = Decimal(value)
+            elif column == "lp.date_scraped":
+                value = datetime.fromisoformat(value)
+    except (binascii.Error, ValueError, TypeError, InvalidOperation):
+        raise ValueError("Curseur invalide")
+    if cursor_sort != sort:
+        raise ValueError("Curseur obtenu avec un autre tri")
+    return value, product_id
+
+
+def keyset_condition(sort, value, product_id):
+    """Condition « après le curseur » pour le tri donné -> (SQL, paramètres)."""
+    column, descending = SORTS[sort]
+    op = "<" if descending else ">"
+    if column is None:
+        return f"p.product_id {op} %s", [product_id]
+    if value is None:
+        if descending:
+            # Les NULL sont en fin de parcours : il ne reste que leurs product_id suivants
+            return f"({column} IS NULL AND p.product_id < %s)", [product_id]
+        return f"(({column} IS NULL AND p.product_id > %s) OR {column} IS NOT NULL)", [product_id]
+    condition = f"{column} {op} %s OR ({column} = %s AND p.product_id {op} %s)"
+    if descending:
+        condition += f" OR {column} IS NULL"
+    return f"({condition})", [value, value, product_id]
+
+
+def order_by(sort):
+    column, descending = SORTS[sort]
+    direction = "DESC" if descending else "ASC"
+    if column is None:
+        return f"ORDER BY p.product_id {direction}"
+    return f"ORDER BY {column} {direction}, p.product_id {direction}"
+
+
+def build_list_query(args, paginate):
+    """
+    Requête de liste à partir de la query string.
+    Retourne (sql, params, fields, sort, limit) ; limit vaut None sans pagination.
+    Les deux dernières colonnes de chaque ligne sont la clé de tri et product_id
+    (pour construire le curseur), en plus des champs demandés.
+    """
+    fields = parse_fields(args.get("fields"))
+    sort = parse_sort(args.get("sort"))
+    conditions, params, needs_price = parse_filters(args)
+    column = SORTS[sort][0]
+
+    limit = None
+    if paginate:
+        limit = parse_limit(args.get("limit"))
+        if args.get("cursor"):
+            condition, cursor_params = keyset_condition(sort, *decode_cursor(sort, args["cursor"]))
+            conditions.append(condition)
+            params.extend(cursor_params)
+
+    # Tri ou filtre sur le dernier prix : jointure interne, MySQL peut alors partir
+    # de l'index de product_latest_price (tout produit scrapé y a une ligne)
+    join = "JOIN" if needs_price or column else "LEFT JOIN"
+    sql = product_select(fields, extra=(column or "NULL", "p.product_id"), join=join)
+    if conditions:
+        sql += "    WHERE " + "\n      AND ".join(conditions) + "\n"
+    sql += "    " + order_by(sort) + "\n"
+    if limit is not None:
+        sql += "    LIMIT %s\n"
+        params.append(limit + 1)  # Une ligne de plus pour savoir s'il reste une page
+    return sql, params, fields, sort, limit
+
+
+def build_page(rows, fields, sort, limit):
+    """Page JSON {items, next_cursor} à partir des lignes de build_list_query."""
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    next_cursor = None
+    if has_more:
+        *_, value, product_id = rows[-1]
+        next_cursor = encode_cursor(sort, value, product_id)
+    return {
+        "items": [row_to_dict(row, fields) for row in rows],
+        "next_cursor": next_cursor,
+        "limit": limit,
+    }
+
+
+# --- Flux ---
+
+def iter_row_batches(conn, sql, params, batch_size=STREAM_BATCH_SIZE):
+    """
+    Lots de lignes lus avec fetchmany sur un curseur non bufferisé : le serveur
+    MySQL envoie le résultat au fur et à mesure de la lecture, au lieu de le
+    copier en entier côté client comme fetchall().
+    """
+    cursor = conn.cursor(buffered=False)
+    try:
+        cursor.execute(sql, params)
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            yield rows
+    finally:
+        try:
+            cursor.close()
+        except mysql.connector.Error:
+            # Flux interrompu (client déconnecté) : on vide le reste du résultat
+            # pour rendre au pool une connexion réutilisable
+            conn.consume_results()
+            cursor.close()
+
+
+def encode_batch(rows, fields):
+    """Produits d'un lot sérialisés en JSON (une chaîne par produit)."""
+    return [json.dumps(row_to_dict(row, fields), separators=(",", ":")) for row in rows]
+
+
+def stream_products(sql, params, fields, fmt="ndjson", batch_size=STREAM_BATCH_SIZE):
+    """
+    Générateur de morceaux de texte (un par lot) pour la requête de build_list_query.
+    Emprunte une connexion au pool pour toute la durée du flux.
+    """
+    with connection() as conn:
+        if fmt == "ndjson":
+            for rows in iter_row_batches(conn, sql, params, batch_size):
+                yield "\n".join(encode_batch(rows, fields)) + "\n"
+            return
+
+        yield "["
+        separator = ""
+        for rows in iter_row_batches(conn, sql, params, batch_size):
+            yield separator + ",".join(encode_batch(rows, fields))
+            separator = ","
+        yield "]"
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Benchmark des indicateurs de prix sur tout le catalogue : boucle Python produit
+par produit (classify_trend + moyenne glissante, volatilité, min / max à la main,
+comme le faisaient les endpoints un produit à la fois) contre la passe vectorisée
+de core/analytics.py.
+
+Par défaut l'historique est synthétique et généré en mémoire (1M relevés) ;
+avec --db, il est aussi chargé depuis la base de benchmark (BENCH_DB_NAME, remplie
+par bench_product_list) pour mesurer le coût du chargement en colonnes.
+
+    python -m benchmarks.bench_analytics --rows 1000000 --products 20000
+    python -m benchmarks.bench_analytics --db
+"""
+
+import argparse
+import statistics
+import time
+
+import numpy as np
+
+from core.analytics import DEFAULT_WINDOW, PriceHistory, classify_trend, compute_analytics
+
+
+def synthetic_history(rows, products, seed=42):
+    """Marches aléatoires de prix, un nombre de relevés variable par produit."""
+    rng = np.random.default_rng(seed)
+    product_ids = np.sort(rng.integers(1, products + 1, size=rows))
+    timestamps = np.arange(rows, dtype=np.float64) * 3600
+    steps = rng.normal(0, 0.02, size=rows)
+    prices = np.round(np.exp(np.log(rng.uniform(5, 500, size=products + 1))[product_ids] + steps), 2)
+    return PriceHistory(product_ids, timestamps, prices)
+
+
+def per_product_loop(history, window):
+    """Implémentation de référence : une boucle Python par produit."""
+    by_product = {}
+    for product_id, price in zip(history.product_ids.tolist(), history.prices.tolist()):
+        by_product.setdefault(product_id, []).append(price)
+
+    results = {}
+    for product_id, prices in by_product.items():
+        if len(prices) > 1:
+            trend, variation = classify_trend(prices[0], prices[-1])
+        else:
+            trend, variation = "stable", 0
+        last = prices[-window:]
+        returns = [prices[i] / prices[i - 1] - 1 for i in range(1, len(prices)) if prices[i - 1] > 0]
+        results[product_id] = {
+            "trend": trend,
+            "variation": variation,
+            "min_price": min(prices),
+            "max_price": max(prices),
+            "avg_price": sum(prices) / len(prices),
+            "rolling_avg": sum(last) / len(last),
+            "volatility": statistics.pstdev(returns) * 100 if len(returns) > 1 else 0,
+        }
+    return results
+
+
+def best_of(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1000000, help="Relevés synthétiques")
+    parser.add_argument("--products", type=int, default=20000, help="Produits synthétiques")
+    parser.add_argument("--window", type=int, default=DEFAULT_WINDOW)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--db", action="store_true", help="Charge aussi l'historique de la base de benchmark")
+    args = parser.parse_args()
+
+    history = synthetic_history(args.rows, args.products)
+    print(f"{len(history):,} relevés, {len(history.products):,} produits")
+
+    loop_time, reference = best_of(lambda: per_product_loop(history, args.window), args.repeat)
+    vector_time, analytics = best_of(lambda: compute_analytics(history, args.window), args.repeat)
+
+    # Les deux implémentations doivent s'accorder
+    for i in (0, len(analytics["product_id"]) // 2, len(analytics["product_id"]) - 1):
+        expected = reference[int(analytics["product_id"][i])]
+        assert expected["trend"] == analytics["trend"][i]
+        assert abs(expected["volatility"] - analytics["volatility"][i]) < 1e-6
+
+    print(f"{'boucle par produit':<22} {loop_time * 1000:>10,.0f} ms")
+    print(f"{'passe vectorisée':<22} {vector_time * 1000:>10,.0f} ms  (x{loop_time / vector_time:,.0f})")
+
+    if args.db:
+        from benchmarks.bench_product_list import bench_connection
+        from core.analytics import load_price_history
+        conn = bench_connection()
+        cursor = conn.cursor()
+        start = time.perf_counter()
+        loaded = load_price_history(cursor)
+        load_time = time.perf_counter() - start
+        cursor.close()
+        conn.close()
+        compute_time, _ = best_of(lambda: compute_analytics(loaded, args.window), args.repeat)
+        print(f"\nbase de benchmark : {len(loaded):,} relevés, {len(loaded.products):,} produits")
+        print(f"{'chargement colonnes':<22} {load_time * 1000:>10,.0f} ms")
+        print(f"{'passe vectorisée':<22} {compute_time * 1000:>10,.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
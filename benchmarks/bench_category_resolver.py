@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Benchmark de map_category : implémentation historique (recherche exacte puis
+difflib sur toute la table à chaque item) contre CategoryResolver (index en mémoire).
+
+Fonctionne hors ligne sur une taxonomie synthétique réaliste (~20k catégories).
+Les allers-retours MySQL de l'implémentation historique (deux connexions et le
+transfert de toute la table par item) ne sont pas simulés : ses chiffres sont
+donc optimistes.
+
+    python -m benchmarks.bench_category_resolver --categories 20000 --items 5000
+"""
+
+import argparse
+import difflib
+import random
+import time
+
+from core.category_resolver import CategoryResolver
+
+PREFIXES = [
+    "", "Vintage", "Modern", "Antique", "Contemporary", "Other", "Original", "Reproduction",
+    "Handmade", "Mixed", "Limited Edition", "Promotional", "Commercial", "Used", "Designer",
+    "Mini", "Classic", "Custom", "Licensed", "Collectible",
+]
+NOUNS = [
+    "Action Figures", "Bobbleheads", "Trading Cards", "Video Games", "Consoles", "Comics",
+    "Coins", "Stamps", "Postcards", "Dolls", "Model Trains", "Diecast Cars", "Figurines",
+    "Plush Toys", "Board Games", "Puzzles", "Posters", "Watches", "Cameras", "Lenses",
+    "Guitars", "Amplifiers", "Records", "Cassettes", "Books", "Magazines", "Pins", "Patches",
+    "Knives", "Lamps", "Clocks", "Radios", "Tools", "Bottles", "Glassware", "Pottery",
+    "Jewelry", "Handbags", "Sneakers", "Jerseys", "Helmets", "Autographs", "Banners",
+    "Keychains", "Lunch Boxes", "Ornaments", "Cookware", "Textiles", "Quilts", "Rugs",
+]
+SUFFIXES = [
+    "", "& Accessories", "Parts", "(Pre-1970)", "(1970-Now)", "Sets", "Lots",
+    "Replacement Parts", "Manuals & Guides", "Cases & Boxes", "Displays", "Supplies",
+    "for Sale", "Memorabilia", "Other", "Kits", "Bundles", "Storage", "Prototypes", "Samples",
+]
+BRANDS = ["Funko", "Hasbro", "Mattel", "Sega", "Nintendo", "Sony", "Marvel", "DC", "Lego", "Disney"]
+
+
+def synthetic_taxonomy(count, rng):
+    names = set()
+    while len(names) < count:
+        parts = [rng.choice(PREFIXES), rng.choice(NOUNS), rng.choice(SUFFIXES)]
+        if rng.random() < 0.3:
+            parts.insert(0, rng.choice(BRANDS))
+        name = " ".join(part for part in parts if part)
+        names.add(name)
+    return [(category_id, name) for category_id, name in enumerate(sorted(names), start=1)]
+
+
+def perturb(name, rng):
+    """Faute de frappe : suppression, doublement ou inversion d'un caractère."""
+    chars = list(name)
+    pos = rng.randrange(len(chars))
+    choice = rng.random()
+    if choice < 0.33:
+        del chars[pos]
+    elif choice < 0.66:
+        chars.insert(pos, chars[pos])
+    elif pos + 1 < len(chars):
+        chars[pos], chars[pos + 1] = chars[pos + 1], chars[pos]
+    return "".join(chars)
+
+
+def synthetic_items(taxonomy, count, rng, distinct=600):
+    """
+    Chaînes de catégorie feuille telles qu'elles sortent du spider : un nombre limité
+    de catégories distinctes (popularité de type Zipf), surtout exactes, parfois
+    avec une faute ou la casse changée, parfois inconnues.
+    """
+    pool = []
+    for _ in range(distinct):
+        name = rng.choice(taxonomy)[1]
+        roll = rng.random()
+        if roll < 0.6:
+            pool.append(name)
+        elif roll < 0.75:
+            pool.append(name.upper() if rng.random() < 0.5 else name.lower())
+        elif roll < 0.9:
+            pool.append(perturb(name, rng))
+        else:
+            pool.append(f"{rng.choice(BRANDS)} {rng.choice(NOUNS)} Unknown Variant {rng.randint(1, 999)}")
+    weights = [1.0 / (rank + 1) for rank in range(len(pool))]
+    return rng.choices(pool, weights=weights, k=count)
+
+
+def legacy_map(rows, leaf):
+    """Coût CPU de l'implémentation historique, hors base de données."""
+    # get_category_id_by_exact_name : LOWER(name) = LOWER(%s) sans index, donc parcours complet
+    target = leaf.lower()
+    for category_id, name in rows:
+        if name.lower() == target:
+            return category_id
+    # get_category_id_by_similarity
+    candidates = {name.lower(): cat_id for cat_id, name in rows}
+    best = difflib.get_close_matches(target, candidates.keys(), n=1, cutoff=0.8)
+    return candidates[best[0]] if best else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--categories", type=int, default=20000)
+    parser.add_argument("--items", type=int, default=5000)
+    parser.add_argument("--legacy-items", type=int, default=200,
+                        help="Nombre d'items passés à l'implémentation historique (lente)")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    taxonomy = synthetic_taxonomy(args.categories, rng)
+    items = synthetic_items(taxonomy, args.items, rng)
+
+    resolver = CategoryResolver(loader=lambda: taxonomy)
+    start = time.perf_counter()
+    resolver.resolve(items[0])  # Chargement + construction de l'index
+    build_elapsed = time.perf_counter() - start
+
+    start = time.perf_counter()
+    resolved = [resolver.resolve(leaf) for leaf in items]
+    resolver_elapsed = time.perf_counter() - start
+
+    legacy_sample = items[:args.legacy_items]
+    start = time.perf_counter()
+    legacy = [legacy_map(taxonomy, leaf) for leaf in legacy_sample]
+    legacy_elapsed = time.perf_counter() - start
+
+    agreement = sum(1 for a, b in zip(legacy, resolved) if a == b) / len(legacy_sample)
+    legacy_rate = len(legacy_sample) / legacy_elapsed
+    resolver_rate = len(items) / resolver_elapsed
+
+    print(f"Taxonomy          : {len(taxonomy)} categories")
+    print(f"Index build       : {build_elapsed * 1000:.1f} ms")
+    print(f"Legacy            : {legacy_rate:,.1f} items/s ({len(legacy_sample)} items)")
+    print(f"CategoryResolver  : {resolver_rate:,.1f} items/s ({len(items)} items)")
+    print(f"Speedup           : {resolver_rate / legacy_rate:,.0f}x")
+    print(f"Agreement         : {agreement * 100:.1f}% identical results on the legacy sample")
+    print(f"Resolver cache    : {resolver.stats()}")
+
+
+if __name__ == "__main__":
+    main()
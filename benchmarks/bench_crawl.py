@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+"""
+Benchmark de bout en bout du crawl : EbaySpider -> middlewares -> pipeline -> MySQL,
+contre le faux serveur eBay local (benchmarks/mock_ebay.py : enchères, achat immédiat,
+annonces terminées, multi-variations, lots), avec une latence et un taux de CAPTCHA
+réglables.
+
+Le spider tourne avec les réglages du projet (middlewares, préfiltre, détection de
+CAPTCHA...), sauf les proxies, le cache HTTP et l'export FEEDS. Les délais de politesse
+(DOWNLOAD_DELAY, AutoThrottle, délai aléatoire) sont coupés sauf avec --politeness real.
+Le spider écrit des lignes de log (reporter "production") ; --reporter demo rétablit
+l'affichage en boîtes.
+
+Rapport : items/s, latence par item (de la mise en file de sa requête de détail à
+l'item produit, p50/p99), temps CPU et mémoire max du processus de crawl et, avec --db,
+lignes écrites par seconde dans la base de benchmark (BENCH_DB_NAME, vidée avant le run),
+et les étapes les plus coûteuses relevées par l'instrumentation du crawl (core/metrics.py).
+Chaque run est ajouté à benchmarks/results/bench_crawl.jsonl (commit, paramètres, mesures) ;
+--compare affiche les derniers runs.
+
+    python -m benchmarks.bench_crawl --pages 5 --latency 0.05 --captcha-rate 0.02
+    python -m benchmarks.bench_crawl --db --pipeline batch --concurrency 16 --label batch-16
+    python -m benchmarks.bench_crawl --compare 10
+"""
+
+import argparse
+import datetime
+import json
+import os
+import resource
+import subprocess
+import sys
+import threading
+import time
+
+from benchmarks.mock_ebay import make_server
+
+RESULTS_FILE = os.path.join(os.path.dirname(__file__), "results", "bench_crawl.jsonl")
+
+# Tables dont les lignes comptent comme écritures en base
+WRITTEN_TABLES = ("product", "price_history")
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def crawl_settings(args):
+    """Réglages du projet, surchargés en priorité "cmdline" (devant les custom_settings du spider)."""
+    from scrapy.utils.project import get_project_settings
+    from crawl_watchlist import PIPELINES
+
+    settings = get_project_settings()
+    middlewares = settings.getdict("DOWNLOADER_MIDDLEWARES")
+    middlewares["core.middlewares.ProxyMiddleware"] = None  # Pas de proxies vers le serveur local
+    overrides = {
+        "DOWNLOADER_MIDDLEWARES": middlewares,
+        "HTTP_CACHE_ENABLED": False,
+        "REPLAY_RECORD_DIR": None,
+        "FEEDS": {},
+        "PREFILTER_RECENT_HOURS": 0,
+        "ITEM_PIPELINES": {PIPELINES[args.pipeline]: 300} if PIPELINES[args.pipeline] else {},
+        "CAPTCHA_BACKOFF_BASE": args.captcha_backoff,
+        "REPORTER": args.reporter,
+    }
+    if args.concurrency:
+        overrides["CONCURRENT_REQUESTS"] = args.concurrency
+        overrides["CONCURRENT_REQUESTS_PER_DOMAIN"] = args.concurrency
+    if args.politeness == "off":
+        overrides.update({
+            "DOWNLOAD_DELAY": 0,
+            "RANDOMIZE_DOWNLOAD_DELAY": False,
+            "AUTOTHROTTLE_ENABLED": False,
+            "RANDOM_DELAY_MIN": 0,
+            "RANDOM_DELAY_MAX": 0,
+        })
+    settings.setdict(overrides, priority="cmdline")
+    return settings
+
+
+def run_crawl(args):
+    """Sous-processus : un crawl complet, mesuré ; retourne le résultat (dict)."""
+    from scrapy import signals
+    from scrapy.crawler import CrawlerProcess
+    from scrapers.spiders.ebay_spider import EbaySpider
+    from core.metrics import REGISTRY
+
+    process = CrawlerProcess(crawl_settings(args))
+    crawler = process.create_crawler(EbaySpider)
+
+    latencies = []
+
+    def request_scheduled(request, spider):
+        # Une requête replanifiée (CAPTCHA, retry) garde sa première mise en file
+        request.meta.setdefault("bench_scheduled", time.perf_counter())
+
+    def item_scraped(item, response, spider):
+        scheduled = response.meta.get("bench_scheduled")
+        if scheduled is not None:
+            latencies.append(time.perf_counter() - scheduled)
+
+    crawler.signals.connect(request_scheduled, signal=signals.request_scheduled)
+    crawler.signals.connect(item_scraped, signal=signals.item_scraped)
+
+    before = resource.getrusage(resource.RUSAGE_SELF)
+    start = time.perf_counter()
+    process.crawl(crawler, keywords=args.keyword, demo_limit=0, base_url=f"http://127.0.0.1:{args.port}")
+    process.start()
+    elapsed = time.perf_counter() - start
+    after = resource.getrusage(resource.RUSAGE_SELF)
+
+    stats = crawler.stats.get_stats()
+    items = stats.get("item_scraped_count", 0)
+    cpu = (after.ru_utime - before.ru_utime) + (after.ru_stime - before.ru_stime)
+    result = {
+        "seconds": elapsed,
+        "pages": crawler.spider.page_count,
+        "requests": stats.get("downloader/request_count", 0),
+        "items": items,
+        "items_per_sec": items / elapsed if elapsed else 0,
+        "latency_p50_ms": percentile(latencies, 0.5) * 1000,
+        "latency_p99_ms": percentile(latencies, 0.99) * 1000,
+        "cpu_seconds": cpu,
+        "cpu_percent": cpu / elapsed * 100 if elapsed else 0,
+        "max_rss_mb": after.ru_maxrss / 1024,  # ru_maxrss en Ko sous Linux
+        "captchas": stats.get("captcha/detected", 0),
+        "captcha_retries": stats.get("captcha/retried", 0),
+        "prefiltered": stats.get("prefilter/avoided", 0),
+        # Temps par étape (core/metrics.py), de la plus coûteuse à la moins coûteuse
+        "stages": REGISTRY.stage_summary(),
+    }
+    if args.db:
+        from benchmarks.bench_product_list import bench_connection
+        conn = bench_connection()
+        cursor = conn.cursor()
+        rows = 0
+        for table in WRITTEN_TABLES:
+            cursor.execute(f"SELECT COUNT(*) FROM {table}")
+            rows += cursor.fetchone()[0]
+        cursor.close()
+        conn.close()
+        result["db_rows"] = rows
+        result["db_rows_per_sec"] = rows / elapsed if elapsed else 0
+    return result
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def save_result(record):
+    os.makedirs(os.path.dirname(RESULTS_FILE), exist_ok=True)
+    with open(RESULTS_FILE, "a", encoding="utf-8") as f:
+        f.write(json.dumps(record) + "\n")
+
+
+def print_results(records):
+    print(f"{'date':<17} {'commit':<8} {'label':<14} {'items':>6} {'items/s':>8} {'p50 ms':>8} "
+          f"{'p99 ms':>8} {'CPU %':>6} {'RSS Mo':>7} {'captcha':>7} {'lignes/s':>9}")
+    for record in records:
+        r = record["result"]
+        db_rate = f"{r['db_rows_per_sec']:.1f}" if "db_rows_per_sec" in r else "-"
+        print(f"{record['date'][:16]:<17} {record['commit'] or '-':<8} {(record['label'] or '-')[:14]:<14} "
+              f"{r['items']:>6} {r['items_per_sec']:>8.1f} {r['latency_p50_ms']:>8.0f} {r['latency_p99_ms']:>8.0f} "
+              f"{r['cpu_percent']:>6.0f} {r['max_rss_mb']:>7.0f} {r['captchas']:>7} {db_rate:>9}")
+
+
+def load_results(count):
+    if not os.path.exists(RESULTS_FILE):
+        return []
+    with open(RESULTS_FILE, encoding="utf-8") as f:
+        records = [json.loads(line) for line in f if line.strip()]
+    return records[-count:]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--keyword", action="append", help="Mot-clé (option répétable)")
+    parser.add_argument("--pages", type=int, default=3, help="Pages de résultats par mot-clé")
+    parser.add_argument("--per-page", type=int, default=60)
+    parser.add_argument("--latency", type=float, default=0.05, help="Latence du serveur par réponse (s)")
+    parser.add_argument("--captcha-rate", type=float, default=0.0, help="Part des pages d'annonce en CAPTCHA")
+    parser.add_argument("--captcha-backoff", type=float, default=0.2,
+                        help="CAPTCHA_BACKOFF_BASE du run (s ; 30 s en production)")
+    parser.add_argument("--concurrency", type=int, help="CONCURRENT_REQUESTS (défaut : réglage du projet)")
+    parser.add_argument("--politeness", choices=["off", "real"], default="off",
+                        help="Délais de politesse du projet (real) ou aucun (off)")
+    parser.add_argument("--pipeline", choices=["batch", "single", "none"],
+                        help="Pipeline d'écriture (défaut : batch avec --db, none sinon)")
+    parser.add_argument("--reporter", choices=["production", "demo"], default="production",
+                        help="Sortie console du spider (demo : boîtes par produit)")
+    parser.add_argument("--db", action="store_true", help="Écrit dans la base de benchmark et mesure les lignes/s")
+    parser.add_argument("--label", help="Étiquette du run dans l'historique")
+    parser.add_argument("--no-save", action="store_true", help="Ne pas ajouter le run à l'historique")
+    parser.add_argument("--compare", type=int, metavar="N", help="Affiche les N derniers runs et quitte")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--port", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    args.keyword = args.keyword or ["Funko Pop Doctor Doom #561"]
+    args.pipeline = args.pipeline or ("batch" if args.db else "none")
+
+    if args.compare:
+        print_results(load_results(args.compare))
+        return
+
+    if args.worker:
+        # Sous-processus : un reactor Twisted ne démarre qu'une fois, et le CPU / la mémoire
+        # mesurés sont ceux du seul crawl (le serveur tourne dans le processus parent)
+        print(json.dumps(run_crawl(args)))
+        return
+
+    env = dict(os.environ)
+    if args.db:
+        from benchmarks.bench_product_list import BENCH_DB_NAME, bench_connection, reset_schema
+        conn = bench_connection()
+        reset_schema(conn)
+        conn.close()
+        # Les pipelines écrivent via core.db_connection, qui lit DB_NAME à l'import
+        env["DB_NAME"] = BENCH_DB_NAME
+
+    server = make_server(0, latency=args.latency, pages=args.pages, per_page=args.per_page,
+                         captcha_rate=args.captcha_rate)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    port = server.server_address[1]
+
+    command = [sys.executable, "-m", "benchmarks.bench_crawl", "--worker", "--port", str(port),
+               "--captcha-backoff", str(args.captcha_backoff), "--politeness", args.politeness,
+               "--pipeline", args.pipeline, "--reporter", args.reporter]
+    for keyword in args.keyword:
+        command += ["--keyword", keyword]
+    if args.concurrency:
+        command += ["--concurrency", str(args.concurrency)]
+    if args.db:
+        command.append("--db")
+    try:
+        output = subprocess.run(command, check=True, capture_output=True, text=True, env=env).stdout
+    finally:
+        server.shutdown()
+    result = json.loads(output.strip().splitlines()[-1])
+
+    record = {
+        "date": datetime.datetime.now().isoformat(timespec="seconds"),
+        "commit": git_commit(),
+        "label": args.label,
+        "params": {
+            "keywords": len(args.keyword), "pages": args.pages, "per_page": args.per_page,
+            "latency": args.latency, "captcha_rate": args.captcha_rate, "concurrency": args.concurrency,
+            "politeness": args.politeness, "pipeline": args.pipeline, "db": args.db,
+            "reporter": args.reporter,
+        },
+        "result": result,
+    }
+    if not args.no_save:
+        save_result(record)
+
+    print(f"{result['pages']} pages, {result['requests']} requêtes, {result['items']} items "
+          f"({result['prefiltered']} écartés avant la page de détail, {result['captchas']} CAPTCHA, "
+          f"{result['captcha_retries']} nouveaux essais) en {result['seconds']:.1f}s")
+    print(f"  débit           : {result['items_per_sec']:.1f} items/s")
+    print(f"  latence / item  : p50 {result['latency_p50_ms']:.0f} ms, p99 {result['latency_p99_ms']:.0f} ms")
+    print(f"  CPU             : {result['cpu_seconds']:.1f}s ({result['cpu_percent']:.0f}%), "
+          f"RSS max {result['max_rss_mb']:.0f} Mo")
+    if args.db:
+        print(f"  base            : {result['db_rows']} lignes ({result['db_rows_per_sec']:.1f}/s)")
+    for stage, timing in list(result.get("stages", {}).items())[:8]:
+        print(f"  {stage:<32}: {timing['count']:>6} x, total {timing['total_s']:.2f}s, "
+              f"p50 {timing['p50_ms']:.1f} ms, p99 {timing['p99_ms']:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+"""
+Benchmark de l'extraction des pages d'annonce : requêtes XPath/CSS indépendantes
+et regex recompilées (implémentation historique de parse_item) contre la couche
+scrapers/extraction.py (sélecteurs précompilés, une seule traversée du DOM).
+
+Les pages viennent du faux serveur eBay (benchmarks/mock_ebay.py) ou d'un dossier
+de pages eBay sauvegardées (*.html, l'item id est lu dans le nom du fichier).
+Rapporte items/s et allocations Python (tracemalloc), vérifie que les deux
+implémentations extraient les mêmes champs, et peut comparer à une référence :
+
+    python -m benchmarks.bench_parse_item --pages 200
+    python -m benchmarks.bench_parse_item --save-fixtures benchmarks/fixtures
+    python -m benchmarks.bench_parse_item --fixtures benchmarks/fixtures --save-baseline parse_baseline.json
+    python -m benchmarks.bench_parse_item --baseline parse_baseline.json   # code 1 si régression
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import re
+import sys
+import time
+import tracemalloc
+
+from scrapy.http import HtmlResponse, Request
+
+from benchmarks.mock_ebay import FIRST_ITEM_ID, listing, render_item_page
+from scrapers import extraction
+from scrapers.items import EbayItem
+from scrapers.spiders.ebay_spider import EbaySpider
+
+BASE_URL = "https://www.ebay.com"
+
+
+def legacy_extract(response):
+    """Champs extraits comme le faisait parse_item avant scrapers/extraction.py."""
+    fields = {}
+    ended_message = " ".join(response.xpath('//div[@data-testid="d-statusmessage"]//text()').getall()).strip()
+    fields["ended"] = bool(ended_message) and any(phrase in ended_message.lower() for phrase in [
+        "this listing sold on", "bidding ended on",
+        "this listing was ended by the seller", "item sold on"])
+    fallback_title = (response.xpath('//meta[@property="og:title"]/@content').get() or
+                      response.xpath('//title/text()').get() or "")
+    fields["title"] = re.sub(r"\s*\|\s*ebay\s*$", "", fallback_title, flags=re.IGNORECASE).strip()
+    fields["multi_variation"] = bool(response.xpath(
+        '//button[contains(@class, "listbox-button__control") and contains(@class, "btn--form") and @value="Select"]'
+    ))
+    fields["image_url"] = (response.xpath('//meta[@property="og:image"]/@content').get() or "").strip()
+    seller_name = (response.xpath('//span[@class="mbg-nw"]/text()').get() or
+                   response.xpath('//div[contains(@class,"info__about-seller")]/a/span/text()').get())
+    fields["seller_username"] = seller_name.strip() if seller_name else ""
+    bid_button = response.xpath("//*[starts-with(@id, 'bidBtn_btn')]").get()
+    bin_button = response.xpath("//*[starts-with(@id, 'binBtn_btn')]").get()
+    countdown = response.xpath("//*[contains(@id, 'vi-cdown')]").get()
+    if bid_button or countdown:
+        fields["listing_type"] = "Auction + BIN" if bin_button else "Auction"
+    else:
+        fields["listing_type"] = "Fixed Price"
+    if fields["listing_type"] in ["Auction", "Auction + BIN"]:
+        bids_text = response.xpath('//div[@data-testid="x-bid-count"]').xpath('.//span/text()').re_first(r'(\d+)')
+        fields["bids_count"] = int(bids_text) if bids_text else 0
+    else:
+        fields["bids_count"] = None
+    raw_texts = response.css('.ux-timer__text::text').getall()
+    fields["time_remaining"] = ((raw_texts[1].strip() if len(raw_texts) >= 2
+                                 else raw_texts[0].replace("Ends in", "").strip()) if raw_texts else None)
+    fields["buy_it_now_price"] = None
+    if fields["listing_type"] == "Auction + BIN":
+        bin_price_str = response.css('div[data-testid="x-bin-price"] span.ux-textspans::text').get()
+        if bin_price_str:
+            match = re.search(r'[\d,.]+', bin_price_str)
+            fields["buy_it_now_price"] = float(match.group(0).replace(",", "")) if match else None
+    fields["category"] = ""
+    ld_json = response.xpath('//script[@type="application/ld+json"]/text()').get()
+    if ld_json:
+        data = json.loads(ld_json)
+        if isinstance(data, list):
+            data = next((entry for entry in data if entry.get("@type") == "BreadcrumbList"), data)
+        if isinstance(data, dict) and data.get("@type") == "BreadcrumbList":
+            fields["category"] = " > ".join(
+                element.get("name", "").strip() for element in data.get("itemListElement", [])
+                if element.get("name", "").strip().lower() != "ebay")
+    return fields
+
+
+def new_extract(response):
+    """Mêmes champs via scrapers/extraction.py."""
+    page = extraction.extract_item_page(response)
+    if page["bid_button"] or page["countdown"]:
+        listing_type = "Auction + BIN" if page["bin_button"] else "Auction"
+    else:
+        listing_type = "Fixed Price"
+    seller_name = page["seller"] or page["seller_fallback"]
+    return {
+        "ended": extraction.is_ended_message(page["status_texts"]),
+        "title": extraction.clean_title(page["og_title"] or page["page_title"] or ""),
+        "multi_variation": page["multi_variation"],
+        "image_url": (page["og_image"] or "").strip(),
+        "seller_username": seller_name.strip() if seller_name else "",
+        "listing_type": listing_type,
+        "bids_count": (extraction.bids_count_from(page["bid_texts"])
+                       if listing_type in ["Auction", "Auction + BIN"] else None),
+        "time_remaining": extraction.time_remaining_from(page["timer_texts"]),
+        "buy_it_now_price": (extraction.parse_price(page["bin_price_text"])
+                             if listing_type == "Auction + BIN" else None),
+        "category": extraction.category_from_ld_json(page["ld_json"]) or "",
+    }
+
+
+def load_fixtures(args):
+    """Liste de (item_id, titre de la page de recherche, corps HTML)."""
+    if args.fixtures:
+        fixtures = []
+        for name in sorted(os.listdir(args.fixtures)):
+            if name.endswith(".html"):
+                with open(os.path.join(args.fixtures, name), "rb") as f:
+                    fixtures.append((os.path.splitext(name)[0], None, f.read()))
+        return fixtures
+    return [
+        (str(item_id), listing(item_id)["title"], render_item_page(BASE_URL, item_id).encode("utf-8"))
+        for item_id in range(FIRST_ITEM_ID, FIRST_ITEM_ID + args.pages)
+    ]
+
+
+def make_response(item_id, title, body):
+    url = f"{BASE_URL}/itm/{item_id}"
+    item = EbayItem()
+    item["item_url"] = url
+    item["item_condition"] = "Pre-Owned"
+    if title:
+        item["title"] = title
+    return HtmlResponse(url=url, body=body, encoding="utf-8", request=Request(url, meta={"item": item}))
+
+
+def measure(label, func, fixtures, rounds, parsed):
+    """
+    items/s sur `rounds` passages. parsed=True : DOM construit à l'avance (coût des
+    requêtes seul) ; sinon chaque passage reconstruit les réponses (parsing HTML inclus).
+    """
+    responses = [make_response(*fixture) for fixture in fixtures]
+    if parsed:
+        for response in responses:
+            response.selector  # construit et met en cache l'arbre lxml
+    start = time.perf_counter()
+    for _ in range(rounds):
+        if not parsed:
+            responses = [make_response(*fixture) for fixture in fixtures]
+        for response in responses:
+            func(response)
+    elapsed = time.perf_counter() - start
+
+    # Allocations Python d'un passage (hors arbre lxml, alloué en C)
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    for response in responses:
+        func(response)
+    after = tracemalloc.take_snapshot()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    stats = after.compare_to(before, "filename")
+    allocated = sum(stat.size_diff for stat in stats if stat.size_diff > 0)
+    blocks = sum(stat.count_diff for stat in stats if stat.count_diff > 0)
+    return {
+        "label": label,
+        "items_per_sec": len(fixtures) * rounds / elapsed,
+        "peak_kib_per_item": peak / 1024 / len(fixtures),
+        "retained_kib": allocated / 1024,
+        "retained_blocks": blocks,
+    }
+
+
+def run_spider(spider, response):
+    for _ in spider.parse_item(response):
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=200, help="Pages générées par le faux serveur")
+    parser.add_argument("--fixtures", help="Dossier de pages d'annonce sauvegardées (*.html)")
+    parser.add_argument("--save-fixtures", help="Écrit les pages générées dans ce dossier et quitte")
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--baseline", help="Résultats de référence (JSON) à comparer")
+    parser.add_argument("--save-baseline", help="Écrit les résultats dans ce fichier JSON")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="Baisse d'items/s tolérée par rapport à la référence")
+    args = parser.parse_args()
+
+    fixtures = load_fixtures(args)
+    if args.save_fixtures:
+        os.makedirs(args.save_fixtures, exist_ok=True)
+        for item_id, _, body in fixtures:
+            with open(os.path.join(args.save_fixtures, f"{item_id}.html"), "wb") as f:
+                f.write(body)
+        print(f"{len(fixtures)} pages écrites dans {args.save_fixtures}")
+        return
+
+    # Les deux implémentations doivent extraire exactement les mêmes champs
+    mismatches = 0
+    for fixture in fixtures:
+        legacy = legacy_extract(make_response(*fixture))
+        new = new_extract(make_response(*fixture))
+        if legacy != new:
+            mismatches += 1
+            if mismatches <= 3:
+                diff = {key: (legacy[key], new[key]) for key in legacy if legacy[key] != new.get(key)}
+                print(f"[mismatch] item {fixture[0]}: {diff}")
+
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        # Le reporter demo affiche une boîte par produit : sortie ignorée
+        spider = EbaySpider(demo_limit=0)
+        results = [
+            measure("legacy selectors", legacy_extract, fixtures, args.rounds, parsed=True),
+            measure("extraction layer", new_extract, fixtures, args.rounds, parsed=True),
+            measure("legacy + HTML parse", legacy_extract, fixtures, args.rounds, parsed=False),
+            measure("extraction + HTML parse", new_extract, fixtures, args.rounds, parsed=False),
+            measure("parse_item (full)", lambda response: run_spider(spider, response),
+                    fixtures, args.rounds, parsed=False),
+        ]
+
+    print(f"Fixtures : {len(fixtures)} pages, {sum(len(body) for _, _, body in fixtures) / len(fixtures) / 1024:.0f} Kio en moyenne")
+    print(f"Champs   : {len(fixtures) - mismatches}/{len(fixtures)} pages identiques entre les deux implémentations")
+    print(f"{'':<24} {'items/s':>10} {'peak Kio/item':>14} {'retenu Kio':>11} {'blocs':>7}")
+    for result in results:
+        print(f"{result['label']:<24} {result['items_per_sec']:>10,.0f} {result['peak_kib_per_item']:>14.1f} "
+              f"{result['retained_kib']:>11.1f} {result['retained_blocks']:>7}")
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w", encoding="utf-8") as f:
+            json.dump({result["label"]: result for result in results}, f, indent=2)
+
+    failed = mismatches > 0
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        for result in results:
+            if result["label"].startswith("legacy"):
+                continue  # Références de comparaison, pas du code en production
+            reference = baseline.get(result["label"])
+            if reference and result["items_per_sec"] < reference["items_per_sec"] * (1 - args.tolerance):
+                print(f"[régression] {result['label']}: {result['items_per_sec']:,.0f} items/s "
+                      f"(référence {reference['items_per_sec']:,.0f})")
+                failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
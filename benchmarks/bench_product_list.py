@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+Benchmark de GET /api/produits : requête historique (deux sous-requêtes corrélées
+sur price_history par produit) contre la jointure sur product_latest_price.
+
+Le script travaille dans une base dédiée (BENCH_DB_NAME, par défaut
+price_tracker_bench) qu'il crée et remplit lui-même ; la base applicative
+n'est jamais touchée.
+
+    python -m benchmarks.bench_product_list --sizes 10000 100000 --history 100
+"""
+
+import argparse
+import os
+import random
+import statistics
+import time
+from datetime import datetime, timedelta
+
+import mysql.connector
+
+from core.db_connection import DB_HOST, DB_PORT, DB_USER, DB_PASSWORD
+from core.latest_price import rebuild_latest_prices
+from core.price_rollups import ROLLUPS, rebuild_price_rollups
+from core.schema import TABLES, INDEXES, index_exists
+from api.api_routes import PRODUCT_SELECT
+
+BENCH_DB_NAME = os.getenv("BENCH_DB_NAME", "price_tracker_bench")
+
+LISTING_TYPES = ("Fixed Price", "Auction", "Auction + BIN")
+
+# Requête de liste telle qu'elle existait avant la projection
+LEGACY_PRODUCT_SELECT = """
+    SELECT p.product_id, p.item_id, p.title, p.item_condition, p.normalized_condition,
+           p.signed, p.in_box, p.url, p.image_url, p.seller_username, p.ended,
+           p.category, p.listing_type, p.bids_count, p.time_remaining,
+           c.name AS leaf_name,
+           (
+             SELECT ph.price
+             FROM price_history ph
+             WHERE ph.product_id = p.product_id
+             ORDER BY ph.date_scraped DESC
+             LIMIT 1
+           ) AS last_price,
+           (
+             SELECT DATE_FORMAT(MAX(ph.date_scraped), '%Y-%m-%d')
+             FROM price_history ph
+             WHERE ph.product_id = p.product_id
+           ) AS last_scraped_date,
+           p.buy_it_now_price
+    FROM product p
+    LEFT JOIN category c ON p.category_id = c.category_id
+"""
+
+# Schéma minimal équivalent aux tables principales (voir README)
+BASE_TABLES = [
+    """
+    CREATE TABLE IF NOT EXISTS category (
+        category_id INT AUTO_INCREMENT PRIMARY KEY,
+        ebay_id VARCHAR(32) UNIQUE,
+        name VARCHAR(255),
+        parent_ebay_id VARCHAR(32),
+        level INT
+    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS product (
+        product_id INT AUTO_INCREMENT PRIMARY KEY,
+        item_id VARCHAR(32) UNIQUE,
+        title VARCHAR(255),
+        item_condition VARCHAR(64),
+        normalized_condition VARCHAR(16),
+        signed TINYINT(1),
+        in_box TINYINT(1),
+        url TEXT,
+        image_url TEXT,
+        seller_username VARCHAR(255),
+        category VARCHAR(512),
+        listing_type VARCHAR(32),
+        bids_count INT,
+        time_remaining VARCHAR(64),
+        buy_it_now_price DECIMAL(10, 2),
+        ended TINYINT(1) DEFAULT 0,
+        category_id INT
+    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS price_history (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        product_id INT,
+        price DECIMAL(10, 2),
+        buy_it_now_price DECIMAL(10, 2),
+        bids_count INT,
+        time_remaining VARCHAR(64),
+        date_scraped DATETIME
+    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+    """,
+]
+
+
+def bench_connection():
+    server = mysql.connector.connect(host=DB_HOST, port=DB_PORT, user=DB_USER, password=DB_PASSWORD)
+    cursor = server.cursor()
+    cursor.execute(f"CREATE DATABASE IF NOT EXISTS {BENCH_DB_NAME}")
+    cursor.close()
+    server.close()
+    return mysql.connector.connect(
+        host=DB_HOST, port=DB_PORT, user=DB_USER, password=DB_PASSWORD,
+        database=BENCH_DB_NAME, charset='utf8mb4', use_unicode=True
+    )
+
+
+def reset_schema(conn):
+    """Crée le schéma de la base de benchmark s'il manque et vide les tables de données."""
+    cursor = conn.cursor()
+    for ddl in BASE_TABLES:
+        cursor.execute(ddl)
+    for ddl in TABLES.values():
+        cursor.execute(ddl)
+    for table, index_name, columns in INDEXES:
+        if not index_exists(cursor, table, index_name):
+            cursor.execute(f"CREATE INDEX {index_name} ON {table} {columns}")
+    for table in ("price_history", "product_latest_price", "product") + tuple(t for t, _p in ROLLUPS.values()):
+        cursor.execute(f"TRUNCATE TABLE {table}")
+    conn.commit()
+    cursor.close()
+
+
+def seed(conn, nb_products, history_rows, batch=5000):
+    """
+    Remplit la base de benchmark avec nb_products produits et history_rows relevés chacun.
+    """
+    reset_schema(conn)
+    cursor = conn.cursor()
+
+    product_rows = [
+        (str(100000000000 + i), f"Funko Pop Doctor Doom #561 bench {i}", "Pre-Owned",
+         random.choice(["New", "Used"]), i % 11 == 0, i % 3 != 0, f"https://www.ebay.com/itm/{100000000000 + i}",
+         "", f"bench_seller_{i % 50}", "Collectibles", LISTING_TYPES[i % len(LISTING_TYPES)],
+         None, None, None, i % 7 == 0)
+        for i in range(nb_products)
+    ]
+    for start in range(0, len(product_rows), batch):
+        cursor.executemany("""
+            INSERT INTO product (item_id, title, item_condition, normalized_condition, signed, in_box,
+                                 url, image_url, seller_username, category, listing_type,
+                                 bids_count, time_remaining, buy_it_now_price, ended)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+        """, product_rows[start:start + batch])
+    conn.commit()
+
+    cursor.execute("SELECT MIN(product_id) FROM product")
+    first_id = cursor.fetchone()[0]
+    start_date = datetime(2025, 1, 1)
+    buffer = []
+    for offset in range(nb_products):
+        product_id = first_id + offset
+        base = random.uniform(15, 60)
+        for h in range(history_rows):
+            buffer.append((product_id, round(base * random.uniform(0.9, 1.1), 2),
+                           start_date + timedelta(hours=6 * h, seconds=offset)))
+            if len(buffer) >= batch:
+                cursor.executemany(
+                    "INSERT INTO price_history (product_id, price, date_scraped) VALUES (%s, %s, %s)",
+                    buffer
+                )
+                buffer = []
+    if buffer:
+        cursor.executemany(
+            "INSERT INTO price_history (product_id, price, date_scraped) VALUES (%s, %s, %s)",
+            buffer
+        )
+    conn.commit()
+
+    rebuild_start = time.perf_counter()
+    rebuild_latest_prices(cursor)
+    conn.commit()
+    rebuild_elapsed = time.perf_counter() - rebuild_start
+    rebuild_price_rollups(cursor)
+    conn.commit()
+    cursor.close()
+    return rebuild_elapsed
+
+
+def time_query(conn, sql, repeat):
+    durations = []
+    for _ in range(repeat):
+        cursor = conn.cursor()
+        start = time.perf_counter()
+        cursor.execute(sql)
+        cursor.fetchall()
+        durations.append(time.perf_counter() - start)
+        cursor.close()
+    return statistics.median(durations)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--history", type=int, default=100, help="Relevés par produit")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    conn = bench_connection()
+    print(f"{'products':>10} {'history':>8} {'legacy (s)':>12} {'projection (s)':>15} {'speedup':>8} {'rebuild (s)':>12}")
+    for size in args.sizes:
+        rebuild_elapsed = seed(conn, size, args.history)
+        legacy = time_query(conn, LEGACY_PRODUCT_SELECT, args.repeat)
+        projected = time_query(conn, PRODUCT_SELECT, args.repeat)
+        speedup = legacy / projected if projected else float("inf")
+        print(f"{size:>10} {args.history:>8} {legacy:>12.3f} {projected:>15.3f} {speedup:>7.1f}x {rebuild_elapsed:>12.2f}")
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Benchmark de la pagination de GET /api/produits (voir api/product_list.py) :
+liste complète historique contre pages par curseur, avec filtres et tris côté
+serveur, pagination par OFFSET pour comparaison, et taille des réponses avec et
+sans projection fields=.
+
+Utilise la même base dédiée que bench_product_list (BENCH_DB_NAME), remplie ici.
+
+    python -m benchmarks.bench_product_pagination --size 100000 --history 10
+"""
+
+import argparse
+import json
+import statistics
+import time
+
+from api.product_list import ALL_FIELDS, build_list_query, build_page, encode_cursor, row_to_dict
+from benchmarks.bench_product_list import bench_connection, seed
+
+CARD_FIELDS = ("product_id", "title", "price", "image_url", "ended", "in_box", "signed",
+               "normalized_condition", "last_scraped_date", "seller_username")
+
+SCENARIOS = [
+    ("défaut", {}),
+    ("actifs", {"status": "active"}),
+    ("enchères 20-40 $", {"listing_type": "Auction", "min_price": "20", "max_price": "40"}),
+    ("prix croissant", {"sort": "price-asc"}),
+    ("actifs, récents", {"status": "active", "sort": "date-desc"}),
+    ("recherche vendeur", {"q": "bench_seller_7"}),
+]
+
+
+def timed(conn, sql, params, repeat):
+    """Médiane du temps d'exécution (s) et lignes du dernier passage."""
+    durations = []
+    rows = []
+    for _ in range(repeat):
+        cursor = conn.cursor()
+        start = time.perf_counter()
+        cursor.execute(sql, params)
+        rows = cursor.fetchall()
+        durations.append(time.perf_counter() - start)
+        cursor.close()
+    return statistics.median(durations), rows
+
+
+def offset_query(sql, params, offset):
+    return sql.replace("LIMIT %s", "LIMIT %s OFFSET %s"), params + [offset]
+
+
+def bench_scenario(conn, args, depth, repeat):
+    """(première page, page profonde par curseur, page profonde par OFFSET) en secondes."""
+    sql, params, fields, sort, limit = build_list_query(args, paginate=True)
+    first, _ = timed(conn, sql, params, repeat)
+
+    # Dernière ligne avant la profondeur visée, pour construire le curseur
+    cursor = conn.cursor()
+    probe_sql, probe_params = offset_query(sql, params[:-1] + [1], max(0, depth - 1))
+    cursor.execute(probe_sql, probe_params)
+    row = cursor.fetchone()
+    cursor.close()
+    if row is None:
+        return first, None, None  # Moins de `depth` produits pour ce filtre
+
+    *_, value, product_id = row
+    deep_sql, deep_params, *_ = build_list_query(
+        dict(args, cursor=encode_cursor(sort, value, product_id)), paginate=True)
+    keyset, _ = timed(conn, deep_sql, deep_params, repeat)
+    offset, _ = timed(conn, *offset_query(sql, params, depth), repeat)
+    return first, keyset, offset
+
+
+def payload_bytes(conn, fields):
+    sql, params, fields, sort, limit = build_list_query({"fields": ",".join(fields)}, paginate=True)
+    cursor = conn.cursor()
+    cursor.execute(sql, params)
+    page = build_page(cursor.fetchall(), fields, sort, limit)
+    cursor.close()
+    return len(json.dumps(page).encode("utf-8"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=100000, help="Nombre de produits")
+    parser.add_argument("--history", type=int, default=10, help="Relevés par produit")
+    parser.add_argument("--depth", type=float, default=0.9,
+                        help="Position de la page profonde (fraction des produits)")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--no-seed", action="store_true", help="Réutilise la base déjà remplie")
+    args = parser.parse_args()
+
+    conn = bench_connection()
+    if not args.no_seed:
+        seed(conn, args.size, args.history)
+    depth = int(args.size * args.depth)
+
+    # Référence : tout le catalogue en un tableau JSON (comportement historique)
+    sql, params, fields, _, _ = build_list_query({}, paginate=False)
+    start = time.perf_counter()
+    cursor = conn.cursor()
+    cursor.execute(sql, params)
+    full = json.dumps([row_to_dict(row, fields) for row in cursor.fetchall()]).encode("utf-8")
+    cursor.close()
+    full_elapsed = time.perf_counter() - start
+    print(f"Liste complète : {full_elapsed * 1000:,.0f} ms, {len(full) / 1024 / 1024:.1f} Mio ({args.size} produits)")
+
+    page_all = payload_bytes(conn, ALL_FIELDS)
+    page_cards = payload_bytes(conn, CARD_FIELDS)
+    print(f"Page (tous les champs) : {page_all / 1024:.1f} Kio, page (champs des cartes) : "
+          f"{page_cards / 1024:.1f} Kio ({1 - page_cards / page_all:.0%} de moins)")
+
+    print(f"\n{'scénario':<20} {'1re page (ms)':>14} {f'curseur @{depth} (ms)':>22} {f'OFFSET {depth} (ms)':>20}")
+    for label, scenario in SCENARIOS:
+        first, keyset, offset = bench_scenario(conn, scenario, depth, args.repeat)
+        keyset_text = f"{keyset * 1000:,.1f}" if keyset is not None else "-"
+        offset_text = f"{offset * 1000:,.1f}" if offset is not None else "-"
+        print(f"{label:<20} {first * 1000:>14,.1f} {keyset_text:>22} {offset_text:>20}")
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
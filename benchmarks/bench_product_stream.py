@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Benchmark de la liste complète de GET /api/produits : réponse jsonify historique
+(fetchall + liste de dicts + une seule chaîne JSON) contre le mode flux
+(?stream=json et ?stream=ndjson, fetchmany sur un curseur non bufferisé).
+
+Chaque mode tourne dans un processus neuf (client de test Flask, cache de réponses
+désactivé) sur la base de benchmark (BENCH_DB_NAME, remplie par bench_product_list) ;
+le script rapporte le temps jusqu'au premier octet, la durée totale, la taille de la
+réponse et la hausse du pic de RSS due à la requête.
+
+    python -m benchmarks.bench_product_stream --size 100000 --history 10
+"""
+
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+from benchmarks.bench_product_list import BENCH_DB_NAME
+
+MODES = [
+    ("jsonify (historique)", "/api/produits"),
+    ("flux JSON", "/api/produits?stream=json"),
+    ("flux NDJSON", "/api/produits?stream=ndjson"),
+]
+
+
+def peak_rss_mib():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # Kio -> Mio (Linux)
+
+
+def run_child(url):
+    """Exécuté dans le processus enfant : une requête, mesures sur la sortie standard."""
+    from app import app
+
+    client = app.test_client()
+    client.get("/api/produits?limit=1")  # Pool, imports et plan de requête chauds
+    baseline = peak_rss_mib()
+
+    start = time.perf_counter()
+    response = client.get(url, buffered=False)
+    first_byte = None
+    size = 0
+    for chunk in response.response:
+        if first_byte is None and chunk:
+            first_byte = time.perf_counter() - start
+        size += len(chunk)
+    total = time.perf_counter() - start
+    response.close()
+    print(json.dumps({
+        "status": response.status_code,
+        "ttfb": first_byte or total,
+        "total": total,
+        "bytes": size,
+        "rss_growth": peak_rss_mib() - baseline,
+    }))
+
+
+def measure(url):
+    env = dict(os.environ, DB_NAME=BENCH_DB_NAME, RESPONSE_CACHE_ENABLED="0")
+    output = subprocess.run(
+        [sys.executable, "-m", "benchmarks.bench_product_stream", "--child", url],
+        env=env, check=True, capture_output=True, text=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=100000, help="Nombre de produits")
+    parser.add_argument("--history", type=int, default=10, help="Relevés par produit")
+    parser.add_argument("--no-seed", action="store_true", help="Réutilise la base déjà remplie")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.child)
+        return
+
+    if not args.no_seed:
+        from benchmarks.bench_product_list import bench_connection, seed
+        conn = bench_connection()
+        seed(conn, args.size, args.history)
+        conn.close()
+
+    print(f"{'mode':<22} {'1er octet (ms)':>15} {'total (s)':>10} {'taille (Mio)':>13} {'pic RSS +Mio':>13}")
+    for label, url in MODES:
+        result = measure(url)
+        if result["status"] != 200:
+            print(f"{label:<22} statut HTTP {result['status']}")
+            continue
+        print(f"{label:<22} {result['ttfb'] * 1000:>15,.0f} {result['total']:>10.2f} "
+              f"{result['bytes'] / 1024 / 1024:>13.1f} {result['rss_growth']:>13.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Pages/min d'un crawl contre le faux serveur eBay local (benchmarks/mock_ebay.py)
+avec l'ancien RandomDelayMiddleware (time.sleep, bloque le reactor) et le nouveau
+(délai planifié par slot).
+
+Chaque hôte 127.0.0.N joue le rôle d'un slot distinct (comme un proxy distinct).
+
+    python -m benchmarks.bench_random_delay --hosts 4 --pages 120 --min-delay 0.2 --max-delay 0.5
+"""
+
+import argparse
+import json
+import random
+import subprocess
+import sys
+import threading
+import time
+
+import scrapy
+from scrapy.crawler import CrawlerProcess
+
+from benchmarks.mock_ebay import make_server
+
+
+class BlockingRandomDelayMiddleware:
+    """Ancienne implémentation : time.sleep dans process_request."""
+
+    def __init__(self, min_delay, max_delay):
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        return cls(crawler.settings.getfloat('RANDOM_DELAY_MIN'), crawler.settings.getfloat('RANDOM_DELAY_MAX'))
+
+    def process_request(self, request, spider):
+        time.sleep(random.uniform(self.min_delay, self.max_delay))
+
+
+class MockSearchSpider(scrapy.Spider):
+    name = "bench_random_delay"
+
+    def __init__(self, hosts, port, **kwargs):
+        super().__init__(**kwargs)
+        self.hosts = [f"127.0.0.{host}:{port}" for host in range(1, hosts + 1)]
+        self.start_urls = [f"http://{host}/sch/i.html?_nkw=doom" for host in self.hosts]
+
+    def parse(self, response):
+        # Répartit les annonces sur les hôtes, comme la rotation des proxies les répartit sur les slots
+        for index, href in enumerate(response.xpath('//a[@class="s-item__link"]/@href').getall()):
+            path = href.split("/", 3)[3]
+            yield scrapy.Request(f"http://{self.hosts[index % len(self.hosts)]}/{path}", callback=self.parse_item)
+
+    def parse_item(self, response):
+        pass
+
+
+def run_variant(variant, port, args):
+    middleware = {
+        "blocking": "benchmarks.bench_random_delay.BlockingRandomDelayMiddleware",
+        "deferred": "core.random_delay_middleware.RandomDelayMiddleware",
+    }[variant]
+    process = CrawlerProcess(settings={
+        "LOG_LEVEL": "ERROR",
+        "ROBOTSTXT_OBEY": False,
+        "TELNETCONSOLE_ENABLED": False,
+        "DOWNLOAD_DELAY": 0,
+        "AUTOTHROTTLE_ENABLED": False,
+        "CONCURRENT_REQUESTS": 16,
+        "CONCURRENT_REQUESTS_PER_DOMAIN": 8,
+        "CLOSESPIDER_PAGECOUNT": args.pages,
+        "RANDOM_DELAY_MIN": args.min_delay,
+        "RANDOM_DELAY_MAX": args.max_delay,
+        "DOWNLOADER_MIDDLEWARES": {middleware: 605},
+    })
+    crawler = process.create_crawler(MockSearchSpider)
+    start = time.perf_counter()
+    process.crawl(crawler, hosts=args.hosts, port=port)
+    process.start()
+    elapsed = time.perf_counter() - start
+    pages = crawler.stats.get_value("response_received_count", 0)
+    return {"variant": variant, "pages": pages, "seconds": elapsed, "pages_per_min": pages / elapsed * 60}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--hosts", type=int, default=4)
+    parser.add_argument("--pages", type=int, default=120)
+    parser.add_argument("--min-delay", type=float, default=0.2)
+    parser.add_argument("--max-delay", type=float, default=0.5)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--variant", choices=["blocking", "deferred"], help=argparse.SUPPRESS)
+    parser.add_argument("--port", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.variant:
+        # Sous-processus : un reactor Twisted ne peut être démarré qu'une fois par processus
+        print(json.dumps(run_variant(args.variant, args.port, args)))
+        return
+
+    server = make_server(0, latency=args.latency)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    port = server.server_address[1]
+
+    print(f"{'variant':>10} {'pages':>6} {'seconds':>8} {'pages/min':>10}")
+    for variant in ("blocking", "deferred"):
+        output = subprocess.run(
+            [sys.executable, "-m", "benchmarks.bench_random_delay", "--variant", variant, "--port", str(port),
+             "--hosts", str(args.hosts), "--pages", str(args.pages),
+             "--min-delay", str(args.min_delay), "--max-delay", str(args.max_delay)],
+            check=True, capture_output=True, text=True
+        ).stdout.strip().splitlines()[-1]
+        result = json.loads(output)
+        print(f"{result['variant']:>10} {result['pages']:>6} {result['seconds']:>8.1f} {result['pages_per_min']:>10.1f}")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+Faux serveur eBay local pour les benchmarks : pages de recherche et pages
+d'annonce générées de façon déterministe à partir de l'item id, avec la
+structure HTML qu'attend EbaySpider (s-item, ux-timer, x-bid-count, ld+json...) :
+enchères, achat immédiat, annonces terminées, multi-variations et lots.
+
+    python -m benchmarks.mock_ebay --port 8765 --latency 0.05 --captcha-rate 0.02
+
+Avec --captcha-rate, une fraction des pages d'annonce est remplacée (au hasard, à
+chaque requête) par une page de challenge « Pardon Our Interruption ».
+
+Le serveur écoute sur toutes les interfaces : sous Linux, 127.0.0.1, 127.0.0.2...
+désignent tous la boucle locale, ce qui permet de simuler plusieurs hôtes/slots.
+"""
+
+import argparse
+import json
+import random
+import time
+from html import escape
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs, quote_plus
+
+FIRST_ITEM_ID = 300000000000
+
+TITLES = [
+    "Funko Pop! Vinyl: Marvel - Doctor Doom #561",
+    "Funko Pop Marvel Fantastic Four Doctor Doom #561 Vinyl Figure",
+    "Funko POP! Doctor Doom #561 Marvel Collectible NIB",
+    "Doctor Doom Funko Pop #561 loose no box",
+    "Funko Pop Doctor Doom #561 SIGNED by artist",
+    "Funko Pop Doctor Doom #561 + Silver Surfer #560 bundle",
+    "Lot of 3 Funko Pop Marvel Doctor Doom #561",
+    "Funko Pop! Marvel Doctor Doom #561 w/ protector",
+]
+CONDITIONS = ["Brand New", "Pre-Owned", "New (Other)", "Used"]
+CATEGORY_PATH = ["eBay", "Collectibles & Art", "Collectibles", "Collectible Figures & Supplies",
+                 "Collectible Figures & Bobbleheads"]
+
+
+def listing(item_id):
+    """Caractéristiques déterministes d'une annonce."""
+    rng = random.Random(item_id)
+    kind = rng.random()
+    return {
+        "item_id": item_id,
+        "title": rng.choice(TITLES),
+        "price": round(rng.uniform(12, 80), 2),
+        "bin_price": round(rng.uniform(60, 120), 2),
+        "condition": rng.choice(CONDITIONS),
+        "listing_type": "auction" if kind < 0.3 else "auction_bin" if kind < 0.4 else "fixed",
+        "bids": rng.randint(0, 25),
+        "ended": rng.random() < 0.1,
+        "multi_variation": rng.random() < 0.05,
+        "seller": f"seller_{rng.randint(1, 500)}",
+    }
+
+
+def render_search_page(base_url, keyword, page, per_page=60, pages=3):
+    items = []
+    for index in range(per_page):
+        item_id = FIRST_ITEM_ID + (page - 1) * per_page + index
+        data = listing(item_id)
+        items.append(f"""
+        <li class="s-item s-item__pl-on-bottom">
+          <div class="s-item__image-section">
+            <img class="s-item__image-img" src="{base_url}/img/{item_id}.jpg">
+          </div>
+          <div class="s-item__info clearfix">
+            <a class="s-item__link" href="{base_url}/itm/{item_id}?hash=item{item_id:x}">
+              <h3 class="s-item__title">{"<span>New Listing</span>" if index % 9 == 0 else ""}{escape(data["title"])}</h3>
+            </a>
+            <div class="s-item__subtitle"><span class="SECONDARY_INFO">{data["condition"]}</span></div>
+            <div class="s-item__details">
+              <span class="s-item__price">${data["price"]:.2f}</span>
+            </div>
+          </div>
+        </li>""")
+    next_link = (f'<a aria-label="Next" href="{base_url}/sch/i.html?_nkw={quote_plus(keyword)}&_pgn={page + 1}">Next</a>'
+                 if page < pages else "")
+    return f"""<!DOCTYPE html>
+<html><head><title>{escape(keyword)} | eBay</title></head>
+<body><div class="srp-river-results"><ul class="srp-results">{"".join(items)}</ul></div>
+<nav class="pagination">{next_link}</nav>
+{filler_markup(item_id=page)}
+</body></html>"""
+
+
+def render_item_page(base_url, item_id):
+    data = listing(item_id)
+    breadcrumb = {
+        "@context": "https://schema.org",
+        "@type": "BreadcrumbList",
+        "itemListElement": [
+            {"@type": "ListItem", "position": i + 1, "name": name}
+            for i, name in enumerate(CATEGORY_PATH)
+        ],
+    }
+    status = ('<div data-testid="d-statusmessage"><span>Bidding ended on Mar 2, 2025</span></div>'
+              if data["ended"] else "")
+    auction = data["listing_type"] in ("auction", "auction_bin")
+    buttons = []
+    if auction:
+        buttons.append(f'<a id="bidBtn_btn" href="#">Place bid</a>')
+        buttons.append(f'<div data-testid="x-bid-count"><span>{data["bids"]} bids</span></div>')
+        buttons.append('<div class="ux-timer"><span class="ux-timer__text">Ends in</span>'
+                       '<span class="ux-timer__text">2d 4h</span></div>')
+    else:
+        buttons.append('<div class="ux-timer"><span class="ux-timer__text">Ends in 4d 7h</span></div>')
+    if data["listing_type"] in ("auction_bin", "fixed"):
+        buttons.append(f'<a id="binBtn_btn" href="#">Buy It Now</a>')
+    if data["listing_type"] == "auction_bin":
+        buttons.append(f'<div data-testid="x-bin-price"><span class="ux-textspans">US ${data["bin_price"]:.2f}</span></div>')
+    variation = ('<button class="listbox-button__control btn--form" value="Select">Select</button>'
+                 if data["multi_variation"] else "")
+    return f"""<!DOCTYPE html>
+<html><head>
+<title>{escape(data["title"])} | eBay</title>
+<meta property="og:title" content="{escape(data["title"])}">
+<meta property="og:image" content="{base_url}/img/{item_id}-l1600.jpg">
+<script type="application/ld+json">{json.dumps(breadcrumb)}</script>
+</head>
+<body>
+{status}
+<h1 class="x-item-title__mainTitle"><span>{escape(data["title"])}</span></h1>
+<div class="x-price-primary"><span>US ${data["price"]:.2f}</span></div>
+{variation}
+{"".join(buttons)}
+<div class="x-sellercard-atf"><div class="info__about-seller"><a href="#"><span>{data["seller"]}</span></a></div></div>
+{filler_markup(item_id)}
+</body></html>"""
+
+
+def filler_markup(item_id, blocks=400):
+    """
+    Contenu de remplissage (descriptions, carrousels, scripts) pour approcher
+    la taille et la profondeur d'une vraie page eBay (~200 Ko).
+    """
+    rng = random.Random(item_id * 7)
+    parts = []
+    for index in range(blocks):
+        parts.append(
+            f'<div class="ux-layout-section" data-idx="{index}"><div class="ux-labels-values">'
+            f'<span class="ux-textspans">Spec {index}</span>'
+            f'<span class="ux-textspans ux-textspans--BOLD">{rng.random():.6f} lorem ipsum dolor sit amet</span>'
+            f'</div></div>'
+        )
+    parts.append(f"<script>window.__data = {json.dumps({'k': [rng.random() for _ in range(500)]})};</script>")
+    return "\n".join(parts)
+
+
+CAPTCHA_PAGE = """<!DOCTYPE html>
+<html><head><title>Pardon Our Interruption...</title></head>
+<body><h1>Pardon Our Interruption</h1><p>Please verify you are a human.</p></body></html>"""
+
+
+class MockEbayHandler(BaseHTTPRequestHandler):
+    latency = 0.0
+    pages = 3
+    per_page = 60
+    captcha_rate = 0.0
+
+    def do_GET(self):
+        if self.latency:
+            time.sleep(self.latency)
+        parsed = urlparse(self.path)
+        query = parse_qs(parsed.query)
+        base_url = f"http://{self.headers.get('Host', 'localhost')}"
+        if parsed.path.startswith("/sch/"):
+            body = render_search_page(base_url, query.get("_nkw", [""])[0],
+                                      int(query.get("_pgn", ["1"])[0]), self.per_page, self.pages)
+        elif parsed.path.startswith("/itm/"):
+            if self.captcha_rate and random.random() < self.captcha_rate:
+                body = CAPTCHA_PAGE
+            else:
+                body = render_item_page(base_url, int(parsed.path.rsplit("/", 1)[-1]))
+        else:
+            self.send_error(404)
+            return
+        payload = body.encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def make_server(port=0, latency=0.0, pages=3, per_page=60, captcha_rate=0.0):
+    """
+    Crée le serveur (port 0 = port libre choisi par l'OS) ; à lancer avec serve_forever().
+    """
+    handler = type("ConfiguredMockEbayHandler", (MockEbayHandler,), {
+        "latency": latency, "pages": pages, "per_page": per_page, "captcha_rate": captcha_rate,
+    })
+    server = ThreadingHTTPServer(("", port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0, help="Latence ajoutée par réponse (s)")
+    parser.add_argument("--pages", type=int, default=3)
+    parser.add_argument("--per-page", type=int, default=60)
+    parser.add_argument("--captcha-rate", type=float, default=0.0, help="Part des pages d'annonce en CAPTCHA")
+    args = parser.parse_args()
+    server = make_server(args.port, args.latency, args.pages, args.per_page, args.captcha_rate)
+    print(f"Mock eBay sur http://127.0.0.1:{server.server_address[1]}/sch/i.html?_nkw=doom")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
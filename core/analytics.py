@@ -0,0 +1,254 @@
+# core/analytics.py
+"""
+Indicateurs de prix calculés en une passe vectorisée (NumPy) pour tout un lot
+de produits, voire tout le catalogue.
+
+L'historique est chargé en colonnes (product_id, timestamp, prix) triées par produit
+puis par date ; chaque produit occupe donc une tranche contiguë et les indicateurs
+se calculent par réductions segmentées (np.*.reduceat, sommes cumulées) sans boucle
+Python par produit :
+
+  - count, first_price / last_price, min_price / max_price, avg_price
+  - variation (%) entre premier et dernier prix et tendance up / down / stable
+    (seuil ±TREND_THRESHOLD, même règle que l'API)
+  - rolling_avg : moyenne des `window` derniers relevés
+  - volatility : écart-type (%) des variations relevé à relevé
+
+    python -m core.analytics --report
+    python -m core.analytics --report --window 14 --top 20 --product-id 42
+"""
+
+import argparse
+import numpy as np
+from core.db_connection import get_connection
+
+# Seuil de ±3% pour considérer une variation comme significative
+TREND_THRESHOLD = 3
+
+# Codes de tendance des tableaux vectorisés
+TRENDS = np.array(["stable", "up", "down"])
+
+# Relevés par défaut de la moyenne glissante
+DEFAULT_WINDOW = 7
+
+# Lignes lues par fetchmany au chargement
+LOAD_BATCH_SIZE = 50000
+
+
+def classify_trend(first_price, last_price):
+    """
+    Compare le premier et le dernier prix et retourne (trend, variation en %).
+    """
+    first_price = float(first_price)
+    last_price = float(last_price)
+
+    # Calculer le pourcentage de variation
+    if first_price > 0:
+        variation = ((last_price - first_price) / first_price) * 100
+    else:
+        variation = 0
+
+    if variation > TREND_THRESHOLD:
+        trend = "up"
+    elif variation < -TREND_THRESHOLD:
+        trend = "down"
+    else:
+        trend = "stable"
+    return trend, variation
+
+
+class PriceHistory:
+    """
+    Historique en colonnes : product_ids, timestamps (secondes) et prices, triés par
+    produit puis par date. starts[i] est l'index du premier relevé du i-ème produit
+    de `products`.
+    """
+
+    def __init__(self, product_ids, timestamps, prices):
+        self.product_ids = np.asarray(product_ids, dtype=np.int64)
+        self.timestamps = np.asarray(timestamps, dtype=np.float64)
+        self.prices = np.asarray(prices, dtype=np.float64)
+        if len(self.product_ids):
+            boundaries = np.flatnonzero(np.diff(self.product_ids)) + 1
+            self.starts = np.concatenate(([0], boundaries))
+        else:
+            self.starts = np.empty(0, dtype=np.int64)
+        self.products = self.product_ids[self.starts]
+
+    def __len__(self):
+        return len(self.prices)
+
+    @classmethod
+    def from_unsorted(cls, product_ids, timestamps, prices):
+        """Construit l'historique à partir de colonnes dans un ordre quelconque."""
+        product_ids = np.asarray(product_ids, dtype=np.int64)
+        timestamps = np.asarray(timestamps, dtype=np.float64)
+        order = np.lexsort((timestamps, product_ids))
+        return cls(product_ids[order], timestamps[order], np.asarray(prices, dtype=np.float64)[order])
+
+
+def load_price_history(cursor, product_ids=None, batch_size=LOAD_BATCH_SIZE):
+    """
+    Charge les relevés non nuls de price_history (tous les produits, ou seulement
+    product_ids) en colonnes NumPy, par lots de `batch_size` lignes.
+    """
+    where = "price IS NOT NULL AND date_scraped IS NOT NULL"
+    params = None
+    if product_ids is not None:
+        product_ids = list(product_ids)
+        if not product_ids:
+            return PriceHistory([], [], [])
+        where += f" AND product_id IN ({', '.join(['%s'] * len(product_ids))})"
+        params = product_ids
+
+    # CAST en DOUBLE : le connecteur renvoie des float au lieu de Decimal
+    cursor.execute(f"""
+        SELECT product_id, UNIX_TIMESTAMP(date_scraped), CAST(price AS DOUBLE)
+        FROM price_history
+        WHERE {where}
+        ORDER BY product_id, date_scraped
+    """, params)
+    chunks = []
+    while True:
+        rows = cursor.fetchmany(batch_size)
+        if not rows:
+            break
+        chunks.append(np.array(rows, dtype=np.float64))
+    if not chunks:
+        return PriceHistory([], [], [])
+    columns = np.concatenate(chunks)
+    return PriceHistory(columns[:, 0], columns[:, 1], columns[:, 2])
+
+
+def compute_analytics(history, window=DEFAULT_WINDOW):
+    """
+    Indicateurs de tous les produits de `history` en une passe.
+    Retourne un dict de tableaux alignés sur history.products (voir le docstring du module) ;
+    "trend" contient les libellés up / down / stable.
+    """
+    prices = history.prices
+    starts = history.starts
+    if not len(starts):
+        empty = np.empty(0)
+        return {
+            "product_id": history.products, "count": empty.astype(np.int64),
+            "first_price": empty, "last_price": empty, "min_price": empty, "max_price": empty,
+            "avg_price": empty, "variation": empty, "trend": TRENDS[:0],
+            "rolling_avg": empty, "volatility": empty,
+        }
+    ends = np.append(starts[1:], len(prices))
+    counts = ends - starts
+
+    first = prices[starts]
+    last = prices[ends - 1]
+    cumsum = np.concatenate(([0.0], np.cumsum(prices)))
+
+    # Variation premier / dernier prix ; un produit à un seul relevé reste stable
+    with np.errstate(divide="ignore", invalid="ignore"):
+        variation = np.where((first > 0) & (counts > 1), (last - first) / first * 100, 0.0)
+    trend_codes = np.select([variation > TREND_THRESHOLD, variation < -TREND_THRESHOLD], [1, 2], 0)
+
+    # Moyenne des `window` derniers relevés de chaque produit
+    window_starts = np.maximum(starts, ends - window)
+    rolling_avg = (cumsum[ends] - cumsum[window_starts]) / (ends - window_starts)
+
+    # Variations relevé à relevé, hors frontières entre produits et prix précédents nuls
+    returns = np.zeros(len(prices))
+    valid = np.zeros(len(prices), dtype=bool)
+    if len(prices) > 1:
+        previous = prices[:-1]
+        valid[1:] = (history.product_ids[1:] == history.product_ids[:-1]) & (previous > 0)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            returns[1:] = np.where(valid[1:], prices[1:] / previous - 1, 0.0)
+    return_counts = np.add.reduceat(valid.astype(np.int64), starts)
+    return_sums = np.add.reduceat(returns, starts)
+    return_squares = np.add.reduceat(returns * returns, starts)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean_return = return_sums / return_counts
+        variance = return_squares / return_counts - mean_return * mean_return
+    volatility = np.where(return_counts > 1, np.sqrt(np.clip(variance, 0, None)) * 100, 0.0)
+
+    return {
+        "product_id": history.products,
+        "count": counts,
+        "first_price": first,
+        "last_price": last,
+        "min_price": np.minimum.reduceat(prices, starts),
+        "max_price": np.maximum.reduceat(prices, starts),
+        "avg_price": (cumsum[ends] - cumsum[starts]) / counts,
+        "variation": variation,
+        "trend": TRENDS[trend_codes],
+        "rolling_avg": rolling_avg,
+        "volatility": volatility,
+    }
+
+
+def analytics_to_dicts(analytics):
+    """{product_id: {indicateur: valeur}} à partir des tableaux de compute_analytics."""
+    names = [name for name in analytics if name != "product_id"]
+    columns = [analytics[name].tolist() for name in names]
+    return {
+        product_id: {
+            name: round(value, 2) if isinstance(value, float) else value
+            for name, value in zip(names, values)
+        }
+        for product_id, *values in zip(analytics["product_id"].tolist(), *columns)
+    }
+
+
+def product_analytics(cursor, product_ids=None, window=DEFAULT_WINDOW):
+    """
+    API par lot : indicateurs de product_ids (ou de tout le catalogue) sous la forme
+    {product_id: {...}}. Les produits sans relevé sont absents.
+    """
+    history = load_price_history(cursor, product_ids)
+    return analytics_to_dicts(compute_analytics(history, window))
+
+
+def print_report(analytics, top):
+    count = len(analytics["product_id"])
+    print(f"{count} produits, {int(analytics['count'].sum())} relevés")
+    if not count:
+        return
+    for trend in TRENDS:
+        print(f"  {trend:<7} {int((analytics['trend'] == trend).sum())}")
+
+    def print_ranking(title, order):
+        print(f"\n{title}")
+        for i in order[:top]:
+            print(f"  #{analytics['product_id'][i]:<8} {analytics['variation'][i]:>+8.1f}%  "
+                  f"{analytics['first_price'][i]:>9.2f} -> {analytics['last_price'][i]:>9.2f}  "
+                  f"moy. glissante {analytics['rolling_avg'][i]:>9.2f}  "
+                  f"volatilité {analytics['volatility'][i]:>6.1f}%")
+
+    print_ranking("Plus fortes hausses", np.argsort(-analytics["variation"], kind="stable"))
+    print_ranking("Plus fortes baisses", np.argsort(analytics["variation"], kind="stable"))
+    print_ranking("Plus volatils", np.argsort(-analytics["volatility"], kind="stable"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Indicateurs de prix vectorisés sur tout le catalogue.")
+    parser.add_argument("--report", action="store_true", help="Affiche le rapport du catalogue.")
+    parser.add_argument("--product-id", type=int, action="append", dest="product_ids",
+                        help="Limite le rapport à ce produit (option répétable).")
+    parser.add_argument("--window", type=int, default=DEFAULT_WINDOW,
+                        help="Relevés de la moyenne glissante.")
+    parser.add_argument("--top", type=int, default=10, help="Produits par classement.")
+    args = parser.parse_args()
+
+    if not args.report:
+        parser.print_help()
+        return
+
+    conn = get_connection()
+    cursor = conn.cursor()
+    try:
+        history = load_price_history(cursor, args.product_ids)
+    finally:
+        cursor.close()
+        conn.close()
+    print_report(compute_analytics(history, max(1, args.window)), args.top)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,42 +1,141 @@
 import re
+import time
 import logging
+from collections import Counter, deque
+from urllib.parse import urlparse
 from scrapy.exceptions import IgnoreRequest
 from scrapy.http import TextResponse
+from core.middlewares import proxy_captcha, proxy_name
 
 logger = logging.getLogger(__name__)
 
+# Routes de la page de challenge d'eBay (redirection ou URL finale). Seul le chemin
+# est comparé : un mot-clé ou un titre d'annonce contenant "challenge" figure dans
+# la requête ou le slug des pages de recherche et d'annonce
+CAPTCHA_PATH_RE = re.compile(r"^/splashui/(?:captcha|challenge)", re.IGNORECASE)
+
+# Un seul motif précompilé, appliqué au <title> des premiers octets du corps :
+# les pages de CAPTCHA l'annoncent dans leur titre, et une page produit qui cite
+# "captcha" dans un script ne déclenche plus de faux positif
+CAPTCHA_TITLE_RE = re.compile(
+    rb"<title[^>]*>[^<]{0,200}?(?:captcha|please verify|pardon our interruption|are you a human)",
+    re.IGNORECASE,
+)
+
+# Seuls ces statuts peuvent porter une page de CAPTCHA ; les autres (404, 5xx...)
+# ne sont pas lus
+SCANNED_STATUSES = {200, 403, 429}
+REDIRECT_STATUSES = {301, 302, 303, 307, 308}
+
+
+def is_captcha_url(url):
+    """URL (absolue ou relative) d'une page de challenge d'eBay."""
+    return bool(CAPTCHA_PATH_RE.match(urlparse(url).path))
+
+
 class CaptchaDetectionMiddleware:
+    """
+    Détection de CAPTCHA par signaux du moins au plus coûteux :
+
+      1. statut de redirection dont la cible (Location) est une page de challenge ;
+      2. URL finale de la réponse (après RedirectMiddleware) ;
+      3. statut 200/403/429 : un motif précompilé sur le <title> des CAPTCHA_SCAN_BYTES
+         premiers octets, sans décoder le corps.
+
+    Une réponse CAPTCHA n'est plus abandonnée : le proxy fautif est signalé au pool
+    (signal proxy_captcha) et la requête est replanifiée sur un autre proxy, après une
+    attente CAPTCHA_BACKOFF_BASE * 2**essai secondes (plafonnée à CAPTCHA_BACKOFF_MAX,
+    appliquée par RandomDelayMiddleware), jusqu'à CAPTCHA_MAX_RETRIES essais.
+
+    Statistiques : captcha/detected (par signal), captcha/retried, captcha/given_up,
+    taux par proxy (captcha/proxy/<proxy>/rate) et par minute (captcha/last_minute,
+    captcha/peak_per_minute).
+    """
+
+    def __init__(self, crawler=None, max_retries=3, backoff_base=30.0, backoff_max=300.0, scan_bytes=32768):
+        self.crawler = crawler
+        self.stats = crawler.stats if crawler is not None else None
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.scan_bytes = scan_bytes
+        self.checked = Counter()    # réponses examinées par proxy
+        self.detected = Counter()   # CAPTCHA par proxy
+        self.recent = deque()       # instants (time.monotonic) des CAPTCHA de la dernière minute
+        self.peak_per_minute = 0
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        return cls(
+            crawler,
+            max_retries=settings.getint('CAPTCHA_MAX_RETRIES', 3),
+            backoff_base=settings.getfloat('CAPTCHA_BACKOFF_BASE', 30.0),
+            backoff_max=settings.getfloat('CAPTCHA_BACKOFF_MAX', 300.0),
+            scan_bytes=settings.getint('CAPTCHA_SCAN_BYTES', 32768),
+        )
+
+    def detect(self, response):
+        """Retourne le signal qui a identifié un CAPTCHA (redirect, url, title) ou None."""
+        if response.status in REDIRECT_STATUSES:
+            location = response.headers.get(b'Location', b'').decode('latin-1')
+            return "redirect" if is_captcha_url(location) else None
+        if response.status not in SCANNED_STATUSES:
+            return None
+        if is_captcha_url(response.url):
+            return "url"
+        # Uniquement les réponses textuelles, et sans passer par response.text
+        if isinstance(response, TextResponse) and CAPTCHA_TITLE_RE.search(response.body, 0, self.scan_bytes):
+            return "title"
+        return None
+
     def process_response(self, request, response, spider):
-        # Traiter uniquement les réponses textuelles
-        if not isinstance(response, TextResponse):
+        proxy = request.meta.get('proxy')
+        self.checked[proxy] += 1
+        signal = self.detect(response)
+        if signal is None:
             return response
 
-        # Liste des indicateurs de CAPTCHA
-        captcha_indicators = [
-            r"captcha",
-            r"please verify",
-            r"pardon our interruption",
-            r"are you a human"
-        ]
-
-        # Essayer d'obtenir le contenu en texte
-        try:
-            page_text = response.text
-        except Exception as e:
-            logger.debug(f"Erreur lors de l'accès à response.text: {e}")
-            try:
-                page_text = response.body.decode('utf-8', errors='ignore')
-            except Exception as e2:
-                logger.error(f"Erreur lors de la conversion du contenu en texte: {e2}")
-                page_text = ""
-
-        # Si aucun texte n'est disponible, ne pas effectuer de détection
-        if not page_text:
-            return response
+        self.record(proxy, signal)
+        # Signale le proxy fautif au pool (mise en quarantaine, voir ProxyMiddleware)
+        if self.crawler is not None:
+            self.crawler.signals.send_catch_log(proxy_captcha, request=request, proxy=proxy)
+
+        retries = request.meta.get('captcha_retries', 0)
+        if retries >= self.max_retries:
+            self.inc_stat('captcha/given_up')
+            logger.warning(f"CAPTCHA détecté sur {response.url} ({signal}), abandon après {retries} essais.")
+            raise IgnoreRequest(f"CAPTCHA détecté, abandon après {retries} essais.")
+
+        # Nouvelle tentative sur un autre proxy, après une attente croissante
+        delay = min(self.backoff_max, self.backoff_base * 2 ** retries)
+        retry = request.replace(dont_filter=True)
+        retry.meta['captcha_retries'] = retries + 1
+        retry.meta['proxy_exclude'] = set(request.meta.get('proxy_exclude', ())) | {proxy}
+        retry.meta['backoff_delay'] = delay
+        retry.meta.pop('proxy', None)
+        self.inc_stat('captcha/retried')
+        logger.warning(f"CAPTCHA détecté sur {response.url} ({signal}), nouvel essai {retries + 1}/"
+                       f"{self.max_retries} sur un autre proxy dans {delay:.0f}s.")
+        return retry
 
-        # Recherche d'indicateurs de CAPTCHA dans le contenu
-        if any(re.search(indicator, page_text, re.IGNORECASE) for indicator in captcha_indicators):
-            logger.warning(f"CAPTCHA détecté sur {response.url}. Changement de proxy ou pause nécessaire.")
-            raise IgnoreRequest("CAPTCHA détecté, requête ignorée pour changer de proxy.")
+    def record(self, proxy, signal):
+        now = time.monotonic()
+        self.detected[proxy] += 1
+        self.recent.append(now)
+        while self.recent and self.recent[0] <= now - 60:
+            self.recent.popleft()
+        self.peak_per_minute = max(self.peak_per_minute, len(self.recent))
+        if self.stats is None:
+            return
+        name = proxy_name(proxy) if proxy else "direct"
+        self.stats.inc_value('captcha/detected')
+        self.stats.inc_value(f'captcha/detected/{signal}')
+        self.stats.set_value(f'captcha/proxy/{name}', self.detected[proxy])
+        self.stats.set_value(f'captcha/proxy/{name}/rate', round(self.detected[proxy] / self.checked[proxy], 3))
+        self.stats.set_value('captcha/last_minute', len(self.recent))
+        self.stats.set_value('captcha/peak_per_minute', self.peak_per_minute)
 
-        return response
+    def inc_stat(self, key):
+        if self.stats is not None:
+            self.stats.inc_value(key)
@@ -1,19 +1,19 @@
 # core/category_mapping.py
 
-from core.db_connection import get_connection
+from core.db_connection import connection
+from core.category_resolver import get_category_resolver
 import difflib
 
 def get_category_id_by_exact_name(category_name):
     """
     Recherche une catégorie dont le nom correspond exactement.
     """
-    conn = get_connection()
-    cursor = conn.cursor()
-    sql = "SELECT category_id FROM category WHERE LOWER(name) = LOWER(%s) LIMIT 1"
-    cursor.execute(sql, (category_name,))
-    row = cursor.fetchone()
-    cursor.close()
-    conn.close()
+    with connection() as conn:
+        cursor = conn.cursor()
+        sql = "SELECT category_id FROM category WHERE LOWER(name) = LOWER(%s) LIMIT 1"
+        cursor.execute(sql, (category_name,))
+        row = cursor.fetchone()
+        cursor.close()
     if row:
         return row[0]
     return None
@@ -23,14 +23,13 @@ def get_category_id_by_similarity(category_name, cutoff=0.8):
     Recherche une catégorie dans la table qui ressemble beaucoup à 'category_name'
     en utilisant difflib (distance de similarité).
     """
-    conn = get_connection()
-    cursor = conn.cursor()
-    # Récupérer tous les noms de catégories et leurs IDs
-    sql = "SELECT category_id, name FROM category"
-    cursor.execute(sql)
-    results = cursor.fetchall()
-    cursor.close()
-    conn.close()
+    with connection() as conn:
+        cursor = conn.cursor()
+        # Récupérer tous les noms de catégories et leurs IDs
+        sql = "SELECT category_id, name FROM category"
+        cursor.execute(sql)
+        results = cursor.fetchall()
+        cursor.close()
 
     # Créer une liste des noms en minuscule
     candidates = {name.lower(): cat_id for cat_id, name in results}
@@ -57,15 +56,13 @@ def map_category(category_str):
     """
     Retourne l'ID de la catégorie correspondant à category_str en travaillant
     uniquement avec le dernier segment pertinent.
+    La recherche (exacte puis par similarité) se fait sur l'index en mémoire
+    de core.category_resolver, chargé une fois par processus.
     """
     if not category_str:
         return None
     leaf_category = extract_leaf_category(category_str)
-    cat_id = get_category_id_by_exact_name(leaf_category)
-    if cat_id:
-        return cat_id
-    cat_id = get_category_id_by_similarity(leaf_category)
-    return cat_id
+    return get_category_resolver().resolve(leaf_category)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,220 @@
+# core/category_resolver.py
+"""
+Résolution en mémoire des catégories eBay (remplace les deux requêtes SQL
+et le difflib sur toute la table faits à chaque item par map_category).
+
+La taxonomie est chargée une fois par processus puis indexée :
+  - table de hachage sur le nom normalisé (correspondance exacte) ;
+  - index de trigrammes pour ne soumettre au score difflib qu'une poignée de candidats ;
+  - cache LRU des résultats par chaîne de catégorie.
+
+L'index est rechargé quand fetch_categories met à jour la table : directement dans
+le même processus (invalidate()), sinon via une signature de la table vérifiée
+au plus toutes les `refresh_interval` secondes.
+"""
+
+import difflib
+import threading
+import time
+from collections import OrderedDict, defaultdict, namedtuple
+
+from core.db_connection import connection
+
+# Même seuil que get_category_id_by_similarity
+DEFAULT_CUTOFF = 0.8
+
+
+def normalize_name(name):
+    """Minuscules et espaces normalisés."""
+    return " ".join(name.lower().split())
+
+
+def trigrams(text):
+    padded = f" {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+# Index complet d'une taxonomie : construit hors verrou, puis publié d'un seul
+# coup (une affectation de référence) pour qu'aucun thread ne lise un index à moitié construit
+CategoryIndex = namedtuple("CategoryIndex", ["exact", "names", "by_trigram", "by_length"])
+
+
+class CategoryResolver:
+    def __init__(self, cutoff=DEFAULT_CUTOFF, cache_size=4096, max_candidates=50,
+                 refresh_interval=300, loader=None):
+        self.cutoff = cutoff
+        self.cache_size = cache_size
+        self.max_candidates = max_candidates
+        self.refresh_interval = refresh_interval
+        self.loader = loader or load_categories_from_db
+        self._lock = threading.RLock()
+        self._cache = OrderedDict()
+        self._index = CategoryIndex({}, {}, {}, {})
+        self._loaded = False
+        self._signature = None
+        self._last_check = 0.0
+        self.hits = 0
+        self.misses = 0
+
+    # --- Chargement / index ---
+
+    def load(self, rows, signature=None):
+        """
+        Construit l'index à partir de lignes (category_id, name).
+        """
+        exact = {}
+        names = {}
+        by_trigram = defaultdict(list)
+        by_length = defaultdict(list)
+        for category_id, name in rows:
+            if not name:
+                continue
+            key = normalize_name(name)
+            # Comme la requête SQL d'origine : premier rencontré pour l'exact,
+            # dernier pour le dictionnaire de similarité
+            exact.setdefault(key, category_id)
+            if key not in names:
+                for gram in trigrams(key):
+                    by_trigram[gram].append(key)
+                by_length[len(key)].append(key)
+            names[key] = category_id
+        index = CategoryIndex(exact, names, dict(by_trigram), dict(by_length))
+        with self._lock:
+            self._index = index
+            self._cache.clear()
+            self._signature = signature
+            self._last_check = time.monotonic()
+            self._loaded = True
+
+    def invalidate(self):
+        """Force un rechargement au prochain appel (après fetch_categories)."""
+        with self._lock:
+            self._loaded = False
+            self._cache.clear()
+
+    def _ensure_loaded(self):
+        now = time.monotonic()
+        if self._loaded and now - self._last_check < self.refresh_interval:
+            return
+        with self._lock:
+            if self._loaded and now - self._last_check < self.refresh_interval:
+                return
+            signature = current_signature() if self.loader is load_categories_from_db else None
+            if self._loaded and signature == self._signature:
+                self._last_check = now
+                return
+            self.load(self.loader(), signature)
+
+    # --- Résolution ---
+
+    def resolve(self, leaf_category):
+        """
+        Retourne le category_id correspondant au nom de catégorie feuille, ou None.
+        """
+        if not leaf_category:
+            return None
+        self._ensure_loaded()
+        with self._lock:
+            if leaf_category in self._cache:
+                self._cache.move_to_end(leaf_category)
+                self.hits += 1
+                return self._cache[leaf_category]
+            self.misses += 1
+            # Toute la résolution se fait sur le même index, même si un rechargement le remplace
+            index = self._index
+
+        key = normalize_name(leaf_category)
+        category_id = index.exact.get(key)
+        if category_id is None:
+            category_id = self._fuzzy(index, key)
+
+        with self._lock:
+            self._cache[leaf_category] = category_id
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return category_id
+
+    def _candidates(self, index, key):
+        # Borne de longueur : ratio <= 2*min(la, lb)/(la + lb), donc seules ces longueurs
+        # peuvent atteindre le seuil.
+        length = len(key)
+        min_len = length * self.cutoff / (2 - self.cutoff)
+        max_len = length * (2 - self.cutoff) / self.cutoff
+
+        if length < 3:
+            # Trop court pour les trigrammes : on parcourt les longueurs compatibles
+            return [name for size, names in index.by_length.items()
+                    if min_len <= size <= max_len for name in names]
+
+        shared = defaultdict(int)
+        for gram in trigrams(key):
+            for name in index.by_trigram.get(gram, ()):
+                shared[name] += 1
+        ranked = sorted(
+            (name for name in shared if min_len <= len(name) <= max_len),
+            key=lambda name: shared[name],
+            reverse=True
+        )
+        return ranked[:self.max_candidates]
+
+    def _fuzzy(self, index, key):
+        """
+        Même critère que difflib.get_close_matches(n=1), mais seulement sur les candidats
+        qui partagent le plus de trigrammes avec la chaîne recherchée.
+        """
+        matcher = difflib.SequenceMatcher()
+        matcher.set_seq2(key)
+        best = None
+        for name in self._candidates(index, key):
+            matcher.set_seq1(name)
+            if (matcher.real_quick_ratio() >= self.cutoff and
+                    matcher.quick_ratio() >= self.cutoff):
+                score = matcher.ratio()
+                if score >= self.cutoff and (best is None or (score, name) > best):
+                    best = (score, name)
+        return index.names[best[1]] if best else None
+
+    def stats(self):
+        with self._lock:
+            return {
+                "categories": len(self._index.names) if self._loaded else 0,
+                "cache_size": len(self._cache),
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+def load_categories_from_db():
+    with connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT category_id, name FROM category ORDER BY category_id")
+        rows = cursor.fetchall()
+        cursor.close()
+    return rows
+
+
+def current_signature():
+    """
+    Signature bon marché de la table category (nombre de lignes + somme des CRC des noms),
+    pour détecter une mise à jour faite par un autre processus.
+    """
+    with connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT COUNT(*), COALESCE(SUM(CRC32(name)), 0) FROM category")
+        row = cursor.fetchone()
+        cursor.close()
+    return tuple(int(value) for value in row)
+
+
+_resolver = None
+_resolver_lock = threading.Lock()
+
+
+def get_category_resolver():
+    """Resolver partagé du processus."""
+    global _resolver
+    if _resolver is None:
+        with _resolver_lock:
+            if _resolver is None:
+                _resolver = CategoryResolver()
+    return _resolver
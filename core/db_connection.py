@@ -1,5 +1,10 @@
 import mysql.connector
 import os
+import threading
+import time
+import weakref
+from collections import deque
+from contextlib import contextmanager
 from dotenv import load_dotenv
 
 load_dotenv()  # Charge toutes les variables du .env
@@ -9,10 +14,21 @@ DB_HOST = os.getenv("DB_HOST", "localhost")
 DB_PORT = int(os.getenv("DB_PORT", 3306))
 DB_USER = os.getenv("DB_USER", "root")
 DB_PASSWORD = os.getenv("DB_PASSWORD", "")
-DB_NAME = os.getenv("DB_NAME", "price_tracker_us")  
+DB_NAME = os.getenv("DB_NAME", "price_tracker_us")
 
-def get_connection():
-    conn = mysql.connector.connect(
+# Pool de connexions (un pool par processus)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 5))                    # connexions ouvertes max
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", 10))           # attente max d'une connexion (s)
+DB_POOL_RECYCLE = float(os.getenv("DB_POOL_RECYCLE", 1800))         # durée de vie max d'une connexion (s)
+DB_POOL_PING_AFTER = float(os.getenv("DB_POOL_PING_AFTER", 30))     # ping si inutilisée depuis (s)
+
+
+class PoolTimeoutError(mysql.connector.errors.PoolError):
+    """Aucune connexion disponible dans le délai DB_POOL_TIMEOUT."""
+
+
+def _connect():
+    return mysql.connector.connect(
         host=DB_HOST,
         port=DB_PORT,
         user=DB_USER,
@@ -21,4 +37,255 @@ def get_connection():
         charset='utf8mb4',
         use_unicode=True
     )
-    return conn
+
+
+class PooledConnection:
+    """
+    Enveloppe d'une connexion MySQL empruntée au pool.
+    S'utilise comme une connexion classique ; close() la rend au pool au lieu de la fermer.
+    Une enveloppe jamais fermée (exception avant close() hors de connection()) libère
+    sa place du pool quand elle est collectée : la connexion est alors fermée, pas rendue.
+    """
+
+    def __init__(self, pool, raw, created_at):
+        self._pool = pool
+        self._raw = raw
+        self._created_at = created_at
+        self._pid = os.getpid()
+        # Ne doit pas référencer self, sinon l'enveloppe ne serait jamais collectée
+        self._finalizer = weakref.finalize(self, pool._reclaim, raw, self._pid)
+        self._finalizer.atexit = False
+
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
+
+    def close(self):
+        if self._raw is not None:
+            raw, self._raw = self._raw, None
+            self._finalizer.detach()
+            self._pool._release(raw, self._created_at, self._pid)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class ConnectionPool:
+    """
+    Pool de connexions MySQL thread-safe :
+      - au plus `size` connexions ouvertes, attente bornée par `timeout` ;
+      - connexions recyclées après `recycle` secondes ;
+      - ping des connexions restées inactives plus de `ping_after` secondes ;
+      - réinitialisé automatiquement dans un processus forké (workers gunicorn, multiprocessing),
+        les sockets héritées du parent n'étant jamais réutilisées.
+    """
+
+    def __init__(self, size=DB_POOL_SIZE, timeout=DB_POOL_TIMEOUT, recycle=DB_POOL_RECYCLE,
+                 ping_after=DB_POOL_PING_AFTER, factory=_connect):
+        self.size = size
+        self.timeout = timeout
+        self.recycle = recycle
+        self.ping_after = ping_after
+        self.factory = factory
+        self._cond = threading.Condition()
+        self._reset_state()
+
+    def _reset_state(self):
+        self._pid = os.getpid()
+        self._idle = deque()   # (connexion, créée à, dernière utilisation)
+        self._open = 0
+        self._in_use = 0
+        self._stats = {
+            "created": 0,
+            "recycled": 0,
+            "health_check_failures": 0,
+            "waits": 0,
+            "wait_time_total": 0.0,
+            "wait_time_max": 0.0,
+            "timeouts": 0,
+            "leaked": 0,
+        }
+
+    def _check_pid(self):
+        if self._pid != os.getpid():
+            # Processus enfant : on abandonne l'état hérité sans toucher aux sockets du parent
+            self._cond = threading.Condition()
+            self._reset_state()
+
+    def acquire(self):
+        self._check_pid()
+        deadline = None
+        wait_start = None
+        with self._cond:
+            while True:
+                if self._idle:
+                    raw, created_at, last_used = self._idle.pop()
+                    self._in_use += 1
+                    break
+                if self._open < self.size:
+                    raw, created_at, last_used = None, None, None
+                    self._open += 1
+                    self._in_use += 1
+                    break
+                # Pool épuisé : on attend qu'une connexion soit rendue
+                now = time.monotonic()
+                if wait_start is None:
+                    wait_start = now
+                    deadline = now + self.timeout
+                    self._stats["waits"] += 1
+                remaining = deadline - now
+                if remaining <= 0:
+                    self._stats["timeouts"] += 1
+                    self._record_wait(now - wait_start)
+                    raise PoolTimeoutError(
+                        f"Aucune connexion MySQL disponible après {self.timeout}s (pool de {self.size})"
+                    )
+                self._cond.wait(remaining)
+            if wait_start is not None:
+                self._record_wait(time.monotonic() - wait_start)
+
+        try:
+            raw, created_at = self._checkout(raw, created_at, last_used)
+        except Exception:
+            with self._cond:
+                self._open -= 1
+                self._in_use -= 1
+                self._cond.notify()
+            raise
+        return PooledConnection(self, raw, created_at)
+
+    def _record_wait(self, waited):
+        self._stats["wait_time_total"] += waited
+        self._stats["wait_time_max"] = max(self._stats["wait_time_max"], waited)
+
+    def _count(self, key):
+        with self._cond:
+            self._stats[key] += 1
+
+    def _checkout(self, raw, created_at, last_used):
+        """
+        Vérifie (ou crée) la connexion sortie du pool, hors verrou.
+        """
+        now = time.monotonic()
+        if raw is not None and now - created_at > self.recycle:
+            self._close_quietly(raw)
+            self._count("recycled")
+            raw = None
+        elif raw is not None and now - last_used > self.ping_after:
+            try:
+                raw.ping(reconnect=False)
+            except Exception:
+                self._close_quietly(raw)
+                self._count("health_check_failures")
+                raw = None
+        if raw is None:
+            raw = self.factory()
+            created_at = time.monotonic()
+            self._count("created")
+        return raw, created_at
+
+    def _release(self, raw, created_at, borrowed_pid):
+        if borrowed_pid != os.getpid() or borrowed_pid != self._pid:
+            return  # Connexion empruntée avant un fork : elle n'appartient pas au pool de ce processus
+        try:
+            # Termine toute transaction en cours pour ne pas rendre une connexion
+            # avec un snapshot ou des verrous encore ouverts.
+            raw.rollback()
+            healthy = True
+        except Exception:
+            self._close_quietly(raw)
+            self._count("health_check_failures")
+            healthy = False
+        with self._cond:
+            self._in_use -= 1
+            if healthy:
+                self._idle.append((raw, created_at, time.monotonic()))
+            else:
+                self._open -= 1
+            self._cond.notify()
+
+    def _reclaim(self, raw, borrowed_pid):
+        """
+        Finaliseur d'une connexion empruntée puis perdue sans close() : son état
+        (transaction, résultats non lus) est inconnu, on la ferme et on libère sa place.
+        """
+        if borrowed_pid != os.getpid() or borrowed_pid != self._pid:
+            return
+        self._close_quietly(raw)
+        with self._cond:
+            self._stats["leaked"] += 1
+            self._in_use -= 1
+            self._open -= 1
+            self._cond.notify()
+
+    @staticmethod
+    def _close_quietly(raw):
+        try:
+            raw.close()
+        except Exception:
+            pass
+
+    def close_all(self):
+        """
+        Ferme les connexions inactives du pool (par exemple en fin de script).
+        """
+        with self._cond:
+            while self._idle:
+                raw, _created_at, _last_used = self._idle.pop()
+                self._close_quietly(raw)
+                self._open -= 1
+
+    def stats(self):
+        with self._cond:
+            stats = dict(self._stats)
+            stats.update({
+                "size": self.size,
+                "open": self._open,
+                "in_use": self._in_use,
+                "idle": len(self._idle),
+            })
+        stats["wait_time_avg"] = stats["wait_time_total"] / stats["waits"] if stats["waits"] else 0.0
+        return stats
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """Pool partagé du processus, créé au premier usage."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool()
+    return _pool
+
+
+def get_connection():
+    """
+    Emprunte une connexion au pool. conn.close() la rend au pool.
+    Préférer le gestionnaire de contexte connection().
+    """
+    return get_pool().acquire()
+
+
+@contextmanager
+def connection():
+    """
+    with connection() as conn:
+        ...
+    Rend la connexion au pool en sortie de bloc (transaction non commitée annulée).
+    """
+    conn = get_connection()
+    try:
+        yield conn
+    finally:
+        conn.close()
+
+
+def pool_stats():
+    """Statistiques du pool du processus courant (dimensionnement)."""
+    return get_pool().stats()
@@ -0,0 +1,51 @@
+# core/downsampling.py
+"""
+Réduction des séries de prix pour les graphiques.
+
+LTTB (Largest-Triangle-Three-Buckets, S. Steinarsson, 2013) garde `threshold`
+points choisis pour préserver la forme visuelle de la courbe : le premier et le
+dernier point sont conservés, puis chaque tranche garde le point qui forme le plus
+grand triangle avec le point retenu précédemment et la moyenne de la tranche suivante.
+Les pics et les creux survivent, contrairement à une moyenne ou un échantillonnage fixe.
+"""
+
+
+def lttb(points, threshold):
+    """
+    points : liste de (x, y) triée par x (x numérique, ex. timestamp).
+    Retourne au plus `threshold` points de la liste d'origine (threshold >= 3).
+    """
+    n = len(points)
+    if threshold >= n or threshold < 3:
+        return list(points)
+
+    sampled = [points[0]]
+    # Tranches de taille égale entre le premier et le dernier point
+    every = (n - 2) / (threshold - 2)
+    a = 0  # Index du dernier point retenu
+
+    for i in range(threshold - 2):
+        # Moyenne de la tranche suivante (troisième sommet du triangle)
+        next_start = int((i + 1) * every) + 1
+        next_end = min(int((i + 2) * every) + 1, n)
+        next_count = next_end - next_start
+        avg_x = sum(points[j][0] for j in range(next_start, next_end)) / next_count
+        avg_y = sum(points[j][1] for j in range(next_start, next_end)) / next_count
+
+        # Point de la tranche courante qui maximise l'aire du triangle
+        start = int(i * every) + 1
+        end = int((i + 1) * every) + 1
+        ax, ay = points[a]
+        max_area = -1.0
+        chosen = start
+        for j in range(start, end):
+            x, y = points[j]
+            area = abs((ax - avg_x) * (y - ay) - (ax - x) * (avg_y - ay))
+            if area > max_area:
+                max_area = area
+                chosen = j
+        sampled.append(points[chosen])
+        a = chosen
+
+    sampled.append(points[-1])
+    return sampled
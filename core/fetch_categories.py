@@ -1,6 +1,8 @@
 # core/fetch_categories.py
 
 from core.db_connection import get_connection
+from core.category_resolver import get_category_resolver
+from core.response_cache import invalidate_all
 from core.ebay_taxonomy import (
     get_oauth_token,
     get_default_category_tree_id,
@@ -41,10 +43,14 @@ def main():
 
     root_node = tree_data["rootCategoryNode"]
     store_categories_recursively(root_node, cursor)
+    # Les réponses de l'API incluent le nom de catégorie
+    invalidate_all(cursor)
 
     conn.commit()
     cursor.close()
     conn.close()
+    # Les autres processus détectent le changement via la signature de la table
+    get_category_resolver().invalidate()
     print("Insertion des catégories terminée.")
 
 if __name__ == "__main__":
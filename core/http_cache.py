@@ -0,0 +1,315 @@
+# core/http_cache.py
+"""
+Cache HTTP sur disque des pages eBay, partagé par le spider (HttpCacheMiddleware)
+et refresh_products.py.
+
+Chaque réponse est stockée compressée (zstd) dans un fichier par URL ; un index
+SQLite garde l'URL finale, le statut, l'expiration, les validateurs (ETag,
+Last-Modified), la taille et le dernier accès. La durée de vie dépend du type de page :
+
+  - "search"  : page de résultats (/sch/) ;
+  - "auction" : annonce en cours avec enchères (son prix bouge jusqu'à la fin) ;
+  - "item"    : annonce en cours à prix fixe ;
+  - "ended"   : annonce terminée (ou redirigée vers une autre annonce), qui ne change plus.
+
+Une entrée expirée qui a un validateur est revalidée par une requête conditionnelle
+(If-None-Match / If-Modified-Since) : un 304 resert le corps en cache. Au-delà de
+max_bytes, les entrées les moins récemment lues sont supprimées.
+
+    python -m core.http_cache --stats
+    python -m core.http_cache --clear
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import shutil
+import sqlite3
+import threading
+import time
+
+import zstandard
+
+# Durées de vie par défaut (secondes), par type de page
+DEFAULT_TTLS = {
+    "search": 600,
+    "auction": 300,
+    "item": 6 * 3600,
+    "ended": 30 * 86400,
+}
+DEFAULT_DIR = ".httpcache"
+DEFAULT_MAX_BYTES = 1024 * 1024 * 1024
+
+# Après une éviction, on redescend à cette fraction de max_bytes
+EVICT_TARGET = 0.9
+
+# Marqueurs bruts (octets) du type de page, mêmes phrases que scrapers/extraction.py
+ENDED_RE = re.compile(
+    rb"this listing sold on|bidding ended on|this listing was ended by the seller|item sold on",
+    re.IGNORECASE,
+)
+AUCTION_MARKERS = (b"bidBtn_btn", b"x-bid-count")
+
+# En-têtes de réponse conservés
+KEPT_HEADERS = {"content-type", "etag", "last-modified", "content-language"}
+
+
+def item_id(url):
+    return url.split("/itm/")[1].split("?")[0] if "/itm/" in url else None
+
+
+def page_kind(url, final_url, body):
+    """Type de page ("search", "auction", "item" ou "ended") qui fixe la durée de vie."""
+    if "/sch/" in url:
+        return "search"
+    # Annonce redirigée vers une autre : le spider la marque terminée
+    if item_id(url) != item_id(final_url) or ENDED_RE.search(body):
+        return "ended"
+    if any(marker in body for marker in AUCTION_MARKERS):
+        return "auction"
+    return "item"
+
+
+class CacheEntry:
+    """Ligne de l'index ; body et headers sont lus par HttpCache.load."""
+
+    def __init__(self, key, url, final_url, status, kind, stored_at, expires_at,
+                 etag, last_modified, size, raw_size):
+        self.key = key
+        self.url = url
+        self.final_url = final_url
+        self.status = status
+        self.kind = kind
+        self.stored_at = stored_at
+        self.expires_at = expires_at
+        self.etag = etag
+        self.last_modified = last_modified
+        self.size = size
+        self.raw_size = raw_size
+
+    def fresh(self, now):
+        return self.expires_at > now
+
+    def validators(self):
+        """En-têtes d'une requête conditionnelle ({} si la réponse n'avait aucun validateur)."""
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+class HttpCache:
+    def __init__(self, directory=DEFAULT_DIR, max_bytes=DEFAULT_MAX_BYTES, ttls=None,
+                 level=3, clock=time.time):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.ttls = dict(DEFAULT_TTLS, **(ttls or {}))
+        self.clock = clock
+        self.compressor = zstandard.ZstdCompressor(level=level)
+        self.decompressor = zstandard.ZstdDecompressor()
+        # Le spider (reactor) et refresh_products (thread d'écriture) partagent l'index
+        self.lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self.db = sqlite3.connect(os.path.join(directory, "index.sqlite"), check_same_thread=False,
+                                  isolation_level=None)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS entry (
+                key TEXT PRIMARY KEY,
+                url TEXT NOT NULL,
+                final_url TEXT NOT NULL,
+                status INTEGER NOT NULL,
+                kind TEXT NOT NULL,
+                stored_at REAL NOT NULL,
+                expires_at REAL NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                size INTEGER NOT NULL,
+                raw_size INTEGER NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+        """)
+        self.db.execute("CREATE INDEX IF NOT EXISTS entry_accessed ON entry (accessed_at)")
+        self.total_bytes = self.db.execute("SELECT COALESCE(SUM(size), 0) FROM entry").fetchone()[0]
+        self.stats = {"lookups": 0, "hits": 0, "revalidated": 0, "misses": 0, "stale": 0,
+                      "stored": 0, "evicted": 0, "bytes_saved": 0, "bytes_stored": 0}
+
+    @classmethod
+    def from_settings(cls, settings):
+        """Construit le cache à partir des réglages HTTP_CACHE_* (Settings Scrapy ou module)."""
+        get = settings.get if hasattr(settings, "get") else lambda name, default=None: getattr(settings, name, default)
+        return cls(
+            directory=get("HTTP_CACHE_DIR", DEFAULT_DIR),
+            max_bytes=int(float(get("HTTP_CACHE_MAX_MB", DEFAULT_MAX_BYTES / 1024 / 1024)) * 1024 * 1024),
+            ttls=get("HTTP_CACHE_TTL", None),
+        )
+
+    @staticmethod
+    def key(url):
+        return hashlib.sha1(url.encode("utf-8")).hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.directory, key[:2], key + ".zst")
+
+    # --- Lecture ---
+
+    def lookup(self, url):
+        """Entrée de l'URL (fraîche ou expirée), ou None. Compte l'accès dans les statistiques."""
+        self.stats["lookups"] += 1
+        with self.lock:
+            row = self.db.execute("""
+                SELECT key, url, final_url, status, kind, stored_at, expires_at,
+                       etag, last_modified, size, raw_size
+                FROM entry WHERE key = ?
+            """, (self.key(url),)).fetchone()
+        if row is None:
+            self.stats["misses"] += 1
+            return None
+        entry = CacheEntry(*row)
+        if not entry.fresh(self.clock()):
+            self.stats["stale"] += 1
+        return entry
+
+    def load(self, entry):
+        """(headers, body) d'une entrée ; None si son fichier a disparu (éviction concurrente)."""
+        try:
+            with open(self.path(entry.key), "rb") as f:
+                data = self.decompressor.decompress(f.read())
+        except (OSError, zstandard.ZstdError):
+            return None
+        header, body = data.split(b"\n", 1)
+        with self.lock:
+            self.db.execute("UPDATE entry SET accessed_at = ? WHERE key = ?", (self.clock(), entry.key))
+        return json.loads(header), body
+
+    def hit(self, entry):
+        """Réponse fraîche servie depuis le cache : tout le corps est économisé."""
+        self.stats["hits"] += 1
+        self.stats["bytes_saved"] += entry.raw_size
+
+    def revalidated(self, entry, headers=None):
+        """
+        Réponse 304 à une requête conditionnelle : l'entrée repart pour une durée de
+        vie complète (nouveaux validateurs éventuels dans `headers`).
+        """
+        self.stats["revalidated"] += 1
+        self.stats["bytes_saved"] += entry.raw_size
+        headers = {name.lower(): value for name, value in (headers or {}).items()}
+        now = self.clock()
+        entry.expires_at = now + self.ttls[entry.kind]
+        entry.etag = headers.get("etag", entry.etag)
+        entry.last_modified = headers.get("last-modified", entry.last_modified)
+        with self.lock:
+            self.db.execute("""
+                UPDATE entry SET expires_at = ?, etag = ?, last_modified = ?, accessed_at = ?
+                WHERE key = ?
+            """, (entry.expires_at, entry.etag, entry.last_modified, now, entry.key))
+
+    # --- Écriture ---
+
+    def store(self, url, final_url, status, headers, body):
+        """
+        Enregistre une réponse 200. `headers` est une liste de paires (nom, valeur) ;
+        seuls KEPT_HEADERS sont gardés. Retourne l'entrée créée.
+        """
+        kept = [(name, value) for name, value in headers if name.lower() in KEPT_HEADERS]
+        validators = {name.lower(): value for name, value in kept}
+        kind = page_kind(url, final_url, body)
+        data = self.compressor.compress(json.dumps(kept).encode("utf-8") + b"\n" + body)
+        now = self.clock()
+        entry = CacheEntry(self.key(url), url, final_url, status, kind, now, now + self.ttls[kind],
+                           validators.get("etag"), validators.get("last-modified"), len(data), len(body))
+
+        path = self.path(entry.key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+        with self.lock:
+            previous = self.db.execute("SELECT size FROM entry WHERE key = ?", (entry.key,)).fetchone()
+            self.db.execute("""
+                INSERT OR REPLACE INTO entry
+                    (key, url, final_url, status, kind, stored_at, expires_at,
+                     etag, last_modified, size, raw_size, accessed_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, (entry.key, url, final_url, status, kind, now, entry.expires_at,
+                  entry.etag, entry.last_modified, entry.size, entry.raw_size, now))
+            self.total_bytes += entry.size - (previous[0] if previous else 0)
+        self.stats["stored"] += 1
+        self.stats["bytes_stored"] += entry.size
+        if self.total_bytes > self.max_bytes:
+            self.evict()
+        return entry
+
+    def evict(self):
+        """Supprime les entrées les moins récemment lues jusqu'à EVICT_TARGET * max_bytes."""
+        target = self.max_bytes * EVICT_TARGET
+        with self.lock:
+            rows = self.db.execute("SELECT key, size FROM entry ORDER BY accessed_at").fetchall()
+            removed = []
+            for key, size in rows:
+                if self.total_bytes <= target:
+                    break
+                removed.append(key)
+                self.total_bytes -= size
+            self.db.executemany("DELETE FROM entry WHERE key = ?", [(key,) for key in removed])
+        for key in removed:
+            try:
+                os.remove(self.path(key))
+            except OSError:
+                pass
+        self.stats["evicted"] += len(removed)
+
+    def clear(self):
+        with self.lock:
+            self.db.close()
+            shutil.rmtree(self.directory, ignore_errors=True)
+
+    # --- Rapport ---
+
+    def hit_rate(self):
+        lookups = self.stats["lookups"]
+        return (self.stats["hits"] + self.stats["revalidated"]) / lookups if lookups else 0.0
+
+    def summary(self):
+        """Statistiques de la session (ce processus) : hits, revalidations, octets économisés..."""
+        return dict(self.stats, hit_rate=round(self.hit_rate(), 3), total_bytes=self.total_bytes)
+
+    def contents(self):
+        """Contenu de l'index par type de page : entrées, fraîches, octets compressés et bruts."""
+        with self.lock:
+            return self.db.execute("""
+                SELECT kind, COUNT(*), SUM(expires_at > ?), SUM(size), SUM(raw_size)
+                FROM entry GROUP BY kind ORDER BY kind
+            """, (self.clock(),)).fetchall()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cache HTTP sur disque des pages eBay.")
+    parser.add_argument("--stats", action="store_true", help="Affiche le contenu du cache par type de page.")
+    parser.add_argument("--clear", action="store_true", help="Vide le cache.")
+    args = parser.parse_args()
+
+    from scrapers import settings
+    cache = HttpCache.from_settings(settings)
+    if args.clear:
+        cache.clear()
+        print(f"Cache {cache.directory} vidé.")
+    elif args.stats:
+        print(f"{'type':<8} {'entrées':>8} {'fraîches':>9} {'Mo':>8} {'Mo bruts':>9}")
+        for kind, count, fresh, size, raw_size in cache.contents():
+            print(f"{kind:<8} {count:>8} {fresh:>9} {size / 1e6:>8.1f} {raw_size / 1e6:>9.1f}")
+        print(f"total {cache.total_bytes / 1e6:.1f} Mo sur {cache.max_bytes / 1e6:.0f} Mo")
+    else:
+        parser.print_help()
+
+
+if __name__ == "__main__":
+    main()
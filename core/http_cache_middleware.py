@@ -0,0 +1,106 @@
+import logging
+from scrapy import signals
+from scrapy.exceptions import NotConfigured
+from scrapy.http import HtmlResponse
+from core.http_cache import HttpCache
+
+logger = logging.getLogger(__name__)
+
+
+class HttpCacheMiddleware:
+    """
+    Sert les pages de recherche et d'annonce depuis le cache disque (core/http_cache.py).
+
+    Placé avant ProxyMiddleware et RandomDelayMiddleware : un hit ne prend ni proxy
+    ni délai de politesse. Une entrée expirée avec validateur part en requête
+    conditionnelle ; un 304 est remplacé par la page en cache. Les réponses 200 sont
+    enregistrées sous l'URL demandée à l'origine (avant redirection) avec leur URL
+    finale, pour que parse_item voie la même redirection qu'en ligne.
+
+    request.meta['dont_cache'] désactive le cache pour une requête. Les compteurs
+    (httpcache/hits, revalidated, misses, bytes_saved, hit_rate...) sont publiés
+    dans les statistiques du crawl au fil des requêtes.
+    """
+
+    def __init__(self, cache, stats=None):
+        self.cache = cache
+        self.stats = stats
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        if not crawler.settings.getbool('HTTP_CACHE_ENABLED', False):
+            raise NotConfigured
+        middleware = cls(HttpCache.from_settings(crawler.settings), crawler.stats)
+        crawler.signals.connect(middleware.spider_closed, signal=signals.spider_closed)
+        return middleware
+
+    @staticmethod
+    def cache_url(request):
+        # URL d'origine : une requête redirigée garde la clé de la première
+        return request.meta.get('redirect_urls', [request.url])[0]
+
+    def cacheable(self, request):
+        return (request.method == 'GET' and not request.meta.get('dont_cache')
+                and ('/itm/' in request.url or '/sch/' in request.url))
+
+    def process_request(self, request, spider):
+        # Une redirection suivie est déjà passée par le cache sous son URL d'origine
+        if not self.cacheable(request) or 'redirect_urls' in request.meta:
+            return None
+        entry = self.cache.lookup(request.url)
+        if entry is None:
+            self.publish()
+            return None
+        if entry.fresh(self.cache.clock()):
+            response = self.response_from(entry, request)
+            if response is not None:
+                self.cache.hit(entry)
+                self.publish()
+                return response
+            return None
+        # Expirée : requête conditionnelle si la page avait un validateur
+        validators = entry.validators()
+        if validators:
+            for name, value in validators.items():
+                request.headers[name] = value
+            request.meta['http_cache_entry'] = entry
+        self.publish()
+        return None
+
+    def process_response(self, request, response, spider):
+        if 'cached' in response.flags or not self.cacheable(request):
+            return response
+        entry = request.meta.pop('http_cache_entry', None)
+        if response.status == 304 and entry is not None:
+            cached = self.response_from(entry, request)
+            if cached is not None:
+                self.cache.revalidated(entry, response.headers.to_unicode_dict())
+                self.publish()
+                return cached
+            return response
+        if response.status == 200:
+            headers = [(name.decode('latin-1'), value.decode('latin-1'))
+                       for name, values in response.headers.items() for value in values]
+            self.cache.store(self.cache_url(request), response.url, response.status, headers, response.body)
+            self.publish()
+        return response
+
+    def response_from(self, entry, request):
+        loaded = self.cache.load(entry)
+        if loaded is None:
+            return None
+        headers, body = loaded
+        return HtmlResponse(url=entry.final_url, status=entry.status, headers=headers, body=body,
+                            request=request, flags=['cached'])
+
+    def publish(self):
+        # Publié au fil de l'eau : le résumé de fin du spider lit les statistiques
+        if self.stats is not None:
+            for name, value in self.cache.summary().items():
+                self.stats.set_value(f'httpcache/{name}', value)
+
+    def spider_closed(self, spider):
+        summary = self.cache.summary()
+        logger.info(f"[HttpCache] {summary['hits']} hits, {summary['revalidated']} revalidés, "
+                    f"{summary['misses']} absents, taux {summary['hit_rate'] * 100:.1f}%, "
+                    f"{summary['bytes_saved'] / 1e6:.1f} Mo économisés")
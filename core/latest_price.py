@@ -0,0 +1,107 @@
+# core/latest_price.py
+"""
+Projection "dernier relevé" : une ligne par produit dans product_latest_price,
+pour que les endpoints de liste/détail n'aient plus à parcourir price_history.
+
+Elle est tenue à jour par MySQLPipeline et generate_fake_history. En cas de
+doute (import manuel, purge...), on la reconstruit depuis price_history :
+
+    python -m core.latest_price --rebuild
+"""
+
+import argparse
+from core.db_connection import get_connection
+from core.response_cache import invalidate_all, invalidate_products
+
+# Upsert d'un relevé : on ne remplace le prix que si le relevé est au moins aussi récent.
+# L'ordre des affectations compte : price est évalué avec l'ancien date_scraped.
+UPSERT_LATEST_PRICE_SQL = """
+    INSERT INTO product_latest_price (product_id, price, date_scraped)
+    VALUES (%s, %s, COALESCE(%s, NOW()))
+    ON DUPLICATE KEY UPDATE
+        price = IF(VALUES(date_scraped) >= date_scraped, VALUES(price), price),
+        date_scraped = GREATEST(date_scraped, VALUES(date_scraped))
+"""
+
+_REBUILD_SELECT = """
+    SELECT ph.product_id, ph.price, ph.date_scraped
+    FROM price_history ph
+    JOIN (
+        SELECT product_id, MAX(date_scraped) AS max_date
+        FROM price_history
+        {where}
+        GROUP BY product_id
+    ) last_ph ON last_ph.product_id = ph.product_id
+             AND last_ph.max_date = ph.date_scraped
+"""
+
+
+def record_latest_price(cursor, product_id, price, date_scraped=None):
+    """
+    Met à jour la projection pour un relevé qui vient d'être inséré dans price_history.
+    date_scraped=None correspond à NOW() côté MySQL (comme l'INSERT du pipeline).
+    Le commit reste à la charge de l'appelant.
+    """
+    cursor.execute(UPSERT_LATEST_PRICE_SQL, (product_id, price, date_scraped))
+
+
+def rebuild_latest_prices(cursor, product_ids=None):
+    """
+    Reconstruit la projection depuis price_history, pour tout le catalogue
+    ou seulement pour les product_ids donnés. Le commit reste à la charge de l'appelant,
+    ce qui permet aux lecteurs de voir l'ancienne projection jusqu'au bout.
+    """
+    if product_ids is not None:
+        product_ids = list(product_ids)
+        if not product_ids:
+            return
+        placeholders = ", ".join(["%s"] * len(product_ids))
+        cursor.execute(
+            f"DELETE FROM product_latest_price WHERE product_id IN ({placeholders})",
+            product_ids
+        )
+        where = f"WHERE product_id IN ({placeholders})"
+        params = product_ids
+    else:
+        cursor.execute("DELETE FROM product_latest_price")
+        where = ""
+        params = None
+
+    # Plusieurs relevés peuvent partager la même date max : le doublon est absorbé par l'upsert.
+    cursor.execute(f"""
+        INSERT INTO product_latest_price (product_id, price, date_scraped)
+        {_REBUILD_SELECT.format(where=where)}
+        ON DUPLICATE KEY UPDATE price = VALUES(price)
+    """, params)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Maintenance de la projection product_latest_price.")
+    parser.add_argument("--rebuild", action="store_true",
+                        help="Reconstruit entièrement la projection depuis price_history.")
+    parser.add_argument("--product-id", type=int, action="append", dest="product_ids",
+                        help="Limite la reconstruction à ce produit (option répétable).")
+    args = parser.parse_args()
+
+    if not args.rebuild:
+        parser.print_help()
+        return
+
+    conn = get_connection()
+    cursor = conn.cursor()
+    try:
+        rebuild_latest_prices(cursor, args.product_ids)
+        if args.product_ids:
+            invalidate_products(cursor, args.product_ids)
+        else:
+            invalidate_all(cursor)
+        conn.commit()
+        cursor.execute("SELECT COUNT(*) FROM product_latest_price")
+        print(f"Projection reconstruite : {cursor.fetchone()[0]} produits.")
+    finally:
+        cursor.close()
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
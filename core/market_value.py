@@ -0,0 +1,358 @@
+# core/market_value.py
+"""
+Valeur de marché par cluster d'annonces : même figurine (mot-clé de recherche +
+numéro de figurine du titre) et mêmes critères (normalized_condition, in_box, signed),
+ex. « funko pop doctor doom #561 / Used / en boîte / non signée ».
+
+Chaque annonce compte une fois, à son dernier prix relevé. Les statistiques robustes
+(médiane, quartiles, moyenne tronquée) viennent d'un sketch de quantiles à erreur
+relative bornée (DDSketch, Masson et al., 2019) : chaque prix tombe dans un bucket
+logarithmique ⌈log_γ(prix)⌉, et un quantile lu dans les buckets est exact à
+RELATIVE_ACCURACY près. Le sketch est fusionnable (somme des buckets) et supporte
+le retrait d'une valeur (bucket - 1) : quand une annonce change de prix ou de cluster,
+son ancien prix est retiré.
+
+Les buckets sont stockés dans market_sketch_bucket et mis à jour par les pipelines
+à chaque relevé (record_market_prices, même transaction que price_history) ;
+l'API lit quelques centaines de buckets par cluster au lieu de parcourir l'historique.
+
+    python -m core.market_value --report
+    python -m core.market_value --rebuild --keyword "Funko Pop Doctor Doom #561"
+"""
+
+import argparse
+import math
+import re
+from core.db_connection import get_connection
+from core.response_cache import invalidate_all
+
+# Erreur relative maximale des quantiles (1 %)
+RELATIVE_ACCURACY = 0.01
+GAMMA = (1 + RELATIVE_ACCURACY) / (1 - RELATIVE_ACCURACY)
+LOG_GAMMA = math.log(GAMMA)
+
+# Part des annonces écartée de chaque côté pour la moyenne tronquée
+TRIM = 0.1
+
+FIGURE_NUMBER_RE = re.compile(r"#\s*(\d+)")
+SPACES_RE = re.compile(r"\s+")
+
+
+class QuantileSketch:
+    """
+    Sketch de quantiles à erreur relative bornée : {index de bucket: nombre de valeurs}.
+    Les valeurs <= 0 sont ignorées (prix non relevés).
+    """
+
+    def __init__(self, buckets=None):
+        self.buckets = {}
+        for index, count in (buckets or {}).items():
+            if count > 0:
+                self.buckets[index] = count
+
+    @staticmethod
+    def bucket_index(value):
+        return math.ceil(math.log(value) / LOG_GAMMA)
+
+    @staticmethod
+    def bucket_value(index):
+        """Valeur représentative du bucket (à RELATIVE_ACCURACY près de toute valeur du bucket)."""
+        return 2 * GAMMA ** index / (GAMMA + 1)
+
+    @property
+    def count(self):
+        return sum(self.buckets.values())
+
+    def add(self, value, count=1):
+        if value and value > 0:
+            index = self.bucket_index(value)
+            self.buckets[index] = self.buckets.get(index, 0) + count
+
+    def remove(self, value):
+        if value and value > 0:
+            index = self.bucket_index(value)
+            if self.buckets.get(index, 0) > 1:
+                self.buckets[index] -= 1
+            else:
+                self.buckets.pop(index, None)
+
+    def merge(self, other):
+        for index, count in other.buckets.items():
+            self.buckets[index] = self.buckets.get(index, 0) + count
+        return self
+
+    def quantile(self, q):
+        """Valeur au rang q (0 <= q <= 1), None si le sketch est vide."""
+        total = self.count
+        if not total:
+            return None
+        rank = q * (total - 1)
+        seen = 0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen > rank:
+                return self.bucket_value(index)
+        return self.bucket_value(max(self.buckets))
+
+    def trimmed_mean(self, trim=TRIM):
+        """Moyenne après avoir écarté la part `trim` des valeurs de chaque côté."""
+        total = self.count
+        if not total:
+            return None
+        low = total * trim
+        high = total - low
+        weighted = 0.0
+        kept = 0.0
+        seen = 0
+        for index in sorted(self.buckets):
+            count = self.buckets[index]
+            # Part du bucket comprise entre les rangs low et high
+            share = max(0.0, min(seen + count, high) - max(seen, low))
+            weighted += share * self.bucket_value(index)
+            kept += share
+            seen += count
+        return weighted / kept if kept else self.quantile(0.5)
+
+    def summary(self):
+        """Statistiques servies par l'API (prix arrondis au centime)."""
+        def rounded(value):
+            return round(value, 2) if value is not None else None
+        return {
+            "listings": self.count,
+            "median": rounded(self.quantile(0.5)),
+            "trimmed_mean": rounded(self.trimmed_mean()),
+            "p10": rounded(self.quantile(0.1)),
+            "p25": rounded(self.quantile(0.25)),
+            "p75": rounded(self.quantile(0.75)),
+            "p90": rounded(self.quantile(0.9)),
+            "min": rounded(self.quantile(0)),
+            "max": rounded(self.quantile(1)),
+        }
+
+
+def normalize_keyword(keyword):
+    """Mot-clé de recherche sans numéro de figurine, en minuscules et espaces simples."""
+    return SPACES_RE.sub(" ", FIGURE_NUMBER_RE.sub(" ", keyword or "")).strip().lower()
+
+
+def figure_number(title, keyword=None):
+    """Numéro de figurine (« #561 » -> "561") du titre, à défaut du mot-clé."""
+    for text in (title, keyword):
+        match = FIGURE_NUMBER_RE.search(text or "")
+        if match:
+            return match.group(1)
+    return ""
+
+
+def cluster_for(keyword, title, normalized_condition, in_box, signed):
+    """Cluster d'une annonce : dict des colonnes de market_cluster (dont cluster_key)."""
+    cluster = {
+        "keyword": normalize_keyword(keyword)[:150],
+        "figure_number": figure_number(title, keyword),
+        "normalized_condition": normalized_condition or "",
+        "in_box": bool(in_box),
+        "signed": bool(signed),
+    }
+    cluster["cluster_key"] = "|".join([
+        cluster["keyword"], cluster["figure_number"], cluster["normalized_condition"],
+        "box" if cluster["in_box"] else "loose", "signed" if cluster["signed"] else "unsigned",
+    ])
+    return cluster
+
+
+def _cluster_id(cursor, cluster):
+    cursor.execute("""
+        INSERT INTO market_cluster
+        (cluster_key, keyword, figure_number, normalized_condition, in_box, signed)
+        VALUES (%s, %s, %s, %s, %s, %s)
+        ON DUPLICATE KEY UPDATE cluster_id = LAST_INSERT_ID(cluster_id)
+    """, (cluster["cluster_key"], cluster["keyword"], cluster["figure_number"],
+          cluster["normalized_condition"], cluster["in_box"], cluster["signed"]))
+    return cursor.lastrowid
+
+
+def _shift(cursor, cluster_id, price, delta):
+    """Ajoute (delta=1) ou retire (delta=-1) un prix du sketch et des totaux du cluster."""
+    cursor.execute("""
+        INSERT INTO market_sketch_bucket (cluster_id, bucket, listings)
+        VALUES (%s, %s, %s)
+        ON DUPLICATE KEY UPDATE listings = listings + VALUES(listings)
+    """, (cluster_id, QuantileSketch.bucket_index(price), delta))
+    cursor.execute("""
+        UPDATE market_cluster
+        SET listing_count = listing_count + %s, price_sum = price_sum + %s
+        WHERE cluster_id = %s
+    """, (delta, price * delta, cluster_id))
+
+
+def record_market_prices(cursor, observations):
+    """
+    Ajoute les prix qui viennent d'être relevés :
+    observations = [(product_id, keyword, title, normalized_condition, in_box, signed, price), ...].
+    keyword=None (relevé sans recherche, ex. refresh) garde le mot-clé du cluster actuel
+    de l'annonce. L'ancien prix de l'annonce est retiré de son cluster avant d'ajouter
+    le nouveau. Le commit reste à la charge de l'appelant.
+    """
+    for product_id, keyword, title, condition, in_box, signed, price in observations:
+        if not price or float(price) <= 0:
+            continue
+        price = float(price)
+        cursor.execute("""
+            SELECT mp.cluster_id, mp.price, mc.keyword
+            FROM product_market_price mp
+            JOIN market_cluster mc ON mc.cluster_id = mp.cluster_id
+            WHERE mp.product_id = %s
+            FOR UPDATE
+        """, (product_id,))
+        previous = cursor.fetchone()
+        if keyword is None and previous:
+            keyword = previous[2]
+
+        cluster_id = _cluster_id(cursor, cluster_for(keyword, title, condition, in_box, signed))
+        if previous:
+            _shift(cursor, previous[0], float(previous[1]), -1)
+        _shift(cursor, cluster_id, price, 1)
+        cursor.execute("""
+            INSERT INTO product_market_price (product_id, cluster_id, price)
+            VALUES (%s, %s, %s)
+            ON DUPLICATE KEY UPDATE cluster_id = VALUES(cluster_id), price = VALUES(price)
+        """, (product_id, cluster_id, price))
+
+
+def fetch_sketches(cursor, cluster_ids):
+    """{cluster_id: QuantileSketch} lus dans market_sketch_bucket."""
+    sketches = {cluster_id: QuantileSketch() for cluster_id in cluster_ids}
+    if not sketches:
+        return sketches
+    placeholders = ", ".join(["%s"] * len(sketches))
+    cursor.execute(f"""
+        SELECT cluster_id, bucket, listings
+        FROM market_sketch_bucket
+        WHERE cluster_id IN ({placeholders}) AND listings > 0
+    """, list(sketches))
+    for cluster_id, bucket, listings in cursor.fetchall():
+        sketches[cluster_id].buckets[bucket] = listings
+    return sketches
+
+
+def find_market_values(cursor, keyword=None, figure=None, condition=None, in_box=None, signed=None,
+                       cluster_ids=None, limit=50):
+    """
+    Clusters correspondant aux critères (les plus fournis d'abord), avec leurs statistiques.
+    keyword est cherché dans le mot-clé normalisé du cluster.
+    """
+    conditions = ["listing_count > 0"]
+    params = []
+    if keyword:
+        conditions.append("keyword LIKE %s")
+        params.append(f"%{normalize_keyword(keyword)}%")
+    if figure:
+        conditions.append("figure_number = %s")
+        params.append(str(figure).lstrip("#"))
+    if condition:
+        conditions.append("normalized_condition = %s")
+        params.append(condition)
+    if in_box is not None:
+        conditions.append("in_box = %s")
+        params.append(bool(in_box))
+    if signed is not None:
+        conditions.append("signed = %s")
+        params.append(bool(signed))
+    if cluster_ids is not None:
+        if not cluster_ids:
+            return []
+        conditions.append(f"cluster_id IN ({', '.join(['%s'] * len(cluster_ids))})")
+        params.extend(cluster_ids)
+
+    cursor.execute(f"""
+        SELECT cluster_id, keyword, figure_number, normalized_condition, in_box, signed,
+               listing_count, price_sum
+        FROM market_cluster
+        WHERE {" AND ".join(conditions)}
+        ORDER BY listing_count DESC, cluster_id
+        LIMIT %s
+    """, params + [limit])
+    rows = cursor.fetchall()
+    sketches = fetch_sketches(cursor, [row[0] for row in rows])
+
+    results = []
+    for cluster_id, kw, number, cond, box, sig, listing_count, price_sum in rows:
+        stats = sketches[cluster_id].summary()
+        stats["mean"] = round(float(price_sum) / listing_count, 2)
+        results.append({
+            "cluster_id": cluster_id,
+            "keyword": kw,
+            "figure_number": number,
+            "normalized_condition": cond,
+            "in_box": bool(box),
+            "signed": bool(sig),
+            **stats,
+        })
+    return results
+
+
+def rebuild_market_values(cursor, default_keyword=""):
+    """
+    Reconstruit clusters et sketches depuis product et product_latest_price.
+    Une annonce garde le mot-clé de son cluster actuel ; à défaut, default_keyword.
+    Le commit reste à la charge de l'appelant.
+    """
+    cursor.execute("""
+        SELECT p.product_id, mc.keyword, p.title, p.normalized_condition, p.in_box, p.signed, lp.price
+        FROM product p
+        JOIN product_latest_price lp ON lp.product_id = p.product_id
+        LEFT JOIN product_market_price mp ON mp.product_id = p.product_id
+        LEFT JOIN market_cluster mc ON mc.cluster_id = mp.cluster_id
+        WHERE lp.price > 0
+    """)
+    observations = [
+        (product_id, keyword if keyword is not None else default_keyword, *rest)
+        for product_id, keyword, *rest in cursor.fetchall()
+    ]
+    cursor.execute("DELETE FROM product_market_price")
+    cursor.execute("DELETE FROM market_sketch_bucket")
+    cursor.execute("UPDATE market_cluster SET listing_count = 0, price_sum = 0")
+    record_market_prices(cursor, observations)
+    return len(observations)
+
+
+def print_report(clusters):
+    print(f"{'cluster':<52} {'annonces':>8} {'médiane':>9} {'moy. tronquée':>14} {'p25-p75':>19}")
+    for cluster in clusters:
+        label = (f"{cluster['keyword']} #{cluster['figure_number']} / {cluster['normalized_condition']}"
+                 f"{' / boîte' if cluster['in_box'] else ''}{' / signée' if cluster['signed'] else ''}")
+        print(f"{label[:52]:<52} {cluster['listings']:>8} {cluster['median']:>9.2f} "
+              f"{cluster['trimmed_mean']:>14.2f} {cluster['p25']:>9.2f}-{cluster['p75']:<9.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Valeur de marché par cluster d'annonces.")
+    parser.add_argument("--rebuild", action="store_true",
+                        help="Reconstruit clusters et sketches depuis les derniers prix.")
+    parser.add_argument("--keyword", default="",
+                        help="Mot-clé des annonces sans cluster lors de la reconstruction.")
+    parser.add_argument("--report", action="store_true", help="Affiche les clusters les plus fournis.")
+    parser.add_argument("--limit", type=int, default=20, help="Clusters affichés par le rapport.")
+    args = parser.parse_args()
+
+    if not args.rebuild and not args.report:
+        parser.print_help()
+        return
+
+    conn = get_connection()
+    cursor = conn.cursor()
+    try:
+        if args.rebuild:
+            count = rebuild_market_values(cursor, args.keyword)
+            invalidate_all(cursor)
+            conn.commit()
+            print(f"{count} annonces réparties en clusters.")
+        if args.report:
+            print_report(find_market_values(cursor, limit=args.limit))
+    finally:
+        cursor.close()
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+# core/metrics.py
+"""
+Métriques du crawl : temps par étape, compteurs d'événements et jauges (profondeur
+des files, statistiques du crawl), pour savoir où passe le temps sous charge.
+
+Le registre REGISTRY est global au processus : le spider, ses middlewares et les
+pipelines y écrivent sans avoir à se passer d'objet. Les temps sont gardés dans un
+QuantileSketch (core/market_value.py, 1 % d'erreur relative) : p50 / p95 / p99 en
+mémoire constante, quel que soit le nombre de pages.
+
+Deux sorties, alimentées par MetricsExtension (core/metrics_extension.py) :
+
+  - un endpoint HTTP au format texte de Prometheus (/metrics), et le rapport
+    courant en JSON (/report), si METRICS_PORT est défini ;
+  - un rapport JSON écrit en fin de crawl dans METRICS_REPORT_FILE.
+
+    python -m core.metrics metrics.json    # tableau des étapes d'un rapport
+"""
+
+import argparse
+import json
+import time
+from contextlib import contextmanager
+
+from core.market_value import QuantileSketch
+
+PREFIX = "pricetracker"
+QUANTILES = (0.5, 0.95, 0.99)
+
+# Nom du label de chaque famille de jauges
+GAUGE_LABELS = {
+    "queue_depth": "queue",
+    "crawl_stat": "key",
+}
+
+
+class Timing:
+    """Temps d'une étape : nombre, total, maximum et sketch des quantiles (secondes)."""
+
+    __slots__ = ("sketch", "count", "total", "max")
+
+    def __init__(self):
+        self.sketch = QuantileSketch()
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds):
+        self.sketch.add(seconds)
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def quantile(self, q):
+        return self.sketch.quantile(q) or 0.0
+
+    def summary(self):
+        def ms(seconds):
+            return round(seconds * 1000, 3)
+        return {
+            "count": self.count,
+            "total_s": round(self.total, 3),
+            "mean_ms": ms(self.total / self.count) if self.count else 0.0,
+            "p50_ms": ms(self.quantile(0.5)),
+            "p95_ms": ms(self.quantile(0.95)),
+            "p99_ms": ms(self.quantile(0.99)),
+            "max_ms": ms(self.max),
+        }
+
+
+class MetricsRegistry:
+    def __init__(self, clock=time.perf_counter):
+        self.clock = clock
+        self.reset()
+
+    def reset(self):
+        self.timings = {}    # étape -> Timing
+        self.counters = {}   # événement -> total
+        self.gauges = {}     # (famille, label) -> dernière valeur
+        self.peaks = {}      # (famille, label) -> valeur maximale
+        self.started_at = time.time()
+
+    def observe(self, stage, seconds):
+        timing = self.timings.get(stage)
+        if timing is None:
+            timing = self.timings[stage] = Timing()
+        timing.observe(seconds)
+
+    @contextmanager
+    def timer(self, stage):
+        """Mesure le bloc sous le nom d'étape `stage`, même s'il lève une exception."""
+        start = self.clock()
+        try:
+            yield
+        finally:
+            self.observe(stage, self.clock() - start)
+
+    def inc(self, event, count=1):
+        self.counters[event] = self.counters.get(event, 0) + count
+
+    def set_gauge(self, family, label, value):
+        key = (family, label)
+        self.gauges[key] = value
+        if value > self.peaks.get(key, value - 1):
+            self.peaks[key] = value
+
+    def stage_summary(self):
+        """Résumé par étape, de la plus coûteuse (temps total) à la moins coûteuse."""
+        ordered = sorted(self.timings.items(), key=lambda entry: entry[1].total, reverse=True)
+        return {stage: timing.summary() for stage, timing in ordered}
+
+    def report(self, **extra):
+        """Rapport JSON du crawl (servi sur /report et écrit en fin de crawl)."""
+        queues = {
+            label: {"last": value, "peak": self.peaks.get((family, label), value)}
+            for (family, label), value in sorted(self.gauges.items()) if family == "queue_depth"
+        }
+        stats = {label: value for (family, label), value in sorted(self.gauges.items()) if family == "crawl_stat"}
+        return {
+            "started_at": self.started_at,
+            "elapsed_s": round(time.time() - self.started_at, 3),
+            **extra,
+            "stages": self.stage_summary(),
+            "events": dict(sorted(self.counters.items())),
+            "queues": queues,
+            "stats": stats,
+        }
+
+    def prometheus(self):
+        """Exposition au format texte de Prometheus (version 0.0.4)."""
+        lines = []
+        if self.timings:
+            name = f"{PREFIX}_stage_seconds"
+            lines.append(f"# HELP {name} Temps passé par étape du crawl.")
+            lines.append(f"# TYPE {name} summary")
+            for stage, timing in sorted(self.timings.items()):
+                label = f'stage="{escape(stage)}"'
+                for q in QUANTILES:
+                    lines.append(f'{name}{{{label},quantile="{q}"}} {timing.quantile(q):.6g}')
+                lines.append(f"{name}_sum{{{label}}} {timing.total:.6g}")
+                lines.append(f"{name}_count{{{label}}} {timing.count}")
+            name = f"{PREFIX}_stage_max_seconds"
+            lines.append(f"# HELP {name} Temps maximal par étape du crawl.")
+            lines.append(f"# TYPE {name} gauge")
+            for stage, timing in sorted(self.timings.items()):
+                lines.append(f'{name}{{stage="{escape(stage)}"}} {timing.max:.6g}')
+        if self.counters:
+            name = f"{PREFIX}_events_total"
+            lines.append(f"# HELP {name} Événements du crawl.")
+            lines.append(f"# TYPE {name} counter")
+            for event, value in sorted(self.counters.items()):
+                lines.append(f'{name}{{event="{escape(event)}"}} {value}')
+        for family, label_name in GAUGE_LABELS.items():
+            values = sorted((label, value) for (gauge_family, label), value in self.gauges.items()
+                            if gauge_family == family)
+            if not values:
+                continue
+            name = f"{PREFIX}_{family}"
+            lines.append(f"# TYPE {name} gauge")
+            for label, value in values:
+                lines.append(f'{name}{{{label_name}="{escape(label)}"}} {number(value)}')
+        return "\n".join(lines) + "\n"
+
+
+def number(value):
+    """Valeur d'échantillon : les entiers (compteurs, octets) gardent tous leurs chiffres."""
+    return str(value) if isinstance(value, int) else repr(float(value))
+
+
+def escape(value):
+    """Échappement d'une valeur de label Prometheus."""
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+REGISTRY = MetricsRegistry()
+
+
+def print_report(report):
+    elapsed = report.get("elapsed_s") or 0
+    print(f"Crawl de {elapsed:.1f}s ({report.get('reason', '?')})")
+    print(f"{'étape':<28} {'n':>7} {'total s':>9} {'part':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+    for stage, timing in report.get("stages", {}).items():
+        share = timing["total_s"] / elapsed * 100 if elapsed else 0
+        print(f"{stage:<28} {timing['count']:>7} {timing['total_s']:>9.2f} {share:>5.1f}% "
+              f"{timing['p50_ms']:>9.2f} {timing['p95_ms']:>9.2f} {timing['p99_ms']:>9.2f} {timing['max_ms']:>9.2f}")
+    for queue, depth in report.get("queues", {}).items():
+        print(f"file {queue:<23} dernière {depth['last']:>6}   pic {depth['peak']:>6}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Affiche le rapport de métriques d'un crawl.")
+    parser.add_argument("report", help="Fichier écrit par le crawl (METRICS_REPORT_FILE).")
+    args = parser.parse_args()
+    with open(args.report, encoding="utf-8") as f:
+        print_report(json.load(f))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+import json
+import logging
+import time
+from numbers import Number
+from scrapy import signals
+from scrapy.exceptions import NotConfigured
+from twisted.internet import task
+from twisted.web.resource import Resource
+from twisted.web.server import Site
+from core.metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+
+class MetricsResource(Resource):
+    """Endpoint HTTP : /metrics (texte Prometheus) et /report (rapport JSON courant)."""
+
+    isLeaf = True
+
+    def __init__(self, extension):
+        super().__init__()
+        self.extension = extension
+
+    def render_GET(self, request):
+        self.extension.sample()
+        if request.path == b'/report':
+            request.setHeader(b'Content-Type', b'application/json; charset=utf-8')
+            return json.dumps(self.extension.report(), ensure_ascii=False).encode('utf-8')
+        if request.path in (b'/', b'/metrics'):
+            request.setHeader(b'Content-Type', b'text/plain; version=0.0.4; charset=utf-8')
+            return self.extension.registry.prometheus().encode('utf-8')
+        request.setResponseCode(404)
+        return b'not found\n'
+
+
+class MetricsExtension:
+    """
+    Instrumentation du crawl (registre core/metrics.py) :
+
+      - temps de téléchargement de chaque réponse (download_latency de Scrapy) ;
+        les réponses servies par le cache HTTP sont comptées à part ;
+      - toutes les METRICS_INTERVAL secondes, profondeur des files (scheduler,
+        téléchargements en cours et en attente, réponses en cours de traitement,
+        lot du pipeline) et statistiques numériques du crawl (proxy_pool/*,
+        captcha/*, httpcache/*, mysql/*...) ;
+      - items extraits et écartés, requêtes planifiées.
+
+    Les temps des callbacks sont mesurés par CallbackTimingMiddleware, ceux du
+    mapping de catégorie et des requêtes SQL par les pipelines.
+
+    METRICS_PORT ouvre l'endpoint HTTP (Prometheus) pendant le crawl ;
+    METRICS_REPORT_FILE reçoit le rapport JSON en fin de crawl.
+    """
+
+    def __init__(self, crawler, interval=5.0, port=None, host='127.0.0.1', report_file=None,
+                 registry=REGISTRY):
+        self.crawler = crawler
+        self.interval = interval
+        self.port = port
+        self.host = host
+        self.report_file = report_file
+        self.registry = registry
+        self.loop = None
+        self.listener = None
+        self.reason = None
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        if not settings.getbool('METRICS_ENABLED', True):
+            raise NotConfigured
+        extension = cls(
+            crawler,
+            interval=settings.getfloat('METRICS_INTERVAL', 5.0),
+            port=settings.getint('METRICS_PORT', 0) or None,
+            host=settings.get('METRICS_HOST', '127.0.0.1'),
+            report_file=settings.get('METRICS_REPORT_FILE'),
+        )
+        crawler.signals.connect(extension.spider_opened, signal=signals.spider_opened)
+        crawler.signals.connect(extension.spider_closed, signal=signals.spider_closed)
+        crawler.signals.connect(extension.response_downloaded, signal=signals.response_downloaded)
+        crawler.signals.connect(extension.response_received, signal=signals.response_received)
+        crawler.signals.connect(extension.request_scheduled, signal=signals.request_scheduled)
+        crawler.signals.connect(extension.item_scraped, signal=signals.item_scraped)
+        crawler.signals.connect(extension.item_dropped, signal=signals.item_dropped)
+        return extension
+
+    def spider_opened(self, spider):
+        self.registry.reset()
+        if self.interval > 0:
+            self.loop = task.LoopingCall(self.sample)
+            self.loop.start(self.interval, now=False)
+        if self.port:
+            from twisted.internet import reactor
+            self.listener = reactor.listenTCP(self.port, Site(MetricsResource(self)), interface=self.host)
+            logger.info(f"[Metrics] Endpoint Prometheus sur http://{self.host}:{self.port}/metrics")
+
+    def spider_closed(self, spider, reason):
+        self.reason = reason
+        if self.loop is not None and self.loop.running:
+            self.loop.stop()
+        self.sample()
+        if self.listener is not None:
+            self.listener.stopListening()
+            self.listener = None
+        if self.report_file:
+            with open(self.report_file, 'w', encoding='utf-8') as f:
+                json.dump(self.report(), f, ensure_ascii=False, indent=2)
+            logger.info(f"[Metrics] Rapport écrit dans {self.report_file}")
+
+    def response_downloaded(self, response, request, spider):
+        # Toute réponse réellement téléchargée, y compris celles que les middlewares
+        # écartent ensuite (CAPTCHA, retry)
+        self.registry.inc('responses_downloaded')
+        latency = request.meta.get('download_latency')
+        if latency is not None:
+            self.registry.observe('download', latency)
+
+    def response_received(self, response, request, spider):
+        if 'cached' in response.flags:
+            self.registry.inc('responses_cached')
+
+    def request_scheduled(self, request, spider):
+        self.registry.inc('requests_scheduled')
+
+    def item_scraped(self, item, response, spider):
+        self.registry.inc('items_scraped')
+
+    def item_dropped(self, item, response, exception, spider):
+        self.registry.inc('items_dropped')
+
+    def sample(self):
+        """Relève les profondeurs de file et recopie les statistiques numériques du crawl."""
+        engine = self.crawler.engine
+        if engine is not None:
+            for queue, depth in self.queue_depths(engine).items():
+                self.registry.set_gauge('queue_depth', queue, depth)
+        if self.crawler.stats is not None:
+            for key, value in self.crawler.stats.get_stats().items():
+                if isinstance(value, Number) and not isinstance(value, bool):
+                    self.registry.set_gauge('crawl_stat', key, value)
+
+    @staticmethod
+    def queue_depths(engine):
+        depths = {}
+        slot = engine.slot
+        if slot is not None and slot.scheduler is not None:
+            depths['scheduler'] = len(slot.scheduler)
+            depths['engine_in_progress'] = len(slot.inprogress)
+        downloader = engine.downloader
+        depths['downloader_active'] = len(downloader.active)
+        depths['downloader_queued'] = sum(len(download_slot.queue) for download_slot in downloader.slots.values())
+        scraper_slot = engine.scraper.slot
+        if scraper_slot is not None:
+            depths['scraper_queued'] = len(scraper_slot.queue)
+            depths['scraper_active'] = len(scraper_slot.active)
+        # Items en attente dans un pipeline par lots (MySQLBatchPipeline)
+        buffered = [len(pipeline.buffer) for pipeline in engine.scraper.itemproc.middlewares
+                    if isinstance(getattr(pipeline, 'buffer', None), list)]
+        if buffered:
+            depths['pipeline_buffer'] = sum(buffered)
+        return depths
+
+    def report(self):
+        return self.registry.report(
+            spider=getattr(self.crawler.spider, 'name', None),
+            reason=self.reason,
+            generated_at=time.time(),
+        )
+
+
+class CallbackTimingMiddleware:
+    """
+    Middleware de spider : temps passé dans chaque callback (parse, parse_item...),
+    étape "callback/<nom>". Les callbacks sont des générateurs : on mesure chaque
+    avancement du générateur, pas le traitement des requêtes et items produits.
+    À placer au plus près du spider (ordre élevé dans SPIDER_MIDDLEWARES).
+    """
+
+    def __init__(self, registry=REGISTRY):
+        self.registry = registry
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        if not crawler.settings.getbool('METRICS_ENABLED', True):
+            raise NotConfigured
+        return cls()
+
+    def process_spider_output(self, response, result, spider):
+        callback = response.request.callback if response.request is not None else None
+        stage = f"callback/{getattr(callback, '__name__', 'parse')}"
+        iterator = iter(result or ())
+        elapsed = 0.0
+        clock = self.registry.clock
+        try:
+            while True:
+                start = clock()
+                try:
+                    output = next(iterator)
+                except StopIteration:
+                    break
+                finally:
+                    elapsed += clock() - start
+                yield output
+        finally:
+            self.registry.observe(stage, elapsed)
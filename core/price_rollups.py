@@ -0,0 +1,139 @@
+# core/price_rollups.py
+"""
+Agrégats de prix par produit et par jour / semaine (price_rollup_daily,
+price_rollup_weekly) : ouverture et clôture, min / max, somme et nombre de relevés
+(la moyenne s'en déduit), enchères max.
+
+Ils sont tenus à jour à chaque relevé inséré par les pipelines (record_price_rollups,
+dans la même transaction que price_history) : l'upsert ne touche qu'une ligne par
+résolution et reste correct si les relevés arrivent dans le désordre. Les endpoints
+de tendance et d'historique les lisent dès que la résolution demandée le permet,
+au lieu de parcourir tout price_history d'un produit. python -m core.schema les
+remplit depuis l'historique existant quand il crée les tables.
+
+En cas de doute (import manuel, purge...), on les reconstruit depuis price_history :
+
+    python -m core.price_rollups --rebuild
+    python -m core.price_rollups --rebuild --product-id 42
+"""
+
+import argparse
+from core.db_connection import get_connection
+from core.response_cache import invalidate_all, invalidate_products
+
+# Résolution -> (table, début de période en SQL à partir d'une date {at})
+ROLLUPS = {
+    "daily": ("price_rollup_daily", "DATE({at})"),
+    "weekly": ("price_rollup_weekly", "DATE({at}) - INTERVAL WEEKDAY({at}) DAY"),  # lundi
+}
+
+ROLLUP_COLUMNS = """(product_id, period_start, open_price, open_at, close_price, close_at,
+                     min_price, max_price, sum_price, price_count, max_bids)"""
+
+# Upsert d'un relevé. Comme pour product_latest_price, l'ordre des affectations compte :
+# open_price / close_price sont évalués avec les anciens open_at / close_at.
+_UPSERT_SQL = """
+    INSERT INTO {table} """ + ROLLUP_COLUMNS + """
+    VALUES {values}
+    ON DUPLICATE KEY UPDATE
+        open_price = IF(VALUES(open_at) < open_at, VALUES(open_price), open_price),
+        open_at = LEAST(open_at, VALUES(open_at)),
+        close_price = IF(VALUES(close_at) >= close_at, VALUES(close_price), close_price),
+        close_at = GREATEST(close_at, VALUES(close_at)),
+        min_price = LEAST(min_price, VALUES(min_price)),
+        max_price = GREATEST(max_price, VALUES(max_price)),
+        sum_price = sum_price + VALUES(sum_price),
+        price_count = price_count + 1,
+        max_bids = GREATEST(COALESCE(max_bids, VALUES(max_bids)), COALESCE(VALUES(max_bids), max_bids))
+"""
+_AT = "COALESCE(%s, NOW())"
+
+_REBUILD_SQL = """
+    INSERT INTO {table} """ + ROLLUP_COLUMNS + """
+    SELECT product_id, period_start, MIN(open_price), MIN(date_scraped), MIN(close_price),
+           MAX(date_scraped), MIN(price), MAX(price), SUM(price), COUNT(*), MAX(bids_count)
+    FROM (
+        SELECT product_id, {period} AS period_start, price, bids_count, date_scraped,
+               FIRST_VALUE(price) OVER (PARTITION BY product_id, {period} ORDER BY date_scraped) AS open_price,
+               FIRST_VALUE(price) OVER (PARTITION BY product_id, {period} ORDER BY date_scraped DESC) AS close_price
+        FROM price_history
+        WHERE price IS NOT NULL AND date_scraped IS NOT NULL {where}
+    ) observations
+    GROUP BY product_id, period_start
+"""
+
+
+def record_price_rollups(cursor, observations):
+    """
+    Ajoute des relevés qui viennent d'être insérés dans price_history :
+    observations = [(product_id, price, bids_count, date_scraped), ...], date_scraped=None
+    correspondant à NOW() côté MySQL (comme l'INSERT du pipeline). Un seul aller-retour
+    par résolution. Le commit reste à la charge de l'appelant.
+    """
+    observations = [row for row in observations if row[1] is not None]
+    if not observations:
+        return
+    for table, period in ROLLUPS.values():
+        row = f"(%s, {period.format(at=_AT)}, %s, {_AT}, %s, {_AT}, %s, %s, %s, 1, %s)"
+        period_dates = period.count("{at}")
+        params = []
+        for product_id, price, bids_count, date_scraped in observations:
+            params.extend([product_id] + [date_scraped] * period_dates)
+            params.extend([price, date_scraped, price, date_scraped, price, price, price, bids_count])
+        cursor.execute(_UPSERT_SQL.format(table=table, values=", ".join([row] * len(observations))), params)
+
+
+def rebuild_price_rollups(cursor, product_ids=None):
+    """
+    Reconstruit les agrégats depuis price_history, pour tout le catalogue ou
+    seulement pour les product_ids donnés. Le commit reste à la charge de l'appelant.
+    """
+    ids_filter = ""
+    params = None
+    if product_ids is not None:
+        product_ids = list(product_ids)
+        if not product_ids:
+            return
+        ids_filter = f"product_id IN ({', '.join(['%s'] * len(product_ids))})"
+        params = product_ids
+
+    for table, period in ROLLUPS.values():
+        cursor.execute(f"DELETE FROM {table} {'WHERE ' + ids_filter if ids_filter else ''}", params)
+        cursor.execute(_REBUILD_SQL.format(
+            table=table,
+            period=period.format(at="date_scraped"),
+            where=f"AND {ids_filter}" if ids_filter else ""
+        ), params)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Maintenance des agrégats de prix journaliers / hebdomadaires.")
+    parser.add_argument("--rebuild", action="store_true",
+                        help="Reconstruit entièrement les agrégats depuis price_history.")
+    parser.add_argument("--product-id", type=int, action="append", dest="product_ids",
+                        help="Limite la reconstruction à ce produit (option répétable).")
+    args = parser.parse_args()
+
+    if not args.rebuild:
+        parser.print_help()
+        return
+
+    conn = get_connection()
+    cursor = conn.cursor()
+    try:
+        rebuild_price_rollups(cursor, args.product_ids)
+        if args.product_ids:
+            invalidate_products(cursor, args.product_ids)
+        else:
+            invalidate_all(cursor)
+        conn.commit()
+        for table, _period in ROLLUPS.values():
+            cursor.execute(f"SELECT COUNT(*) FROM {table}")
+            print(f"{table} reconstruite : {cursor.fetchone()[0]} lignes.")
+    finally:
+        cursor.close()
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
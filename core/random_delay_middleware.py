@@ -2,6 +2,8 @@
 import time
 import random
 import logging
+from urllib.parse import urlparse
+from twisted.internet.task import deferLater
 
 logger = logging.getLogger(__name__)
 
@@ -14,6 +16,46 @@ def shorten_url(url, max_length=60):
     return url if len(url) <= max_length else url[:max_length] + "..."
 
 class RandomDelayMiddleware:
+    """
+    Délai de politesse aléatoire entre deux requêtes d'un même slot (domaine + proxy).
+
+    Le délai est planifié sur le reactor (Deferred) au lieu d'un time.sleep : le reste
+    du crawl (autres slots, parsing, pipeline) continue pendant l'attente. Chaque slot
+    garde sa propre horloge, donc les requêtes passant par des proxies différents
+    avancent en parallèle tout en restant espacées de RANDOM_DELAY_MIN..MAX secondes
+    sur un même proxy.
+
+    Doit être placé après ProxyMiddleware pour connaître le proxy de la requête.
+    request.meta['backoff_delay'] (secondes) s'ajoute au délai de cette seule requête.
+    """
+
+    def __init__(self, min_delay=2.0, max_delay=5.0):
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        # slot -> instant (time.monotonic) à partir duquel la prochaine requête peut partir
+        self.next_ready = {}
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        return cls(
+            min_delay=crawler.settings.getfloat('RANDOM_DELAY_MIN', 2.0),
+            max_delay=crawler.settings.getfloat('RANDOM_DELAY_MAX', 5.0),
+        )
+
+    @staticmethod
+    def slot_key(request):
+        return (urlparse(request.url).netloc, request.meta.get('proxy'))
+
     def process_request(self, request, spider):
-        delay = random.uniform(2, 5)
-        time.sleep(delay)
\ No newline at end of file
+        slot = self.slot_key(request)
+        now = time.monotonic()
+        ready_at = max(now, self.next_ready.get(slot, now)) + random.uniform(self.min_delay, self.max_delay)
+        self.next_ready[slot] = ready_at
+        # Attente supplémentaire propre à la requête (ex. nouvel essai après un CAPTCHA),
+        # sans décaler les autres requêtes du slot
+        delay = ready_at - now + request.meta.pop('backoff_delay', 0)
+        logger.debug(f"{ANSI_GREEN}[RandomDelay] {shorten_url(request.url)} dans {delay:.2f}s (slot {slot[0]}){ANSI_RESET}")
+        # Import tardif : le reactor est installé par Scrapy avant le chargement des middlewares
+        from twisted.internet import reactor
+        # Le Deferred rend la main au reactor ; Scrapy reprend la requête quand il se déclenche
+        return deferLater(reactor, delay, lambda: None)
@@ -0,0 +1,306 @@
+# core/refresh_scheduler.py
+"""
+Planification du refresh : au lieu de revisiter tout le catalogue à chaque passage,
+chaque produit reçoit une date de prochain refresh et une priorité dans la table
+refresh_queue, calculées à partir de ce qui est déjà en base :
+
+  - ended : produit terminé, retiré de la file ;
+  - listing_type + time_remaining : les enchères proches de la fin sont revisitées
+    souvent, puis une dernière fois juste après l'heure de fin estimée ;
+  - volatilité récente de price_history : un prix qui bouge est revisité plus souvent.
+
+La date de prochain refresh est calculée à partir du dernier refresh réussi
+(last_refreshed_at), donc replanifier est idempotent et un redémarrage ne relance pas
+un balayage complet. Un fetch en échec n'avance pas last_refreshed_at : le produit est
+retenté après un court délai (raison "retry") qui s'allonge tant que les échecs durent.
+refresh_products.py --scheduled consomme la file dans la limite d'un budget horaire
+(REFRESH_BUDGET_PER_HOUR) et chaque passage est journalisé dans refresh_runs.
+
+    python -m core.refresh_scheduler --plan     # recalcule la file
+    python -m core.refresh_scheduler --stats    # fetchs économisés vs balayage complet
+"""
+
+import argparse
+import datetime
+import os
+import re
+
+from core.db_connection import connection
+
+REFRESH_BUDGET_PER_HOUR = int(os.getenv("REFRESH_BUDGET_PER_HOUR", 2000))
+
+# Enchères : (temps restant max en secondes, intervalle de refresh en secondes)
+AUCTION_TIERS = [
+    (3600, 5 * 60),
+    (6 * 3600, 30 * 60),
+    (24 * 3600, 2 * 3600),
+]
+AUCTION_MAX_INTERVAL = 12 * 3600
+# Revisite juste après l'heure de fin estimée pour constater la fin de l'enchère
+AUCTION_END_GRACE = 5 * 60
+
+# Prix fixe : intervalle de base, réduit par la volatilité
+FIXED_PRICE_INTERVAL = 24 * 3600
+MIN_INTERVAL = 3600
+VOLATILITY_DAYS = 7
+VOLATILITY_WEIGHT = 10     # intervalle / (1 + poids * coefficient de variation)
+
+AUCTION_TYPES = ("Auction", "Auction + BIN")
+
+# Fetch en échec : nouvel essai après la moitié du temps écoulé depuis le dernier
+# refresh réussi, borné à [RETRY_MIN_DELAY, RETRY_MAX_DELAY]
+RETRY_MIN_DELAY = 5 * 60
+RETRY_MAX_DELAY = 2 * 3600
+
+_DURATION_RE = re.compile(
+    r"(\d+)\s*(days?|d|hours?|hrs?|h|minutes?|mins?|m|seconds?|secs?|s)\b",
+    re.IGNORECASE,
+)
+_UNIT_SECONDS = {"d": 86400, "h": 3600, "m": 60, "s": 1}
+
+
+def parse_time_remaining(text):
+    """
+    Convertit le temps restant affiché par eBay ("2d 4h", "Ends in 13h 5m", "5m 12s")
+    en secondes. Retourne None si rien n'est reconnu.
+    """
+    if not text:
+        return None
+    total = 0
+    found = False
+    for value, unit in _DURATION_RE.findall(text):
+        total += int(value) * _UNIT_SECONDS[unit[0].lower()]
+        found = True
+    return total if found else None
+
+
+def compute_schedule(product, now, volatility=0.0):
+    """
+    Calcule (next_refresh_at, priority, reason) pour un produit, ou None s'il est terminé.
+
+    product : dict avec listing_type, time_remaining, ended, observed_at (date du relevé
+    dont provient time_remaining) et last_refreshed_at.
+    La priorité vaut le nombre de refresh souhaités par heure : c'est elle qui départage
+    les produits dus quand le budget ne permet pas de tous les revisiter.
+    """
+    if product.get("ended"):
+        return None
+    last = product.get("last_refreshed_at")
+
+    if product.get("listing_type") in AUCTION_TYPES:
+        remaining = parse_time_remaining(product.get("time_remaining"))
+        if remaining is not None:
+            end_at = (product.get("observed_at") or now) + datetime.timedelta(seconds=remaining)
+            left = (end_at - now).total_seconds()
+            if left <= 0:
+                # Fin estimée dépassée mais pas encore constatée : à revisiter en priorité
+                check_at = end_at + datetime.timedelta(seconds=AUCTION_END_GRACE)
+                if last is not None and last >= check_at:
+                    interval = AUCTION_MAX_INTERVAL
+                    return last + datetime.timedelta(seconds=interval), 3600 / interval, "auction_overdue"
+                return check_at, 3600 / AUCTION_TIERS[0][1], "auction_ended"
+            interval = next((step for limit, step in AUCTION_TIERS if left <= limit), AUCTION_MAX_INTERVAL)
+            next_at = (last or now) + datetime.timedelta(seconds=interval)
+            # Jamais après la fin de l'enchère (+ marge)
+            next_at = min(next_at, end_at + datetime.timedelta(seconds=AUCTION_END_GRACE))
+            return next_at, 3600 / interval, "auction"
+
+    interval = max(MIN_INTERVAL, FIXED_PRICE_INTERVAL / (1 + VOLATILITY_WEIGHT * (volatility or 0.0)))
+    reason = "volatile" if interval < FIXED_PRICE_INTERVAL else "fixed_price"
+    return (last or now) + datetime.timedelta(seconds=interval), 3600 / interval, reason
+
+
+class RefreshScheduler:
+    def __init__(self, budget_per_hour=REFRESH_BUDGET_PER_HOUR):
+        self.budget_per_hour = budget_per_hour
+
+    def budget_for(self, period_seconds):
+        """Nombre de fetchs autorisés pour un passage couvrant period_seconds."""
+        return max(1, int(self.budget_per_hour * period_seconds / 3600))
+
+    # --- Planification ---
+
+    def load_volatility(self, cursor, product_ids=None):
+        """Coefficient de variation du prix sur les VOLATILITY_DAYS derniers jours."""
+        where, params = "", [VOLATILITY_DAYS]
+        if product_ids is not None:
+            where = f"AND product_id IN ({', '.join(['%s'] * len(product_ids))})"
+            params += list(product_ids)
+        cursor.execute(f"""
+            SELECT product_id, STDDEV_POP(price) / NULLIF(AVG(price), 0)
+            FROM price_history
+            WHERE date_scraped >= NOW() - INTERVAL %s DAY {where}
+            GROUP BY product_id
+            HAVING COUNT(*) > 1
+        """, params)
+        return {product_id: float(cv or 0) for product_id, cv in cursor.fetchall()}
+
+    def plan(self, cursor, product_ids=None, refreshed=False):
+        """
+        (Re)calcule la file pour tout le catalogue ou pour les product_ids donnés.
+        refreshed=True marque ces produits comme revisités maintenant.
+        Retourne le nombre de produits planifiés. Le commit reste à la charge de l'appelant.
+        """
+        if product_ids is not None:
+            product_ids = list(product_ids)
+            if not product_ids:
+                return 0
+        where, params = "", []
+        if product_ids is not None:
+            where = f"WHERE p.product_id IN ({', '.join(['%s'] * len(product_ids))})"
+            params = product_ids
+        if refreshed:
+            cursor.execute(f"""
+                INSERT INTO refresh_queue (product_id, next_refresh_at, priority, reason, last_refreshed_at)
+                SELECT p.product_id, NOW(), 0, 'refreshed', NOW() FROM product p {where}
+                ON DUPLICATE KEY UPDATE last_refreshed_at = NOW()
+            """, params)
+
+        cursor.execute("SELECT NOW()")
+        now = cursor.fetchone()[0]
+        cursor.execute(f"""
+            SELECT p.product_id, p.listing_type, p.time_remaining, p.ended,
+                   lp.date_scraped, q.last_refreshed_at
+            FROM product p
+            LEFT JOIN product_latest_price lp ON lp.product_id = p.product_id
+            LEFT JOIN refresh_queue q ON q.product_id = p.product_id
+            {where}
+        """, params)
+        products = cursor.fetchall()
+        volatility = self.load_volatility(cursor, product_ids)
+
+        rows, ended = [], []
+        for product_id, listing_type, time_remaining, is_ended, observed_at, last_refreshed_at in products:
+            schedule = compute_schedule({
+                "listing_type": listing_type,
+                "time_remaining": time_remaining,
+                "ended": is_ended,
+                "observed_at": observed_at,
+                "last_refreshed_at": last_refreshed_at,
+            }, now, volatility.get(product_id, 0.0))
+            if schedule is None:
+                ended.append(product_id)
+                continue
+            next_at, priority, reason = schedule
+            rows.append((product_id, next_at, priority, reason))
+
+        # VALUES en %s purs : mysql-connector regroupe executemany en INSERT multi-lignes
+        for start in range(0, len(rows), 1000):
+            cursor.executemany("""
+                INSERT INTO refresh_queue (product_id, next_refresh_at, priority, reason)
+                VALUES (%s, %s, %s, %s)
+                ON DUPLICATE KEY UPDATE
+                    reason = IF(reason = 'retry' AND next_refresh_at > NOW(), reason, VALUES(reason)),
+                    next_refresh_at = IF(reason = 'retry' AND next_refresh_at > NOW(),
+                                         next_refresh_at, VALUES(next_refresh_at)),
+                    priority = VALUES(priority)
+            """, rows[start:start + 1000])
+        for start in range(0, len(ended), 1000):
+            chunk = ended[start:start + 1000]
+            cursor.execute(
+                f"DELETE FROM refresh_queue WHERE product_id IN ({', '.join(['%s'] * len(chunk))})",
+                chunk
+            )
+        return len(rows)
+
+    def plan_retry(self, cursor, product_ids):
+        """
+        Replanifie des produits dont le fetch a échoué, sans toucher à last_refreshed_at :
+        nouvel essai dans RETRY_MIN_DELAY..RETRY_MAX_DELAY selon l'ancienneté du dernier
+        succès. Un plan() complet conserve ce délai tant qu'il n'est pas échu.
+        Le commit reste à la charge de l'appelant.
+        """
+        product_ids = list(product_ids)
+        if not product_ids:
+            return
+        cursor.execute(f"""
+            UPDATE refresh_queue
+            SET next_refresh_at = NOW() + INTERVAL LEAST(%s, GREATEST(%s,
+                    COALESCE(TIMESTAMPDIFF(SECOND, last_refreshed_at, NOW()) DIV 2, 0))) SECOND,
+                reason = 'retry'
+            WHERE product_id IN ({', '.join(['%s'] * len(product_ids))})
+        """, [RETRY_MAX_DELAY, RETRY_MIN_DELAY] + product_ids)
+
+    # --- Consommation ---
+
+    def due(self, cursor, limit):
+        """
+        Produits à revisiter maintenant, les plus prioritaires d'abord
+        (chaque heure de retard ajoute 1 à la priorité pour éviter la famine).
+        """
+        cursor.execute("""
+            SELECT p.product_id, p.url, p.title
+            FROM refresh_queue q
+            JOIN product p ON p.product_id = q.product_id
+            WHERE q.next_refresh_at <= NOW()
+              AND (p.ended = 0 OR p.ended IS NULL)
+              AND p.url IS NOT NULL AND p.url <> ''
+            ORDER BY q.priority + TIMESTAMPDIFF(SECOND, q.next_refresh_at, NOW()) / 3600 DESC
+            LIMIT %s
+        """, (limit,))
+        columns = [column[0] for column in cursor.description]
+        return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+    def count_due(self, cursor):
+        cursor.execute("SELECT COUNT(*) FROM refresh_queue WHERE next_refresh_at <= NOW()")
+        return cursor.fetchone()[0]
+
+    def record_run(self, cursor, due, fetched):
+        """
+        Journalise un passage ; full_sweep est ce qu'aurait coûté l'ancien refresh
+        (tous les produits de la table).
+        """
+        cursor.execute("SELECT COUNT(*) FROM product")
+        full_sweep = cursor.fetchone()[0]
+        cursor.execute("""
+            INSERT INTO refresh_runs (started_at, budget, due, fetched, full_sweep)
+            VALUES (NOW(), %s, %s, %s, %s)
+        """, (self.budget_per_hour, due, fetched, full_sweep))
+        return full_sweep
+
+    def stats(self, cursor):
+        cursor.execute("""
+            SELECT COUNT(*), COALESCE(SUM(fetched), 0), COALESCE(SUM(full_sweep), 0), MAX(started_at)
+            FROM refresh_runs
+        """)
+        runs, fetched, full_sweep, last_run = cursor.fetchone()
+        cursor.execute("""
+            SELECT reason, COUNT(*), SUM(next_refresh_at <= NOW())
+            FROM refresh_queue
+            GROUP BY reason
+        """)
+        queue = {reason: {"queued": int(count), "due": int(due or 0)}
+                 for reason, count, due in cursor.fetchall()}
+        return {
+            "budget_per_hour": self.budget_per_hour,
+            "runs": int(runs),
+            "fetched": int(fetched),
+            "full_sweep_fetches": int(full_sweep),
+            "fetches_saved": int(full_sweep) - int(fetched),
+            "saved_ratio": round(1 - int(fetched) / int(full_sweep), 4) if full_sweep else None,
+            "last_run": last_run.strftime('%Y-%m-%d %H:%M:%S') if last_run else None,
+            "queue": queue,
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Maintenance de la file de refresh (refresh_queue).")
+    parser.add_argument("--plan", action="store_true", help="Recalcule la file pour tout le catalogue.")
+    parser.add_argument("--stats", action="store_true", help="Affiche la file et les fetchs économisés.")
+    args = parser.parse_args()
+
+    scheduler = RefreshScheduler()
+    with connection() as conn:
+        cursor = conn.cursor()
+        if args.plan:
+            planned = scheduler.plan(cursor)
+            conn.commit()
+            print(f"[refresh_scheduler] {planned} produits planifiés.")
+        if args.stats or not args.plan:
+            for key, value in scheduler.stats(cursor).items():
+                print(f"  {key:<20}: {value}")
+        cursor.close()
+
+
+if __name__ == "__main__":
+    main()
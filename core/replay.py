@@ -0,0 +1,329 @@
+# core/replay.py
+"""
+Enregistrement et rejeu hors ligne des pages eBay (recherche et annonces).
+
+Enregistrement : pendant un vrai crawl, ArchiveRecorderMiddleware écrit chaque
+réponse 200 (URL demandée, URL finale, statut, en-têtes, corps) dans une archive :
+
+    scrapy crawl ebay_spider -a keyword="Funko Pop Doctor Doom #561" -s REPLAY_RECORD_DIR=archives/doom
+
+L'archive est un répertoire de segments zstd (une trame compressée par réponse,
+lisible par accès direct) accompagnés chacun d'un index JSON lines (URL -> position
+dans le segment). Chaque processus écrit ses propres segments ; à la lecture, la
+dernière réponse enregistrée pour une URL l'emporte.
+
+Rejeu : ReplayDownloadHandler remplace le téléchargement HTTP et sert les réponses
+de l'archive, sans proxy, délai ni réseau. Le spider, les middlewares et le pipeline
+tournent tels quels, à la vitesse du CPU :
+
+    python -m core.replay crawl archives/doom --keyword "Funko Pop Doctor Doom #561"
+    python -m core.replay crawl archives/doom --keywords-file watchlist.txt --pipeline batch
+    python -m core.replay info archives/doom
+
+Une URL absente de l'archive reçoit une réponse 404 (comptée dans replay/misses).
+"""
+
+import argparse
+import glob
+import json
+import os
+import time
+from collections import namedtuple
+
+import zstandard
+from scrapy import signals
+from scrapy.exceptions import NotConfigured
+from scrapy.http import HtmlResponse
+from twisted.internet import defer
+
+from core.http_cache import KEPT_HEADERS, page_kind
+
+# Taille d'un segment avant d'en ouvrir un nouveau
+SEGMENT_BYTES = 64 * 1024 * 1024
+ZSTD_LEVEL = 9
+
+ArchivedResponse = namedtuple("ArchivedResponse", "url final_url status headers body")
+
+
+class ArchiveWriter:
+    """Ajoute des réponses à une archive (segments propres à ce processus)."""
+
+    def __init__(self, directory, segment_bytes=SEGMENT_BYTES, level=ZSTD_LEVEL):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.compressor = zstandard.ZstdCompressor(level=level)
+        self.prefix = f"segment-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}"
+        self.segment_number = -1
+        self.segment = None
+        self.index = None
+        self.offset = 0
+        self.records = 0
+        self.bytes_written = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def open_segment(self):
+        self.close()
+        self.segment_number += 1
+        base = os.path.join(self.directory, f"{self.prefix}-{self.segment_number:04d}")
+        self.segment = open(base + ".zst", "ab")
+        self.index = open(base + ".idx", "a", encoding="utf-8")
+        self.offset = self.segment.tell()
+
+    def add(self, url, final_url, status, headers, body):
+        """Enregistre une réponse ; `headers` est une liste de paires (nom, valeur)."""
+        if self.segment is None or self.offset >= self.segment_bytes:
+            self.open_segment()
+        kept = [(name, value) for name, value in headers if name.lower() in KEPT_HEADERS]
+        frame = self.compressor.compress(json.dumps(kept).encode("utf-8") + b"\n" + body)
+        self.segment.write(frame)
+        self.index.write(json.dumps({
+            "url": url, "final_url": final_url, "status": status, "kind": page_kind(url, final_url, body),
+            "offset": self.offset, "length": len(frame), "raw_size": len(body), "recorded_at": time.time(),
+        }) + "\n")
+        self.offset += len(frame)
+        self.records += 1
+        self.bytes_written += len(frame)
+
+    def close(self):
+        for f in (self.segment, self.index):
+            if f is not None:
+                f.close()
+        self.segment = self.index = None
+
+
+class Archive:
+    """Lecture d'une archive : index complet en mémoire, corps lus à la demande."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.entries = {}    # url -> (segment, entrée d'index)
+        self.files = {}      # segment -> fichier ouvert
+        self.decompressor = zstandard.ZstdDecompressor()
+        for index_path in sorted(glob.glob(os.path.join(directory, "*.idx"))):
+            segment = index_path[:-len(".idx")] + ".zst"
+            with open(index_path, encoding="utf-8") as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    entry = json.loads(line)
+                    current = self.entries.get(entry["url"])
+                    if current is None or current[1]["recorded_at"] <= entry["recorded_at"]:
+                        self.entries[entry["url"]] = (segment, entry)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, url):
+        return url in self.entries
+
+    def get(self, url):
+        """ArchivedResponse de l'URL, ou None si elle n'a pas été enregistrée."""
+        found = self.entries.get(url)
+        if found is None:
+            return None
+        segment, entry = found
+        f = self.files.get(segment)
+        if f is None:
+            f = self.files[segment] = open(segment, "rb")
+        f.seek(entry["offset"])
+        data = self.decompressor.decompress(f.read(entry["length"]))
+        header, body = data.split(b"\n", 1)
+        return ArchivedResponse(url, entry["final_url"], entry["status"], json.loads(header), body)
+
+    def summary(self):
+        """{kind: (réponses, octets compressés, octets bruts)} de l'archive."""
+        kinds = {}
+        for _, entry in self.entries.values():
+            count, size, raw_size = kinds.get(entry["kind"], (0, 0, 0))
+            kinds[entry["kind"]] = (count + 1, size + entry["length"], raw_size + entry["raw_size"])
+        return kinds
+
+    def close(self):
+        for f in self.files.values():
+            f.close()
+        self.files = {}
+
+
+class ArchiveRecorderMiddleware:
+    """
+    Middleware de téléchargement : enregistre les réponses 200 des pages de
+    recherche et d'annonce dans REPLAY_RECORD_DIR, sous l'URL demandée avant
+    redirection (comme le cache HTTP) avec leur URL finale. Placé entre le cache
+    HTTP et ProxyMiddleware : les pages servies par le cache sont enregistrées
+    aussi, et RedirectMiddleware / CaptchaDetectionMiddleware ont déjà écarté
+    redirections et CAPTCHA quand la réponse arrive ici.
+    """
+
+    def __init__(self, writer, stats=None):
+        self.writer = writer
+        self.stats = stats
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        directory = crawler.settings.get("REPLAY_RECORD_DIR")
+        if not directory:
+            raise NotConfigured
+        middleware = cls(ArchiveWriter(directory), crawler.stats)
+        crawler.signals.connect(middleware.spider_closed, signal=signals.spider_closed)
+        return middleware
+
+    def process_response(self, request, response, spider):
+        if (response.status == 200 and "replay" not in response.flags
+                and ("/itm/" in request.url or "/sch/" in request.url)):
+            headers = [(name.decode("latin-1"), value.decode("latin-1"))
+                       for name, values in response.headers.items() for value in values]
+            url = request.meta.get("redirect_urls", [request.url])[0]
+            self.writer.add(url, response.url, response.status, headers, response.body)
+            if self.stats is not None:
+                self.stats.inc_value("replay/recorded")
+        return response
+
+    def spider_closed(self, spider):
+        self.writer.close()
+
+
+class ReplayDownloadHandler:
+    """
+    Handler de téléchargement (DOWNLOAD_HANDLERS http/https) qui sert les réponses
+    de l'archive REPLAY_DIR au lieu du réseau.
+    """
+
+    lazy = False
+
+    def __init__(self, archive, stats=None):
+        self.archive = archive
+        self.stats = stats
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        directory = crawler.settings.get("REPLAY_DIR")
+        if not directory:
+            raise NotConfigured
+        return cls(Archive(directory), crawler.stats)
+
+    def download_request(self, request, spider):
+        archived = self.archive.get(request.url)
+        if archived is None:
+            self.inc_stat("replay/misses")
+            response = HtmlResponse(url=request.url, status=404, body=b"", request=request, flags=["replay"])
+        else:
+            self.inc_stat("replay/hits")
+            response = HtmlResponse(url=archived.final_url, status=archived.status, headers=archived.headers,
+                                    body=archived.body, request=request, flags=["replay"])
+        return defer.succeed(response)
+
+    def inc_stat(self, key):
+        if self.stats is not None:
+            self.stats.inc_value(key)
+
+    def close(self):
+        self.archive.close()
+
+
+def replay_settings(archive, middlewares, concurrency=32):
+    """
+    Réglages du rejeu à partir des DOWNLOADER_MIDDLEWARES du projet : handler
+    d'archive, sans proxy, délai, AutoThrottle, cache HTTP ni enregistrement, et sans
+    préfiltre « prix récent » (qui dépend de la base).
+    """
+    handler = "core.replay.ReplayDownloadHandler"
+    middlewares = dict(middlewares)
+    for name in ("core.middlewares.ProxyMiddleware",
+                 "core.random_delay_middleware.RandomDelayMiddleware",
+                 "core.http_cache_middleware.HttpCacheMiddleware",
+                 "core.replay.ArchiveRecorderMiddleware"):
+        middlewares[name] = None
+    return {
+        "REPLAY_DIR": archive,
+        "DOWNLOAD_HANDLERS": {"http": handler, "https": handler},
+        "DOWNLOADER_MIDDLEWARES": middlewares,
+        "HTTP_CACHE_ENABLED": False,
+        "DOWNLOAD_DELAY": 0,
+        "RANDOMIZE_DOWNLOAD_DELAY": False,
+        "AUTOTHROTTLE_ENABLED": False,
+        "CONCURRENT_REQUESTS": concurrency,
+        "CONCURRENT_REQUESTS_PER_DOMAIN": concurrency,
+        "PREFILTER_RECENT_HOURS": 0,
+        "FEEDS": {},
+    }
+
+
+def run_replay(archive, keywords, pipeline=None, output=None, demo_limit=0, concurrency=32, overrides=None):
+    """
+    Rejoue un crawl d'EbaySpider depuis l'archive (dans le processus courant : le
+    reactor Twisted ne redémarre pas). Retourne le rapport : durée, pages, items,
+    réponses servies / absentes.
+    """
+    from scrapy.crawler import CrawlerProcess
+    from scrapy.utils.project import get_project_settings
+    from scrapers.spiders.ebay_spider import EbaySpider
+
+    settings = get_project_settings()
+    # Priorité "cmdline" : passe devant les custom_settings du spider (DOWNLOAD_DELAY, AutoThrottle)
+    middlewares = settings.getdict("DOWNLOADER_MIDDLEWARES")
+    settings.setdict(replay_settings(archive, middlewares, concurrency), priority="cmdline")
+    if pipeline:
+        settings.set("ITEM_PIPELINES", {pipeline: 300}, priority="cmdline")
+    if output:
+        settings.set("FEEDS", {output: {"format": "jsonlines", "encoding": "utf8"}}, priority="cmdline")
+    settings.setdict(overrides or {}, priority="cmdline")
+
+    process = CrawlerProcess(settings)
+    crawler = process.create_crawler(EbaySpider)
+    start = time.monotonic()
+    process.crawl(crawler, keywords=keywords, demo_limit=demo_limit)
+    process.start()
+    elapsed = time.monotonic() - start
+
+    stats = crawler.stats.get_stats()
+    return {
+        "elapsed": elapsed,
+        "pages": crawler.spider.page_count,
+        "items": stats.get("item_scraped_count", 0),
+        "hits": stats.get("replay/hits", 0),
+        "misses": stats.get("replay/misses", 0),
+        "stats": stats,
+    }
+
+
+def main():
+    from crawl_watchlist import PIPELINES, read_keyword_file
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    crawl = commands.add_parser("crawl", help="Rejoue un crawl depuis une archive")
+    crawl.add_argument("archive")
+    crawl.add_argument("--keyword", action="append", default=[], help="Mot-clé (option répétable)")
+    crawl.add_argument("--keywords-file", help="Fichier de mots-clés, un par ligne")
+    crawl.add_argument("--pipeline", choices=list(PIPELINES), default="none")
+    crawl.add_argument("--output", help="Export JSON lines des items")
+    crawl.add_argument("--demo-limit", type=int, default=0, help="Produits avant arrêt (0 = aucune limite)")
+    crawl.add_argument("--concurrency", type=int, default=32)
+
+    info = commands.add_parser("info", help="Contenu d'une archive par type de page")
+    info.add_argument("archive")
+    args = parser.parse_args()
+
+    if args.command == "info":
+        archive = Archive(args.archive)
+        print(f"{'type':<8} {'réponses':>9} {'Mo':>8} {'Mo bruts':>9}")
+        for kind, (count, size, raw_size) in sorted(archive.summary().items()):
+            print(f"{kind:<8} {count:>9} {size / 1e6:>8.1f} {raw_size / 1e6:>9.1f}")
+        print(f"{len(archive)} URL")
+        return
+
+    keywords = list(args.keyword)
+    if args.keywords_file:
+        keywords += read_keyword_file(args.keywords_file)
+    if not keywords:
+        parser.error("Aucun mot-clé (--keyword ou --keywords-file)")
+    report = run_replay(args.archive, keywords, PIPELINES[args.pipeline], args.output,
+                        args.demo_limit, args.concurrency)
+    rate = report["items"] / report["elapsed"] if report["elapsed"] else 0
+    print(f"\n[Rejeu] {report['pages']} pages, {report['items']} items en {report['elapsed']:.2f}s "
+          f"({rate:.1f} items/s) | {report['hits']} réponses servies, {report['misses']} absentes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,249 @@
+# core/response_cache.py
+"""
+Cache des réponses de l'API produit, invalidé à l'écriture.
+
+Les réponses sont stockées dans un backend (LRU en mémoire avec TTL, ou Redis si
+RESPONSE_CACHE_BACKEND=redis et que le paquet redis est installé). Chaque clé
+embarque la génération des portées dont dépend la réponse :
+
+  - "all"          : tout le catalogue (reconstruction de projection, catégories...) ;
+  - "products"     : les listes et tendances (toute écriture sur un produit) ;
+  - "product:<id>" : le détail et l'historique d'un produit.
+
+Les écrivains (MySQLPipeline, refresh_products, generate_fake_history...) appellent
+invalidate_products() dans la même transaction que leurs écritures : les générations
+sont incrémentées dans la table cache_invalidation. L'API relit les générations
+modifiées au plus toutes les RESPONSE_CACHE_SYNC_INTERVAL secondes, ce qui propage
+l'invalidation entre processus (crawl, refresh, workers Flask) sans message explicite.
+Une entrée d'une ancienne génération n'est plus jamais lue et sort du cache par LRU/TTL.
+"""
+
+import logging
+import os
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+from core.db_connection import connection
+
+logger = logging.getLogger(__name__)
+
+RESPONSE_CACHE_ENABLED = os.getenv("RESPONSE_CACHE_ENABLED", "1") not in ("0", "false", "False")
+RESPONSE_CACHE_BACKEND = os.getenv("RESPONSE_CACHE_BACKEND", "memory")                 # memory | redis
+RESPONSE_CACHE_REDIS_URL = os.getenv("RESPONSE_CACHE_REDIS_URL", "redis://localhost:6379/0")
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", 300))                       # secondes
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", 2048))
+RESPONSE_CACHE_SYNC_INTERVAL = float(os.getenv("RESPONSE_CACHE_SYNC_INTERVAL", 2))      # secondes
+
+# Relecture avec recouvrement : une transaction validée après la dernière synchro mais
+# horodatée avant reste visible (les générations ne font que croître, relire est sans effet).
+SYNC_OVERLAP = 60
+
+ALL_SCOPE = "all"
+PRODUCTS_SCOPE = "products"
+
+
+def product_scope(product_id):
+    return f"product:{product_id}"
+
+
+# --- Écrivains ---
+
+def invalidate_products(cursor, product_ids):
+    """
+    Invalide le détail des produits donnés et les listes. Le commit reste à la charge
+    de l'appelant : l'invalidation est visible en même temps que les données.
+    """
+    scopes = [product_scope(product_id) for product_id in sorted(set(product_ids))]
+    if scopes:
+        _bump(cursor, scopes + [PRODUCTS_SCOPE])
+
+
+def invalidate_all(cursor):
+    """Invalide toutes les réponses (reconstruction de projection, catégories...)."""
+    _bump(cursor, [ALL_SCOPE])
+
+
+def _bump(cursor, scopes):
+    # VALUES en %s purs : mysql-connector regroupe executemany en INSERT multi-lignes
+    cursor.executemany("""
+        INSERT INTO cache_invalidation (scope, generation)
+        VALUES (%s, %s)
+        ON DUPLICATE KEY UPDATE generation = generation + 1
+    """, [(scope, 1) for scope in scopes])
+
+
+# --- Backends ---
+
+class MemoryBackend:
+    """LRU en mémoire avec expiration (propre au processus)."""
+
+    name = "memory"
+
+    def __init__(self, max_entries=RESPONSE_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def size(self):
+        return len(self._entries)
+
+
+class RedisBackend:
+    """Backend partagé entre workers (Redis ou compatible : KeyDB, Valkey...)."""
+
+    name = "redis"
+    prefix = "price-tracker:response:"
+
+    def __init__(self, url=RESPONSE_CACHE_REDIS_URL):
+        import redis  # dépendance optionnelle
+        self.client = redis.Redis.from_url(url)
+        self.evictions = 0
+
+    def get(self, key):
+        data = self.client.get(self.prefix + key)
+        return pickle.loads(data) if data is not None else None
+
+    def set(self, key, value, ttl):
+        self.client.set(self.prefix + key, pickle.dumps(value), ex=max(1, int(ttl)))
+
+    def clear(self):
+        for key in self.client.scan_iter(self.prefix + "*"):
+            self.client.delete(key)
+
+    def size(self):
+        return sum(1 for _ in self.client.scan_iter(self.prefix + "*"))
+
+
+def make_backend(name=RESPONSE_CACHE_BACKEND):
+    if name == "redis":
+        try:
+            return RedisBackend()
+        except ImportError:
+            logger.warning("[response_cache] Paquet redis absent, repli sur le cache en mémoire.")
+    return MemoryBackend()
+
+
+# --- Cache ---
+
+class ResponseCache:
+    def __init__(self, backend=None, ttl=RESPONSE_CACHE_TTL, sync_interval=RESPONSE_CACHE_SYNC_INTERVAL,
+                 enabled=RESPONSE_CACHE_ENABLED):
+        self.backend = backend or make_backend()
+        self.ttl = ttl
+        self.sync_interval = sync_interval
+        self.enabled = enabled
+        self._generations = {}
+        self._synced_until = None
+        self._last_sync = 0.0
+        self._lock = threading.Lock()
+        self._counters = {}
+
+    def sync(self, force=False):
+        """Relit les générations modifiées depuis la dernière synchro."""
+        now = time.monotonic()
+        if not force and now - self._last_sync < self.sync_interval:
+            return
+        with self._lock:
+            if not force and now - self._last_sync < self.sync_interval:
+                return
+            with connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("SELECT NOW(6)")
+                db_now = cursor.fetchone()[0]
+                if self._synced_until is None:
+                    cursor.execute("SELECT scope, generation FROM cache_invalidation")
+                else:
+                    cursor.execute(
+                        "SELECT scope, generation FROM cache_invalidation "
+                        "WHERE updated_at >= %s - INTERVAL %s SECOND",
+                        (self._synced_until, SYNC_OVERLAP)
+                    )
+                for scope, generation in cursor.fetchall():
+                    self._generations[scope] = generation
+                cursor.close()
+            self._synced_until = db_now
+            self._last_sync = now
+
+    def key(self, name, scopes, args):
+        """Clé = endpoint + générations des portées + arguments de la requête."""
+        generations = ",".join(f"{scope}={self._generations.get(scope, 0)}"
+                               for scope in (ALL_SCOPE,) + tuple(scopes))
+        return f"{name}|{generations}|{args}"
+
+    def get(self, name, key):
+        value = self.backend.get(key)
+        self._count(name, "hits" if value is not None else "misses")
+        return value
+
+    def set(self, key, value):
+        self.backend.set(key, value, self.ttl)
+
+    def _count(self, name, counter):
+        with self._lock:
+            counters = self._counters.setdefault(name, {"hits": 0, "misses": 0, "not_modified": 0})
+            counters[counter] += 1
+
+    def count_not_modified(self, name):
+        self._count(name, "not_modified")
+
+    def stats(self):
+        with self._lock:
+            endpoints = {name: dict(counters) for name, counters in self._counters.items()}
+        for counters in endpoints.values():
+            lookups = counters["hits"] + counters["misses"]
+            counters["hit_ratio"] = round(counters["hits"] / lookups, 4) if lookups else None
+        hits = sum(counters["hits"] for counters in endpoints.values())
+        misses = sum(counters["misses"] for counters in endpoints.values())
+        return {
+            "enabled": self.enabled,
+            "backend": self.backend.name,
+            "ttl": self.ttl,
+            "entries": self.backend.size(),
+            "evictions": self.backend.evictions,
+            "hits": hits,
+            "misses": misses,
+            "not_modified": sum(counters["not_modified"] for counters in endpoints.values()),
+            "hit_ratio": round(hits / (hits + misses), 4) if hits + misses else None,
+            "endpoints": endpoints,
+        }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_response_cache():
+    """Cache partagé du processus."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ResponseCache()
+    return _cache
@@ -0,0 +1,211 @@
+# core/schema.py
+"""
+Tables et index annexes maintenus par l'application.
+
+Les tables principales (product, price_history, category) sont créées par le
+script SQL initial ; ce module ne s'occupe que des structures dérivées
+(projections, index de performance). Il est idempotent ; les tables d'agrégats
+créées par un passage sont remplies depuis price_history dans la foulée :
+
+    python -m core.schema
+"""
+
+from core.db_connection import get_connection
+from core.price_rollups import ROLLUPS, rebuild_price_rollups
+
+# Tables annexes : nom -> DDL (CREATE TABLE IF NOT EXISTS)
+TABLES = {
+    # Dernier relevé connu par produit, maintenu par le pipeline et les scripts
+    # de génération d'historique (voir core/latest_price.py).
+    "product_latest_price": """
+        CREATE TABLE IF NOT EXISTS product_latest_price (
+            product_id   INT NOT NULL PRIMARY KEY,
+            price        DECIMAL(10, 2) NULL,
+            date_scraped DATETIME NOT NULL,
+            KEY idx_latest_price_date (date_scraped)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+    """,
+    # Agrégats de prix par produit et par jour / semaine, tenus à jour par les
+    # pipelines (voir core/price_rollups.py). period_start : jour, ou lundi de la semaine.
+    "price_rollup_daily": """
+        CREATE TABLE IF NOT EXISTS price_rollup_daily (
+            product_id   INT NOT NULL,
+            period_start DATE NOT NULL,
+            open_price   DECIMAL(10, 2) NOT NULL,
+            open_at      DATETIME NOT NULL,
+            close_price  DECIMAL(10, 2) NOT NULL,
+            close_at     DATETIME NOT NULL,
+            min_price    DECIMAL(10, 2) NOT NULL,
+            max_price    DECIMAL(10, 2) NOT NULL,
+            sum_price    DECIMAL(16, 2) NOT NULL,
+            price_count  INT NOT NULL,
+            max_bids     INT NULL,
+            PRIMARY KEY (product_id, period_start)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+    """,
+    "price_rollup_weekly": """
+        CREATE TABLE IF NOT EXISTS price_rollup_weekly (
+            product_id   INT NOT NULL,
+            period_start DATE NOT NULL,
+            open_price   DECIMAL(10, 2) NOT NULL,
+            open_at      DATETIME NOT NULL,
+            close_price  DECIMAL(10, 2) NOT NULL,
+            close_at     DATETIME NOT NULL,
+            min_price    DECIMAL(10, 2) NOT NULL,
+            max_price    DECIMAL(10, 2) NOT NULL,
+            sum_price    DECIMAL(16, 2) NOT NULL,
+            price_count  INT NOT NULL,
+            max_bids     INT NULL,
+            PRIMARY KEY (product_id, period_start)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+    """,
+    # Valeur de marché par cluster d'annonces (voir core/market_value.py) :
+    # clusters, buckets du sketch de quantiles et prix compté pour chaque annonce
+    "market_cluster": """
+        CREATE TABLE IF NOT EXISTS market_cluster (
+            cluster_id           INT NOT NULL AUTO_INCREMENT PRIMARY KEY,
+            cluster_key          VARCHAR(255) NOT NULL,
+            keyword              VARCHAR(150) NOT NULL,
+            figure_number        VARCHAR(16) NOT NULL,
+            normalized_condition VARCHAR(50) NOT NULL,
+            in_box               BOOLEAN NOT NULL,
+            signed               BOOLEAN NOT NULL,
+            listing_count        INT NOT NULL DEFAULT 0,
+            price_sum            DECIMAL(16, 2) NOT NULL DEFAULT 0,
+            UNIQUE KEY idx_market_cluster_key (cluster_key),
+            KEY idx_market_cluster_figure (figure_number)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+    """,
+    "market_sketch_bucket": """
+        CREATE TABLE IF NOT EXISTS market_sketch_bucket (
+            cluster_id INT NOT NULL,
+            bucket     SMALLINT NOT NULL,
+            listings   INT NOT NULL,
+            PRIMARY KEY (cluster_id, bucket)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+    """,
+    "product_market_price": """
+        CREATE TABLE IF NOT EXISTS product_market_price (
+            product_id INT NOT NULL PRIMARY KEY,
+            cluster_id INT NOT NULL,
+            price      DECIMAL(10, 2) NOT NULL,
+            KEY idx_product_market_cluster (cluster_id)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+    """,
+    # Mots-clés suivis, crawlés ensemble par crawl_watchlist.py
+    "watchlist": """
+        CREATE TABLE IF NOT EXISTS watchlist (
+            keyword_id INT NOT NULL AUTO_INCREMENT PRIMARY KEY,
+            keyword    VARCHAR(255) NOT NULL,
+            enabled    BOOLEAN NOT NULL DEFAULT TRUE,
+            created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            UNIQUE KEY idx_watchlist_keyword (keyword)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+    """,
+    # File de refresh persistante : prochaine visite et priorité par produit
+    # (voir core/refresh_scheduler.py).
+    "refresh_queue": """
+        CREATE TABLE IF NOT EXISTS refresh_queue (
+            product_id        INT NOT NULL PRIMARY KEY,
+            next_refresh_at   DATETIME NOT NULL,
+            priority          DOUBLE NOT NULL DEFAULT 0,
+            reason            VARCHAR(32) NOT NULL,
+            last_refreshed_at DATETIME NULL,
+            KEY idx_refresh_queue_next (next_refresh_at)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+    """,
+    # Générations du cache de réponses de l'API, incrémentées par les écrivains
+    # (voir core/response_cache.py)
+    "cache_invalidation": """
+        CREATE TABLE IF NOT EXISTS cache_invalidation (
+            scope      VARCHAR(64) NOT NULL PRIMARY KEY,
+            generation BIGINT NOT NULL DEFAULT 0,
+            updated_at TIMESTAMP(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6) ON UPDATE CURRENT_TIMESTAMP(6),
+            KEY idx_cache_invalidation_updated (updated_at)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+    """,
+    # Un passage de refresh planifié par ligne, pour mesurer les fetchs économisés
+    "refresh_runs": """
+        CREATE TABLE IF NOT EXISTS refresh_runs (
+            run_id     INT NOT NULL AUTO_INCREMENT PRIMARY KEY,
+            started_at DATETIME NOT NULL,
+            budget     INT NOT NULL,
+            due        INT NOT NULL,
+            fetched    INT NOT NULL,
+            full_sweep INT NOT NULL
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+    """,
+}
+
+# Index ajoutés aux tables existantes : (table, nom de l'index, colonnes)
+INDEXES = [
+    ("price_history", "idx_price_history_product_date", "(product_id, date_scraped)"),
+    # Pagination par curseur de /api/produits (voir api/product_list.py) : InnoDB ajoute
+    # la clé primaire à chaque index secondaire, soit (price, product_id) et (ended, product_id)
+    ("product_latest_price", "idx_latest_price_price", "(price)"),
+    ("product", "idx_product_ended", "(ended)"),
+]
+
+
+def index_exists(cursor, table, index_name):
+    """
+    Vérifie dans information_schema si l'index existe déjà
+    (MySQL ne supporte pas CREATE INDEX IF NOT EXISTS).
+    """
+    cursor.execute("""
+        SELECT 1
+        FROM information_schema.statistics
+        WHERE table_schema = DATABASE()
+          AND table_name = %s
+          AND index_name = %s
+        LIMIT 1
+    """, (table, index_name))
+    return cursor.fetchone() is not None
+
+
+def table_exists(cursor, table):
+    cursor.execute("""
+        SELECT 1
+        FROM information_schema.tables
+        WHERE table_schema = DATABASE()
+          AND table_name = %s
+        LIMIT 1
+    """, (table,))
+    return cursor.fetchone() is not None
+
+
+def ensure_schema(conn=None):
+    """
+    Crée les tables et index annexes manquants. Les agrégats de prix nouvellement
+    créés sont remplis depuis price_history, sinon les lecteurs (tendances,
+    statistiques d'historique) ne verraient aucun produit existant.
+    """
+    own_conn = conn is None
+    if own_conn:
+        conn = get_connection()
+    cursor = conn.cursor()
+    try:
+        created = set()
+        for name, ddl in TABLES.items():
+            if not table_exists(cursor, name):
+                created.add(name)
+            cursor.execute(ddl)
+            print(f"[schema] Table {name} OK")
+        for table, index_name, columns in INDEXES:
+            if index_exists(cursor, table, index_name):
+                continue
+            cursor.execute(f"CREATE INDEX {index_name} ON {table} {columns}")
+            print(f"[schema] Index {index_name} créé sur {table}")
+        if created & {table for table, _period in ROLLUPS.values()}:
+            # Après les index : la reconstruction s'appuie sur (product_id, date_scraped)
+            rebuild_price_rollups(cursor)
+            print("[schema] Agrégats de prix remplis depuis price_history")
+        conn.commit()
+    finally:
+        cursor.close()
+        if own_conn:
+            conn.close()
+
+
+if __name__ == "__main__":
+    ensure_schema()
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Crawl de toute une liste de mots-clés (watchlist) en un seul crawl Scrapy au lieu
+d'un `scrapy crawl` par figurine.
+
+Toutes les URL de recherche sont semées dans le même EbaySpider : le démarrage de
+Scrapy/Twisted n'est payé qu'une fois, l'ordonnancement est équitable entre
+mots-clés (voir EbaySpider.next_priority) et chaque item garde le mot-clé qui l'a
+trouvé (champ keyword, utilisé par les clusters de valeur de marché). Avec
+--processes N, les mots-clés sont répartis sur N processus (un crawl chacun).
+
+    python crawl_watchlist.py --file watchlist.txt
+    python crawl_watchlist.py --from-db --processes 4
+    python crawl_watchlist.py "Funko Pop Doctor Doom #561" "Funko Pop Thanos #289"
+
+Le fichier contient un mot-clé par ligne (lignes vides et commentaires # ignorés) ;
+--from-db lit les mots-clés actifs de la table watchlist (voir core/schema.py).
+"""
+
+import argparse
+import json
+import multiprocessing
+import time
+
+# Pipelines d'écriture disponibles (voir scrapers/pipelines.py)
+PIPELINES = {
+    "batch": "scrapers.pipelines.MySQLBatchPipeline",
+    "single": "scrapers.pipelines.MySQLPipeline",
+    "none": None,
+}
+
+
+def read_keyword_file(path):
+    with open(path, encoding="utf-8") as f:
+        lines = [line.strip() for line in f]
+    return [line for line in lines if line and not line.startswith("#")]
+
+
+def read_watchlist():
+    from core.db_connection import connection
+    with connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT keyword FROM watchlist WHERE enabled ORDER BY keyword_id")
+        keywords = [row[0] for row in cursor.fetchall()]
+        cursor.close()
+    return keywords
+
+
+def shard_keywords(keywords, processes):
+    """Répartition à tour de rôle : des shards de tailles égales à un mot-clé près."""
+    shards = [[] for _ in range(max(1, min(processes, len(keywords))))]
+    for i, keyword in enumerate(keywords):
+        shards[i % len(shards)].append(keyword)
+    return shards
+
+
+def run_shard(task):
+    """
+    Un crawl Scrapy pour un shard de mots-clés (dans le processus courant).
+    Retourne le rapport du shard : durée, statistiques par mot-clé et compteurs Scrapy.
+    """
+    index, keywords, pipeline, output = task
+    from scrapy.crawler import CrawlerProcess
+    from scrapy.utils.project import get_project_settings
+    from scrapers.spiders.ebay_spider import EbaySpider
+
+    settings = get_project_settings()
+    if output:
+        settings.set("FEEDS", {output.format(shard=index): {"format": "jsonlines", "encoding": "utf8"}})
+    else:
+        settings.set("FEEDS", {})  # Pas de scraped_data.json partagé entre shards
+    if PIPELINES[pipeline]:
+        settings.set("ITEM_PIPELINES", {PIPELINES[pipeline]: 300})
+    # Pas de boîtes par produit : les shards écrivent en même temps sur la console
+    settings.set("REPORTER", "production")
+
+    process = CrawlerProcess(settings)
+    crawler = process.create_crawler(EbaySpider)
+    start = time.monotonic()
+    process.crawl(crawler, keywords=keywords, demo_limit=0)
+    process.start()
+    elapsed = time.monotonic() - start
+
+    stats = crawler.stats.get_stats()
+    return {
+        "shard": index,
+        "elapsed": elapsed,
+        "keywords": crawler.spider.keyword_report(),
+        "requests": stats.get("downloader/request_count", 0),
+        "items": stats.get("item_scraped_count", 0),
+    }
+
+
+def run(shards, pipeline, output):
+    tasks = [(index, keywords, pipeline, output) for index, keywords in enumerate(shards)]
+    if len(tasks) == 1:
+        return [run_shard(tasks[0])]
+    # Un processus neuf par shard : le reactor Twisted ne redémarre pas
+    context = multiprocessing.get_context("spawn")
+    with context.Pool(len(tasks), maxtasksperchild=1) as pool:
+        return pool.map(run_shard, tasks)
+
+
+def print_report(reports, wall_time):
+    print(f"\n{'mot-clé':<40} {'shard':>5} {'pages':>6} {'annonces':>9} {'items':>6} "
+          f"{'filtrés':>8} {'items/min':>10}")
+    for report in sorted(reports, key=lambda r: r["shard"]):
+        minutes = report["elapsed"] / 60
+        for keyword, stats in report["keywords"].items():
+            rate = stats["items"] / minutes if minutes else 0
+            print(f"{keyword[:40]:<40} {report['shard']:>5} {stats['pages']:>6} {stats['listings']:>9} "
+                  f"{stats['items']:>6} {stats['filtered']:>8} {rate:>10.1f}")
+
+    items = sum(report["items"] for report in reports)
+    requests = sum(report["requests"] for report in reports)
+    keywords = sum(len(report["keywords"]) for report in reports)
+    print(f"\n{keywords} mots-clés, {len(reports)} processus, {requests} requêtes, {items} items "
+          f"en {wall_time:.1f}s ({items / (wall_time / 60) if wall_time else 0:.1f} items/min)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("keywords", nargs="*", help="Mots-clés (en plus de --file / --from-db)")
+    parser.add_argument("--file", help="Fichier de mots-clés, un par ligne")
+    parser.add_argument("--from-db", action="store_true", help="Mots-clés actifs de la table watchlist")
+    parser.add_argument("--processes", type=int, default=1, help="Processus de crawl (shards)")
+    parser.add_argument("--pipeline", choices=list(PIPELINES), default="batch",
+                        help="Écriture en base des items (batch par défaut)")
+    parser.add_argument("--output", help="Export JSON lines par shard, ex. items-{shard}.jsonl")
+    parser.add_argument("--report-json", help="Écrit aussi le rapport par shard dans ce fichier")
+    args = parser.parse_args()
+
+    keywords = list(args.keywords)
+    if args.file:
+        keywords += read_keyword_file(args.file)
+    if args.from_db:
+        keywords += read_watchlist()
+    keywords = list(dict.fromkeys(keywords))
+    if not keywords:
+        parser.error("Aucun mot-clé (arguments, --file ou --from-db)")
+
+    shards = shard_keywords(keywords, args.processes)
+    start = time.monotonic()
+    reports = run(shards, args.pipeline, args.output)
+    wall_time = time.monotonic() - start
+
+    print_report(reports, wall_time)
+    if args.report_json:
+        with open(args.report_json, "w", encoding="utf-8") as f:
+            json.dump({"wall_time": wall_time, "shards": reports}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Export du catalogue produits en NDJSON (un produit par ligne) ou en tableau JSON.
+
+Même requête et même sérialisation que GET /api/produits?stream=... (voir
+api/product_list.py) : les lignes sont lues par lots sur un curseur non bufferisé
+et écrites au fil de l'eau, la mémoire reste constante quelle que soit la taille
+du catalogue.
+
+    python export_catalog.py --output catalog.ndjson
+    python export_catalog.py --format json --status active --fields product_id,title,price > actifs.json
+    python export_catalog.py --filter listing_type=Auction --filter min_price=20 --sort price-desc
+"""
+
+import argparse
+import resource
+import sys
+import time
+
+from api.product_list import STREAM_BATCH_SIZE, STREAM_FORMATS, build_list_query, stream_products
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--output", "-o", help="Fichier de sortie (sortie standard par défaut)")
+    parser.add_argument("--format", choices=list(STREAM_FORMATS), default="ndjson")
+    parser.add_argument("--fields", help="Champs exportés, séparés par des virgules (tous par défaut)")
+    parser.add_argument("--sort", help="Tri (default, price-asc, price-desc, date-desc, date-asc)")
+    parser.add_argument("--status", choices=["active", "ended"], help="Produits actifs ou terminés seulement")
+    parser.add_argument("--filter", action="append", default=[], metavar="NOM=VALEUR",
+                        help="Filtre de /api/produits (normalized_condition, listing_type, signed, "
+                             "in_box, category, min_price, max_price, q), répétable")
+    parser.add_argument("--batch-size", type=int, default=STREAM_BATCH_SIZE, help="Lignes lues par fetchmany")
+    args = parser.parse_args()
+
+    query_args = {}
+    for item in args.filter:
+        name, sep, value = item.partition("=")
+        if not sep:
+            parser.error(f"Filtre invalide : {item} (NOM=VALEUR attendu)")
+        query_args[name.strip()] = value.strip()
+    for name in ("fields", "sort", "status"):
+        if getattr(args, name):
+            query_args[name] = getattr(args, name)
+
+    try:
+        sql, params, fields, _, _ = build_list_query(query_args, paginate=False)
+    except ValueError as e:
+        parser.error(str(e))
+
+    out = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    start = time.perf_counter()
+    written = 0
+    try:
+        for chunk in stream_products(sql, params, fields, args.format, args.batch_size):
+            out.write(chunk)
+            written += len(chunk)
+    finally:
+        if args.output:
+            out.close()
+
+    elapsed = time.perf_counter() - start
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # Kio -> Mio (Linux)
+    print(f"[export] {written / 1024 / 1024:.1f} Mio écrits en {elapsed:.1f}s "
+          f"(pic mémoire {peak_rss:.0f} Mio)", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -17,7 +17,7 @@ import {
 } from '@fortawesome/free-solid-svg-icons';
 import './ProduitCard.css';
 
-function ProduitCard({ produit }) {
+function ProduitCard({ produit, trendData, trendsLoading }) {
     const price = typeof produit.price === 'number' ? produit.price : 0;
     const [priceHistory, setPriceHistory] = useState(null);
     const [percentChange, setPercentChange] = useState(null);
@@ -27,11 +27,26 @@ function ProduitCard({ produit }) {
 
     // Charger l'historique de prix et déterminer la tendance
     useEffect(() => {
+        // Tendance fournie par la page liste (endpoint groupé) : pas d'appel par carte
+        const applyTrendData = (data) => {
+            if (Array.isArray(data.sparkline) && data.sparkline.length >= 2) {
+                setPriceHistory(data.sparkline);
+            }
+            if (typeof data.variation === 'number') {
+                setPercentChange(data.variation.toFixed(1));
+            }
+            setTrend(data.trend);
+            if (data.trend === 'up') setTrendText('Price Rising');
+            else if (data.trend === 'down') setTrendText('Price Falling');
+            else setTrendText('Price Stable');
+        };
+
         const fetchPriceHistory = async () => {
             console.log(`⏳ Récupération des données pour produit ${produit.product_id}...`);
             try {
                 // URL API conforme au format de votre backend
-                const response = await fetch(`/api/produits/${produit.product_id}/historique-prix`);
+                // Une sparkline n'a besoin que de quelques points (réduction LTTB côté API)
+                const response = await fetch(`/api/produits/${produit.product_id}/historique-prix?downsample=lttb&points=24`);
 
                 // Vérifier que la réponse est OK
                 if (!response.ok) {
@@ -114,8 +129,13 @@ function ProduitCard({ produit }) {
             }
         };
 
-        fetchPriceHistory();
-    }, [produit.product_id]);
+        if (trendData) {
+            applyTrendData(trendData);
+        } else if (!trendsLoading) {
+            // Carte utilisée seule, ou échec de l'appel groupé : on interroge l'API pour ce produit
+            fetchPriceHistory();
+        }
+    }, [produit.product_id, trendData, trendsLoading]);
 
     // Déterminer l'icône et la classe CSS de tendance
     const getTrendIcon = () => {
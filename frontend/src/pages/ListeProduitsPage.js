@@ -1,6 +1,6 @@
 // frontend/src/pages/ListeProduitsPage.js
 import React, { useEffect, useState, useMemo, useCallback, useRef } from 'react';
-import { fetchProduits } from '../services/api';
+import { fetchProduitsPage, fetchProduitsSummary, fetchTrends } from '../services/api';
 import ProduitCard from '../components/ProduitCard';
 import './ListeProduitsPage.css';
 import useScrollRestoration from '../hooks/useScrollRestoration';
@@ -21,26 +21,27 @@ import {
     faTimes
 } from '@fortawesome/free-solid-svg-icons';
 
-// Nombre initial de produits à afficher
-const INITIAL_ITEMS_COUNT = 24;
-// Nombre de produits à ajouter à chaque chargement
-const ITEMS_INCREMENT = 12;
+// Délai avant d'envoyer la recherche au serveur (ms)
+const SEARCH_DEBOUNCE = 300;
+// Produits filtrés par tendance en dessous desquels on charge la page suivante d'office
+const MIN_VISIBLE_ITEMS = 24;
 
 function ListeProduitsPage() {
-    // Liste complète de produits récupérés depuis l'API
+    // Produits chargés jusqu'ici (pages successives de l'API, filtrées et triées côté serveur)
     const [produits, setProduits] = useState([]);
+    // Curseur de la page suivante (null quand tout est chargé)
+    const [nextCursor, setNextCursor] = useState(null);
     // Dictionnaire qui associe product_id -> "up"/"down"/"stable"
     const [trendById, setTrendById] = useState({});
+    // Données complètes par produit (tendance, variation, sparkline) passées aux cartes
+    const [trendDataById, setTrendDataById] = useState(null);
     // Filtre courant : "all", "up", "down", "stable"
     const [trendFilter, setTrendFilter] = useState('all');
-    // Terme de recherche
+    // Terme de recherche (saisi, puis envoyé au serveur après SEARCH_DEBOUNCE)
     const [searchTerm, setSearchTerm] = useState('');
+    const [debouncedSearch, setDebouncedSearch] = useState('');
     // Option de tri
     const [sortOption, setSortOption] = useState('default');
-    // Nombre de produits à afficher
-    const [displayCount, setDisplayCount] = useState(INITIAL_ITEMS_COUNT);
-    // Indique si tous les produits sont affichés
-    const [allDisplayed, setAllDisplayed] = useState(false);
     // Indique si on est en train de charger plus de produits
     const [loadingMore, setLoadingMore] = useState(false);
     // État pour afficher/masquer le dropdown de tri
@@ -55,7 +56,7 @@ function ListeProduitsPage() {
     const [trendsLoading, setTrendsLoading] = useState(true); // Nouvel état pour le chargement des tendances
     const [error, setError] = useState(null);
 
-    // État pour les statistiques
+    // Statistiques de toute la liste filtrée (endpoint /api/produits/summary)
     const [stats, setStats] = useState({
         count: 0,
         avgPrice: 0,
@@ -88,107 +89,81 @@ function ListeProduitsPage() {
         };
     }, []);
 
-    // 1) Charger tous les produits (sans filtre "active"/"ended")
+    // Envoyer la recherche au serveur une fois la saisie terminée
     useEffect(() => {
+        const timer = setTimeout(() => setDebouncedSearch(searchTerm.trim()), SEARCH_DEBOUNCE);
+        return () => clearTimeout(timer);
+    }, [searchTerm]);
+
+    // Paramètres de la liste envoyés à l'API (tri et recherche côté serveur)
+    const queryParams = useMemo(() => ({
+        sort: sortOption,
+        q: debouncedSearch
+    }), [sortOption, debouncedSearch]);
+
+    // Tendances des produits d'une page, via l'endpoint groupé /api/produits/trends
+    const loadTrends = useCallback(async (items) => {
+        if (items.length === 0) {
+            setTrendsLoading(false);
+            return;
+        }
+        try {
+            const data = await fetchTrends(items.map(p => p.product_id));
+            const trends = {};
+            for (const prod of items) {
+                // data[id].trend = "up"/"down"/"stable"
+                trends[prod.product_id] = (data[prod.product_id] && data[prod.product_id].trend) || 'stable';
+            }
+            setTrendDataById(prev => ({ ...(prev || {}), ...data }));
+            setTrendById(prev => ({ ...prev, ...trends }));
+        } catch (err) {
+            console.error('Erreur trend', err);
+        }
+        setTrendsLoading(false);
+    }, []);
+
+    // 1) Première page et statistiques à chaque changement de tri ou de recherche
+    useEffect(() => {
+        let cancelled = false;
         setLoading(true);
-        fetchProduits()
-            .then(data => {
-                setProduits(data);
+        setTrendsLoading(true);
+        fetchProduitsPage(queryParams)
+            .then(page => {
+                if (cancelled) return;
+                setProduits(page.items);
+                setNextCursor(page.next_cursor);
                 setLoading(false);
                 // Marquer le chargement initial comme terminé
                 setIsInitialLoad(false);
-
-                // Extraire des statistiques de base
-                if (data.length > 0) {
-                    const prices = data.map(p => p.price).filter(p => p !== null && p !== undefined);
-                    setStats(prev => ({
-                        ...prev,
-                        count: data.length,
-                        avgPrice: prices.length > 0 ? prices.reduce((a, b) => a + b, 0) / prices.length : 0,
-                        minPrice: prices.length > 0 ? Math.min(...prices) : 0,
-                        maxPrice: prices.length > 0 ? Math.max(...prices) : 0
-                    }));
-                }
+                loadTrends(page.items);
             })
             .catch(err => {
+                if (cancelled) return;
                 setError(err.message);
                 setLoading(false);
                 setIsInitialLoad(false);
                 setTrendsLoading(false); // Assurez-vous que trendsLoading est mis à false en cas d'erreur
             });
-    }, []);
-
-    // 2) Pour chaque produit, récupérer la tendance via /api/produits/:id/price-trend
-    useEffect(() => {
-        let risingCount = 0;
-        let fallingCount = 0;
-        let stableCount = 0;
-
-        const fetchTrends = async () => {
-            // Définir trendsLoading à true avant de commencer
-            setTrendsLoading(true);
-
-            for (const prod of produits) {
-                try {
-                    const response = await fetch(`/api/produits/${prod.product_id}/price-trend`);
-                    const data = await response.json();
-                    // data.trend = "up"/"down"/"stable"
-                    setTrendById(prev => ({
-                        ...prev,
-                        [prod.product_id]: data.trend
-                    }));
-
-                    // Mettre à jour les compteurs de tendance
-                    if (data.trend === 'up') risingCount++;
-                    else if (data.trend === 'down') fallingCount++;
-                    else stableCount++;
-                } catch (err) {
-                    console.error('Erreur trend', err);
-                }
-            }
 
-            // Mettre à jour les statistiques une fois toutes les tendances récupérées
-            setStats(prev => ({
-                ...prev,
-                risingCount,
-                fallingCount,
-                stableCount
-            }));
+        fetchProduitsSummary(queryParams)
+            .then(summary => {
+                if (cancelled) return;
+                setStats({
+                    count: summary.count,
+                    avgPrice: summary.avg_price || 0,
+                    minPrice: summary.min_price || 0,
+                    maxPrice: summary.max_price || 0,
+                    risingCount: summary.rising,
+                    fallingCount: summary.falling,
+                    stableCount: summary.stable
+                });
+            })
+            .catch(err => console.error('Erreur statistiques', err));
 
-            // Marquer le chargement des tendances comme terminé
-            setTrendsLoading(false);
+        return () => {
+            cancelled = true;
         };
-
-        if (produits.length > 0) {
-            fetchTrends();
-        } else {
-            setTrendsLoading(false); // Pas de produits, donc pas besoin de charger les tendances
-        }
-    }, [produits]);
-
-    // Fonction pour gérer le tri des produits
-    const sortProducts = (products, option) => {
-        switch (option) {
-            case 'price-asc':
-                return [...products].sort((a, b) => a.price - b.price);
-            case 'price-desc':
-                return [...products].sort((a, b) => b.price - a.price);
-            case 'date-desc':
-                return [...products].sort((a, b) => {
-                    const dateA = a.last_scraped_date ? new Date(a.last_scraped_date) : new Date(0);
-                    const dateB = b.last_scraped_date ? new Date(b.last_scraped_date) : new Date(0);
-                    return dateB - dateA;
-                });
-            case 'date-asc':
-                return [...products].sort((a, b) => {
-                    const dateA = a.last_scraped_date ? new Date(a.last_scraped_date) : new Date(0);
-                    const dateB = b.last_scraped_date ? new Date(b.last_scraped_date) : new Date(0);
-                    return dateA - dateB;
-                });
-            default:
-                return products;
-        }
-    };
+    }, [queryParams, loadTrends]);
 
     // Fonction pour afficher le label du tri sélectionné
     const getSortLabel = (option) => {
@@ -206,35 +181,32 @@ function ListeProduitsPage() {
         }
     };
 
-    // 3) Filtrer et trier les produits
-    const filteredAndSortedProducts = useMemo(() => {
-        // D'abord appliquer le filtre de tendance
-        let filtered = produits.filter(prod => {
-            const productTrend = trendById[prod.product_id];
-            if (!productTrend) {
-                return trendFilter === 'all';
-            }
-            if (trendFilter === 'all') return true;
-            return productTrend === trendFilter;
-        });
-
-        // Ensuite appliquer le filtre de recherche
-        if (searchTerm.trim() !== '') {
-            const term = searchTerm.toLowerCase().trim();
-            filtered = filtered.filter(prod =>
-                prod.title.toLowerCase().includes(term) ||
-                (prod.seller_username && prod.seller_username.toLowerCase().includes(term))
-            );
-        }
+    // 2) Filtre de tendance sur les produits chargés (le tri et la recherche sont faits par l'API)
+    const filteredProducts = useMemo(() => {
+        if (trendFilter === 'all') return produits;
+        return produits.filter(prod => trendById[prod.product_id] === trendFilter);
+    }, [produits, trendById, trendFilter]);
 
-        // Enfin appliquer le tri
-        return sortProducts(filtered, sortOption);
-    }, [produits, trendById, trendFilter, searchTerm, sortOption]);
+    const allDisplayed = nextCursor === null;
 
-    // Récupérer les produits à afficher (basé sur displayCount)
-    const displayedProducts = useMemo(() => {
-        return filteredAndSortedProducts.slice(0, displayCount);
-    }, [filteredAndSortedProducts, displayCount]);
+    // Fonction pour charger la page suivante
+    const loadMoreProducts = useCallback(async () => {
+        if (loadingMore || nextCursor === null) return;
+
+        setLoadingMore(true);
+        // Les nouvelles cartes attendent l'appel groupé au lieu d'interroger l'API une par une
+        setTrendsLoading(true);
+        try {
+            const page = await fetchProduitsPage(queryParams, nextCursor);
+            setProduits(prev => [...prev, ...page.items]);
+            setNextCursor(page.next_cursor);
+            loadTrends(page.items);
+        } catch (err) {
+            console.error('Erreur lors du chargement de la page suivante', err);
+            setTrendsLoading(false);
+        }
+        setLoadingMore(false);
+    }, [loadingMore, nextCursor, queryParams, loadTrends]);
 
     // Observer pour l'infinite scroll
     const observer = useRef();
@@ -247,33 +219,15 @@ function ListeProduitsPage() {
             }
         }, { threshold: 0.5 });
         if (node) observer.current.observe(node);
-    }, [loading, loadingMore, allDisplayed]);
-
-    // Fonction pour charger plus de produits
-    const loadMoreProducts = () => {
-        if (loadingMore || allDisplayed) return;
-
-        setLoadingMore(true);
+    }, [loading, loadingMore, allDisplayed, loadMoreProducts]);
 
-        // Simuler un délai pour montrer le chargement (peut être supprimé en production)
-        setTimeout(() => {
-            setDisplayCount(prev => {
-                const newCount = prev + ITEMS_INCREMENT;
-                if (newCount >= filteredAndSortedProducts.length) {
-                    setAllDisplayed(true);
-                    return filteredAndSortedProducts.length;
-                }
-                return newCount;
-            });
-            setLoadingMore(false);
-        }, 300);
-    };
-
-    // Réinitialiser l'état de l'affichage lors d'un changement de filtre ou de recherche
+    // Avec un filtre de tendance, une page peut ne rien afficher : on charge la suivante
     useEffect(() => {
-        setDisplayCount(INITIAL_ITEMS_COUNT);
-        setAllDisplayed(filteredAndSortedProducts.length <= INITIAL_ITEMS_COUNT);
-    }, [filteredAndSortedProducts.length]);
+        if (!loading && !trendsLoading && !loadingMore && !allDisplayed &&
+            filteredProducts.length < MIN_VISIBLE_ITEMS) {
+            loadMoreProducts();
+        }
+    }, [loading, trendsLoading, loadingMore, allDisplayed, filteredProducts.length, loadMoreProducts]);
 
     // Effacer la recherche
     const clearSearch = () => {
@@ -395,8 +349,6 @@ function ListeProduitsPage() {
                             value={searchTerm}
                             onChange={(e) => {
                                 setSearchTerm(e.target.value);
-                                setDisplayCount(INITIAL_ITEMS_COUNT);
-                                setAllDisplayed(false);
                             }}
                             className="enhanced-search-input"
                         />
@@ -494,8 +446,6 @@ function ListeProduitsPage() {
                                 className={`enhanced-filter-button ${trendFilter === 'all' ? 'selected' : ''}`}
                                 onClick={() => {
                                     setTrendFilter('all');
-                                    setDisplayCount(INITIAL_ITEMS_COUNT);
-                                    setAllDisplayed(false);
                                 }}
                             >
                                 <FontAwesomeIcon icon={faCircleCheck} className="filter-button-icon" />
@@ -505,8 +455,6 @@ function ListeProduitsPage() {
                                 className={`enhanced-filter-button ${trendFilter === 'up' ? 'selected' : ''}`}
                                 onClick={() => {
                                     setTrendFilter('up');
-                                    setDisplayCount(INITIAL_ITEMS_COUNT);
-                                    setAllDisplayed(false);
                                 }}
                                 disabled={trendsLoading}
                             >
@@ -517,8 +465,6 @@ function ListeProduitsPage() {
                                 className={`enhanced-filter-button ${trendFilter === 'down' ? 'selected' : ''}`}
                                 onClick={() => {
                                     setTrendFilter('down');
-                                    setDisplayCount(INITIAL_ITEMS_COUNT);
-                                    setAllDisplayed(false);
                                 }}
                                 disabled={trendsLoading}
                             >
@@ -529,8 +475,6 @@ function ListeProduitsPage() {
                                 className={`enhanced-filter-button ${trendFilter === 'stable' ? 'selected' : ''}`}
                                 onClick={() => {
                                     setTrendFilter('stable');
-                                    setDisplayCount(INITIAL_ITEMS_COUNT);
-                                    setAllDisplayed(false);
                                 }}
                                 disabled={trendsLoading}
                             >
@@ -544,36 +488,36 @@ function ListeProduitsPage() {
 
             {/* Résultats de la recherche et message sur le nombre de résultats */}
             <div className="results-info">
-                {searchTerm && (
+                {debouncedSearch && (
                     <p className="search-results">
-                        Found {filteredAndSortedProducts.length} results for "{searchTerm}"
+                        Found {stats.count} results for "{debouncedSearch}"
                     </p>
                 )}
-                {!searchTerm && trendFilter !== 'all' && (
+                {!debouncedSearch && trendFilter !== 'all' && (
                     <p className="filter-results">
-                        Showing {filteredAndSortedProducts.length} {trendFilter === 'up' ? 'rising' : trendFilter === 'down' ? 'falling' : 'stable'} products
+                        Showing {trendFilter === 'up' ? stats.risingCount : trendFilter === 'down' ? stats.fallingCount : stats.stableCount} {trendFilter === 'up' ? 'rising' : trendFilter === 'down' ? 'falling' : 'stable'} products
                     </p>
                 )}
-                {filteredAndSortedProducts.length > 0 && (
+                {filteredProducts.length > 0 && (
                     <p className="showing-results">
-                        Showing {Math.min(displayCount, filteredAndSortedProducts.length)} of {filteredAndSortedProducts.length} products
+                        Showing {filteredProducts.length} of {trendFilter === 'all' ? stats.count : trendFilter === 'up' ? stats.risingCount : trendFilter === 'down' ? stats.fallingCount : stats.stableCount} products
                     </p>
                 )}
             </div>
 
             {/* Grille de produits */}
             <div className="produits-grid">
-                {displayedProducts.length > 0 ? (
-                    displayedProducts.map((p, index) => {
+                {filteredProducts.length > 0 ? (
+                    filteredProducts.map((p, index) => {
                         // Si c'est le dernier élément, ajouter la référence
-                        if (index === displayedProducts.length - 1) {
+                        if (index === filteredProducts.length - 1) {
                             return (
                                 <div ref={lastProductElementRef} key={p.product_id}>
-                                    <ProduitCard produit={p} />
+                                    <ProduitCard produit={p} trendData={trendDataById && trendDataById[p.product_id]} trendsLoading={trendsLoading} />
                                 </div>
                             );
                         } else {
-                            return <ProduitCard key={p.product_id} produit={p} />;
+                            return <ProduitCard key={p.product_id} produit={p} trendData={trendDataById && trendDataById[p.product_id]} trendsLoading={trendsLoading} />;
                         }
                     })
                 ) : (
@@ -590,7 +534,7 @@ function ListeProduitsPage() {
             )}
 
             {/* Message "Plus de produits" quand tout est affiché */}
-            {allDisplayed && filteredAndSortedProducts.length > INITIAL_ITEMS_COUNT && (
+            {allDisplayed && filteredProducts.length > MIN_VISIBLE_ITEMS && (
                 <div className="all-products-loaded">
                     <span>All products loaded</span>
                 </div>
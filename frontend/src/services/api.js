@@ -1,20 +1,67 @@
 // frontend/src/services/api.js
 
-export const fetchProduits = async () => {
-    // Appel simple: on ne passe plus de paramètre ?status=...
-    const response = await fetch(`/api/produits`);
+// Champs affichés par les cartes (projection fields= : le reste n'est pas transféré)
+export const CARD_FIELDS = [
+    'product_id', 'title', 'price', 'image_url', 'ended', 'in_box', 'signed',
+    'normalized_condition', 'last_scraped_date', 'seller_username'
+];
+
+// Taille d'une page de la liste (voir DEFAULT_PAGE_SIZE / MAX_PAGE_SIZE côté API)
+export const PAGE_SIZE = 48;
+
+const toQuery = (params) => {
+    const query = new URLSearchParams();
+    Object.entries(params).forEach(([key, value]) => {
+        if (value !== undefined && value !== null && value !== '') query.set(key, value);
+    });
+    return query;
+};
+
+export const fetchProduitsPage = async (params = {}, cursor = null) => {
+    // Une page filtrée et triée côté serveur : {items, next_cursor}
+    const query = toQuery({ ...params, fields: CARD_FIELDS.join(','), limit: PAGE_SIZE, cursor });
+    const response = await fetch(`/api/produits?${query}`);
     if (!response.ok) throw new Error('Erreur lors du chargement des produits');
     return response.json();
 };
 
+export const fetchProduitsSummary = async (params = {}) => {
+    // Nombre de produits, prix moyen et tendances de toute la liste filtrée
+    const response = await fetch(`/api/produits/summary?${toQuery(params)}`);
+    if (!response.ok) throw new Error('Erreur lors du chargement des statistiques');
+    return response.json();
+};
+
 export const fetchProduit = async (id) => {
     const response = await fetch(`/api/produits/${id}`);
     if (!response.ok) throw new Error('Erreur lors du chargement du produit');
     return response.json();
 };
 
+// Points du graphique de détail : l'API réduit les longs historiques par LTTB
+const CHART_POINTS = 365;
+
 export const fetchHistoriquePrix = async (id) => {
-    const response = await fetch(`/api/produits/${id}/historique-prix`);
+    const response = await fetch(`/api/produits/${id}/historique-prix?downsample=lttb&points=${CHART_POINTS}`);
     if (!response.ok) throw new Error('Erreur lors du chargement de l\'historique');
     return response.json();
 };
+
+// Nombre maximal d'identifiants par appel au endpoint groupé (voir MAX_TREND_IDS côté API)
+const TRENDS_CHUNK_SIZE = 500;
+
+export const fetchTrends = async (ids, points = 12) => {
+    // Tendances + séries sparkline pour une liste de produits, en quelques appels groupés
+    const result = {};
+    for (let i = 0; i < ids.length; i += TRENDS_CHUNK_SIZE) {
+        const chunk = ids.slice(i, i + TRENDS_CHUNK_SIZE);
+        const response = await fetch(`/api/produits/trends`, {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ ids: chunk, points })
+        });
+        if (!response.ok) throw new Error('Erreur lors du chargement des tendances');
+        Object.assign(result, await response.json());
+    }
+    return result;
+};
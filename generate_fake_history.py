@@ -2,7 +2,11 @@
 import random
 from decimal import Decimal
 from datetime import datetime, timedelta
-from core.db_connection import get_connection
+from core.db_connection import connection
+from core.latest_price import rebuild_latest_prices
+from core.market_value import rebuild_market_values
+from core.price_rollups import rebuild_price_rollups
+from core.response_cache import invalidate_products
 
 def generate_weekly_prices(start_price: float, end_price: float, weeks: int) -> list[Decimal]:
     """
@@ -49,76 +53,86 @@ def fill_dummy_price_history():
     - Les “base price” varient aléatoirement par produit, 
       ce qui augmente l'écart global entre les prix des différents produits.
     """
-    conn = get_connection()
-    cursor = conn.cursor(dictionary=True)
-
-    # Sélectionne tous les produits en fixed_price
-    cursor.execute("SELECT product_id FROM product WHERE listing_type = 'fixed_price'")
-    products = cursor.fetchall()
-
-    nb_weeks = 12
-    end_date = datetime(2025, 2, 24)
-
-    for prod in products:
-        product_id = prod["product_id"]
-
-        # 1) Purge l'historique existant pour ce produit
-        cursor.execute("DELETE FROM price_history WHERE product_id = %s", (product_id,))
-        conn.commit()
-
-        # 2) Détermine un "base" aléatoire pour ce produit (entre 20$ et 60$)
-        base_price = random.uniform(20, 60)
-
-        # 3) Décide si on veut un produit "haussier" ou "baissier" (50/50)
-        # 3) Décide parmi 3 scénarios : up / down / stable (chacun ~1/3 de chance)
-        rand_scenario = random.random()
-        if rand_scenario < 0.33:
-            # Scénario haussier
-            start_val = base_price - 3
-            end_val   = base_price + 5
-            scenario_label = "UP"
-        elif rand_scenario < 0.66:
-            # Scénario baissier
-            start_val = base_price + 5
-            end_val   = base_price - 3
-            scenario_label = "DOWN"
-        else:
-            # Scénario stable : on reste autour du base_price
-            # Par exemple de (base_price - 1) à (base_price + 1)
-            start_val = base_price - 1
-            end_val   = base_price + 1
-            scenario_label = "STABLE"
-
-
-        # Génère 12 prix hebdo avec la fonction ci-dessus
-        weekly_prices = generate_weekly_prices(start_val, end_val, nb_weeks)
-
-        # 4) Insère chaque point du plus ancien (S-11) au plus récent (S0)
-        for i in range(nb_weeks):
-            weeks_offset = (nb_weeks - 1) - i
-            current_date = end_date - timedelta(weeks=weeks_offset)
-
-            date_str = current_date.strftime("%Y-%m-%d %H:%M:%S")
-            price_value = weekly_prices[i]
-
-            # Insertion
-            cursor.execute("""
-                INSERT INTO price_history
-                  (product_id, price, buy_it_now_price, bids_count, time_remaining, date_scraped)
-                VALUES (%s, %s, %s, %s, %s, %s)
-            """, (
-                product_id,
-                price_value,
-                price_value,  # buy_it_now_price = identique en fixed_price
-                None,         # pas d'enchères
-                None,         # pas de time_remaining
-                date_str
-            ))
+    with connection() as conn:
+        cursor = conn.cursor(dictionary=True)
+
+        # Sélectionne tous les produits en fixed_price
+        cursor.execute("SELECT product_id FROM product WHERE listing_type = 'fixed_price'")
+        products = cursor.fetchall()
+
+        nb_weeks = 12
+        end_date = datetime(2025, 2, 24)
+
+        for prod in products:
+            product_id = prod["product_id"]
+
+            # 1) Purge l'historique existant pour ce produit
+            cursor.execute("DELETE FROM price_history WHERE product_id = %s", (product_id,))
+            conn.commit()
+
+            # 2) Détermine un "base" aléatoire pour ce produit (entre 20$ et 60$)
+            base_price = random.uniform(20, 60)
+
+            # 3) Décide si on veut un produit "haussier" ou "baissier" (50/50)
+            # 3) Décide parmi 3 scénarios : up / down / stable (chacun ~1/3 de chance)
+            rand_scenario = random.random()
+            if rand_scenario < 0.33:
+                # Scénario haussier
+                start_val = base_price - 3
+                end_val   = base_price + 5
+                scenario_label = "UP"
+            elif rand_scenario < 0.66:
+                # Scénario baissier
+                start_val = base_price + 5
+                end_val   = base_price - 3
+                scenario_label = "DOWN"
+            else:
+                # Scénario stable : on reste autour du base_price
+                # Par exemple de (base_price - 1) à (base_price + 1)
+                start_val = base_price - 1
+                end_val   = base_price + 1
+                scenario_label = "STABLE"
+
+
+            # Génère 12 prix hebdo avec la fonction ci-dessus
+            weekly_prices = generate_weekly_prices(start_val, end_val, nb_weeks)
+
+            # 4) Insère chaque point du plus ancien (S-11) au plus récent (S0)
+            for i in range(nb_weeks):
+                weeks_offset = (nb_weeks - 1) - i
+                current_date = end_date - timedelta(weeks=weeks_offset)
+
+                date_str = current_date.strftime("%Y-%m-%d %H:%M:%S")
+                price_value = weekly_prices[i]
+
+                # Insertion
+                cursor.execute("""
+                    INSERT INTO price_history
+                      (product_id, price, buy_it_now_price, bids_count, time_remaining, date_scraped)
+                    VALUES (%s, %s, %s, %s, %s, %s)
+                """, (
+                    product_id,
+                    price_value,
+                    price_value,  # buy_it_now_price = identique en fixed_price
+                    None,         # pas d'enchères
+                    None,         # pas de time_remaining
+                    date_str
+                ))
+            # L'historique a été remplacé : on recalcule le dernier relevé et les agrégats du produit
+            rebuild_latest_prices(cursor, [product_id])
+            rebuild_price_rollups(cursor, [product_id])
+            invalidate_products(cursor, [product_id])
+            conn.commit()
+            print(f"[OK] Produit {product_id}: 12 points ({scenario_label}).")
+
+        cursor.close()
+
+        # Les derniers prix ont changé : clusters de valeur de marché recalculés
+        cursor = conn.cursor()
+        rebuild_market_values(cursor)
+        invalidate_products(cursor, [product["product_id"] for product in products])
         conn.commit()
-        print(f"[OK] Produit {product_id}: 12 points ({scenario_label}).")
-
-    cursor.close()
-    conn.close()
+        cursor.close()
     print("Terminé : historique factice créé avec des fluctuations plus naturelles.")
 
 if __name__ == "__main__":
@@ -2,64 +2,380 @@
 """
 Ce script parcourt les produits en base, revisite leur URL pour actualiser le champ "ended"
 et met à jour la base de données.
+
+Les pages sont téléchargées en parallèle (asyncio + httpx) avec une concurrence bornée
+par hôte, en faisant tourner les proxies de PROXIES_FILE. Une seule instance d'EbaySpider
+sert de parseur et les mises à jour de "ended" sont écrites par lots, dans un thread
+pour ne pas bloquer les téléchargements en cours.
+
+    python refresh_products.py --concurrency 32 --per-host 8
+    python refresh_products.py --resume          # reprend après le dernier point de contrôle
+                                                 # et retente les produits en échec
+    python refresh_products.py --include-ended   # revisite aussi les produits déjà terminés
+
+Les pages passent par le cache HTTP sur disque partagé avec le spider (core/http_cache.py) :
+une annonce revisitée avant l'expiration de sa page n'est pas retéléchargée, une page
+expirée est revalidée par une requête conditionnelle quand c'est possible (--no-cache
+pour tout retélécharger).
+
+Avec --scheduled, seuls les produits dus dans refresh_queue sont revisités, les plus
+prioritaires d'abord et dans la limite du budget horaire (voir core/refresh_scheduler.py) :
+
+    python refresh_products.py --scheduled --period 3600
 """
 
-import sys
-import requests
-from scrapy.http import TextResponse, Request
-from core.db_connection import get_connection
-from scrapers.spiders.ebay_spider import EbaySpider
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import time
+from collections import deque
+from urllib.parse import urlparse
+
+import httpx
+from scrapy.http import HtmlResponse, Request
+
+from core.db_connection import connection
+from core.http_cache import HttpCache
+from core.middlewares import load_proxies
+from core.refresh_scheduler import RefreshScheduler
+from core.response_cache import invalidate_products
+from scrapers import settings as scrapy_settings
 from scrapers.items import EbayItem
+from scrapers.spiders.ebay_spider import EbaySpider
 
-def refresh_product(product):
-    # Utilisez la colonne "url" de la base pour récupérer l'URL,
-    # mais dans l'item, utilisez le champ "item_url".
-    url = product["url"]
-    if not url:
-        return
-
-    try:
-        r = requests.get(url, timeout=10)
-        r.raise_for_status()
-    except Exception as e:
-        print(f"Erreur lors du téléchargement de {url} : {e}")
-        return
-
-    # Créer une réponse Scrapy pour utiliser parse_item
-    response = TextResponse(url=url, body=r.text, encoding='utf-8')
-    item = EbayItem()
-    # IMPORTANT : utiliser "item_url" et non "url"
-    item["item_url"] = url
-    item["title"] = product["title"]
-    req = Request(url=url, meta={'item': item})
-    response.request = req
-
-    spider = EbaySpider()
-    # Appel de parse_item pour obtenir l'item mis à jour
-    for updated_item in spider.parse_item(response):
-        return updated_item
+CHECKPOINT_FILE = ".refresh_checkpoint.json"
 
-def main():
-    conn = get_connection()
-    cursor = conn.cursor(dictionary=True)
-    cursor.execute("SELECT product_id, url, title FROM product")
-    products = cursor.fetchall()
-
-    refreshed = 0
-    for prod in products:
-        updated = refresh_product(prod)
-        if updated is None:
-            continue
-
-        update_sql = "UPDATE product SET ended = %s WHERE product_id = %s"
-        cursor.execute(update_sql, (updated.get("ended", False), prod["product_id"]))
+
+class RefreshEngine:
+    def __init__(self, concurrency=32, per_host=None, batch_size=200, timeout=10.0,
+                 proxies=None, checkpoint_file=CHECKPOINT_FILE, report_interval=10.0,
+                 scheduler=None, period=3600, cache=None):
+        self.concurrency = concurrency
+        # Toutes les annonces sont sur www.ebay.com : par défaut, pas de limite plus basse par hôte
+        self.per_host = per_host or concurrency
+        self.batch_size = batch_size
+        self.timeout = timeout
+        self.proxies = proxies or []
+        self.checkpoint_file = checkpoint_file
+        self.report_interval = report_interval
+        # File de refresh planifiée (None = balayage complet)
+        self.scheduler = scheduler
+        self.period = period
+        self.queue_cursor = None
+        # Cache HTTP sur disque (None = toujours télécharger)
+        self.cache = cache
+        # Un seul parseur pour tout le refresh (sans limite de démo ni affichage par produit)
+        self.spider = EbaySpider(demo_limit=0, reporter="production")
+        self.host_limits = {}
+        self.pending = {}   # product_id -> ended, en attente d'écriture
+        self.refreshed = []  # produits revisités avec succès depuis le dernier flush
+        self.failed = []     # produits en échec depuis le dernier flush (à retenter)
+        self.failed_ids = set()  # produits en échec pas encore retentés avec succès (point de contrôle)
+        self.flush_lock = None  # asyncio.Lock, créé dans la boucle (voir run)
+        self.dispatched = deque()
+        self.done = set()
+        self.checkpoint = 0
+        self.stats = {"fetched": 0, "updated": 0, "ended": 0, "errors": 0, "bytes": 0}
+
+    # --- Téléchargement ---
+
+    def host_limit(self, url):
+        host = urlparse(url).netloc
+        if host not in self.host_limits:
+            self.host_limits[host] = asyncio.Semaphore(self.per_host)
+        return self.host_limits[host]
+
+    def make_clients(self):
+        # httpx fixe le proxy par client : un client par proxy, choisis à tour de rôle
+        options = dict(
+            headers=scrapy_settings.DEFAULT_REQUEST_HEADERS,
+            timeout=self.timeout,
+            follow_redirects=True,
+            limits=httpx.Limits(max_connections=self.concurrency),
+        )
+        if not self.proxies:
+            return [httpx.AsyncClient(**options)]
+        return [httpx.AsyncClient(proxy=proxy, **options) for proxy in self.proxies]
+
+    async def fetch(self, client, url):
+        # Le cache (disque, SQLite, zstd) est lu et écrit dans un thread, hors de la boucle
+        entry = await asyncio.to_thread(self.cache.lookup, url) if self.cache else None
+        headers = {}
+        if entry is not None:
+            if entry.fresh(self.cache.clock()):
+                cached = await asyncio.to_thread(self.cached_response, entry)
+                if cached is not None:
+                    self.cache.hit(entry)
+                    return cached
+            # Expirée : requête conditionnelle si la page avait un validateur
+            headers = entry.validators()
+        async with self.host_limit(url):
+            response = await client.get(url, headers=headers)
+        self.stats["bytes"] += len(response.content)
+        if response.status_code == 304 and entry is not None:
+            cached = await asyncio.to_thread(self.cached_response, entry)
+            if cached is not None:
+                self.cache.revalidated(entry, response.headers)
+                return cached
+        response.raise_for_status()
+        if self.cache:
+            await asyncio.to_thread(self.cache.store, url, str(response.url), response.status_code,
+                                    response.headers.multi_items(), response.content)
+        return response
+
+    def cached_response(self, entry):
+        """Réponse httpx reconstruite depuis le cache (URL finale comprise), ou None."""
+        loaded = self.cache.load(entry)
+        if loaded is None:
+            return None
+        headers, body = loaded
+        return httpx.Response(entry.status, headers=headers, content=body,
+                              request=httpx.Request("GET", entry.final_url))
+
+    def parse(self, product, response):
+        """Construit une réponse Scrapy et la passe à parse_item, comme le spider."""
+        url = product["url"]
+        item = EbayItem()
+        item["item_url"] = url
+        item["title"] = product["title"]
+        scrapy_response = HtmlResponse(
+            url=str(response.url), body=response.content, encoding=response.encoding or "utf-8",
+            request=Request(url=url, meta={"item": item}),
+        )
+        for updated_item in self.spider.parse_item(scrapy_response):
+            return updated_item
+        return None
+
+    # --- Écriture par lots ---
+
+    async def flush(self, cursor, conn):
+        """
+        Écrit le lot en attente dans un thread (MySQL est synchrone) : les autres
+        téléchargements continuent pendant l'écriture. Le lot et le point de contrôle
+        sont pris avant de rendre la main ; un seul flush à la fois utilise la connexion.
+        """
+        async with self.flush_lock:
+            if not self.pending and not self.refreshed and not self.failed:
+                return
+            pending, refreshed, failed, checkpoint = self.pending, self.refreshed, self.failed, self.checkpoint
+            retry = sorted(self.failed_ids)
+            self.pending, self.refreshed, self.failed = {}, [], []
+            await asyncio.to_thread(self.write_batch, cursor, conn, pending, refreshed, failed, checkpoint, retry)
+
+    def write_batch(self, cursor, conn, pending, refreshed, failed, checkpoint, retry=()):
+        # Un UPDATE ... IN (...) par valeur de "ended"
+        for ended in (True, False):
+            ids = [product_id for product_id, value in pending.items() if value == ended]
+            if ids:
+                placeholders = ", ".join(["%s"] * len(ids))
+                cursor.execute(f"UPDATE product SET ended = %s WHERE product_id IN ({placeholders})",
+                               [ended] + ids)
+        # Invalide les réponses de l'API des produits mis à jour (même transaction)
+        invalidate_products(cursor, pending)
+        if self.scheduler:
+            # Replanifie les produits revisités (les terminés sortent de la file)
+            self.scheduler.plan(self.queue_cursor, refreshed, refreshed=True)
+            # Les échecs gardent leur dernier refresh réussi et sont retentés bientôt
+            self.scheduler.plan_retry(self.queue_cursor, failed)
         conn.commit()
-        refreshed += 1
-        print(f"Produit {prod['product_id']} mis à jour : ended = {updated.get('ended', False)}")
+        self.stats["updated"] += len(pending)
+        if not self.scheduler:
+            self.save_checkpoint(checkpoint, retry)
+
+    def mark_done(self, product_id):
+        """
+        Avance le point de contrôle jusqu'au plus grand product_id dont tous les
+        prédécesseurs (dans l'ordre de traitement) sont terminés. Les échecs sont
+        dépassés aussi : ils restent dans failed_ids, enregistrés avec le point de
+        contrôle. Les échecs retentés précèdent le point de contrôle repris, d'où le max.
+        """
+        self.done.add(product_id)
+        while self.dispatched and self.dispatched[0] in self.done:
+            self.done.discard(self.dispatched[0])
+            self.checkpoint = max(self.checkpoint, self.dispatched.popleft())
+
+    def load_checkpoint(self):
+        """Dernier product_id traité et produits en échec à retenter."""
+        if not os.path.exists(self.checkpoint_file):
+            return 0, []
+        with open(self.checkpoint_file, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return int(data.get("last_product_id", 0)), [int(product_id) for product_id in data.get("failed_product_ids", [])]
+
+    def save_checkpoint(self, checkpoint, failed=()):
+        # Appelé juste après un flush : tout ce qui précède le point de contrôle est en base,
+        # sauf les échecs, retentés par le prochain --resume
+        with open(self.checkpoint_file, "w", encoding="utf-8") as f:
+            json.dump({"last_product_id": checkpoint, "failed_product_ids": list(failed)}, f)
+
+    def clear_checkpoint(self):
+        if os.path.exists(self.checkpoint_file):
+            os.remove(self.checkpoint_file)
+
+    # --- Boucle principale ---
+
+    def load_products(self, cursor, after_id=0, include_ended=False, limit=None, retry_ids=()):
+        params = [after_id]
+        if retry_ids:
+            # Échecs du passage interrompu : avant le point de contrôle, donc traités en premier
+            placeholders = ", ".join(["%s"] * len(retry_ids))
+            sql = f"SELECT product_id, url, title FROM product WHERE (product_id > %s OR product_id IN ({placeholders}))"
+            params += list(retry_ids)
+        else:
+            sql = "SELECT product_id, url, title FROM product WHERE product_id > %s"
+        sql += " AND url IS NOT NULL AND url <> ''"
+        if not include_ended:
+            sql += " AND (ended = 0 OR ended IS NULL)"
+        sql += " ORDER BY product_id"
+        if limit:
+            sql += " LIMIT %s"
+            params.append(limit)
+        cursor.execute(sql, params)
+        return cursor.fetchall()
+
+    def report(self, total, start, final=False):
+        elapsed = time.monotonic() - start
+        processed = self.stats["fetched"] + self.stats["errors"]
+        rate = processed / elapsed if elapsed > 0 else 0
+        label = "Refresh terminé" if final else "Progression"
+        print(f"[{label}] {processed}/{total} produits en {elapsed:.1f}s "
+              f"({rate:.1f} produits/s, {rate * 60:.0f}/min) | "
+              f"ended={self.stats['ended']} erreurs={self.stats['errors']} "
+              f"écrits={self.stats['updated']} Mo={self.stats['bytes'] / 1e6:.1f}", flush=True)
+
+    async def run(self, resume=False, include_ended=False, limit=None):
+        after_id, retry_ids = self.load_checkpoint() if resume else (0, [])
+        with connection() as conn:
+            cursor = conn.cursor(dictionary=True)
+            if self.scheduler:
+                self.queue_cursor = conn.cursor()
+                self.scheduler.plan(self.queue_cursor)
+                conn.commit()
+                due = self.scheduler.count_due(self.queue_cursor)
+                budget = limit or self.scheduler.budget_for(self.period)
+                products = self.scheduler.due(self.queue_cursor, budget)
+                after_id, retry_ids = 0, []
+                print(f"{due} produits dus, budget {budget} pour ce passage.", flush=True)
+            else:
+                products = self.load_products(cursor, after_id, include_ended, limit, retry_ids)
+            total = len(products)
+            if after_id or retry_ids:
+                print(f"Reprise après le produit {after_id} ({len(retry_ids)} échecs à retenter).", flush=True)
+            # Gardés jusqu'à leur succès, même s'ils ne sont pas dans ce passage (--limit)
+            self.failed_ids = set(retry_ids)
+            print(f"{total} produits à rafraîchir "
+                  f"(concurrence {self.concurrency}, {self.per_host}/hôte, {len(self.proxies)} proxies).", flush=True)
+
+            self.checkpoint = after_id
+            self.flush_lock = asyncio.Lock()
+            queue = asyncio.Queue()
+            for product in products:
+                queue.put_nowait(product)
+            clients = self.make_clients()
+            rotation = itertools.cycle(clients)
+            start = time.monotonic()
+
+            async def worker():
+                while True:
+                    try:
+                        product = queue.get_nowait()
+                    except asyncio.QueueEmpty:
+                        return
+                    product_id = product["product_id"]
+                    self.dispatched.append(product_id)
+                    try:
+                        response = await self.fetch(next(rotation), product["url"])
+                        updated = self.parse(product, response)
+                    except Exception as e:
+                        self.stats["errors"] += 1
+                        print(f"Erreur lors du téléchargement de {product['url']} : {e}", flush=True)
+                        self.failed.append(product_id)
+                        self.failed_ids.add(product_id)
+                    else:
+                        self.stats["fetched"] += 1
+                        if updated is not None:
+                            ended = bool(updated.get("ended", False))
+                            self.stats["ended"] += ended
+                            self.pending[product_id] = ended
+                        self.refreshed.append(product_id)
+                        self.failed_ids.discard(product_id)
+                    self.mark_done(product_id)
+                    if len(self.refreshed) + len(self.failed) >= self.batch_size:
+                        await self.flush(cursor, conn)
+
+            async def reporter():
+                while True:
+                    await asyncio.sleep(self.report_interval)
+                    self.report(total, start)
+
+            progress = asyncio.create_task(reporter())
+            try:
+                await asyncio.gather(*(worker() for _ in range(min(self.concurrency, total) or 1)))
+            finally:
+                progress.cancel()
+                await self.flush(cursor, conn)
+                if self.scheduler:
+                    full_sweep = self.scheduler.record_run(
+                        self.queue_cursor, due, self.stats["fetched"] + self.stats["errors"])
+                    conn.commit()
+                    self.queue_cursor.close()
+                cursor.close()
+                for client in clients:
+                    await client.aclose()
+
+        self.report(total, start, final=True)
+        if self.cache:
+            summary = self.cache.summary()
+            print(f"[Cache HTTP] {summary['hits']} hits, {summary['revalidated']} revalidés, "
+                  f"taux {summary['hit_rate'] * 100:.1f}%, "
+                  f"{summary['bytes_saved'] / 1e6:.1f} Mo économisés", flush=True)
+        if self.scheduler:
+            fetched = self.stats["fetched"] + self.stats["errors"]
+            print(f"[Planification] {fetched} fetchs au lieu de {full_sweep} pour un balayage complet "
+                  f"({full_sweep - fetched} économisés).", flush=True)
+        elif not self.dispatched and not self.failed_ids:
+            # Tout a été traité : le prochain --resume repartira du début
+            self.clear_checkpoint()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=32, help="Téléchargements simultanés au total")
+    parser.add_argument("--per-host", type=int,
+                        help="Téléchargements simultanés par hôte (défaut : --concurrency). Toutes les "
+                             "annonces sont sur www.ebay.com : une valeur plus basse plafonne la concurrence totale")
+    parser.add_argument("--batch-size", type=int, default=200, help="Mises à jour par transaction")
+    parser.add_argument("--timeout", type=float, default=10.0)
+    parser.add_argument("--limit", type=int, help="Nombre maximum de produits à rafraîchir")
+    parser.add_argument("--resume", action="store_true", help="Reprendre après le dernier point de contrôle et retenter les échecs")
+    parser.add_argument("--include-ended", action="store_true", help="Revisiter aussi les produits terminés")
+    parser.add_argument("--proxies-file", default=scrapy_settings.PROXIES_FILE)
+    parser.add_argument("--no-proxies", action="store_true")
+    parser.add_argument("--checkpoint-file", default=CHECKPOINT_FILE)
+    parser.add_argument("--no-cache", action="store_true", help="Ne pas utiliser le cache HTTP sur disque")
+    parser.add_argument("--scheduled", action="store_true",
+                        help="Ne revisiter que les produits dus dans refresh_queue (budget horaire)")
+    parser.add_argument("--budget", type=int, help="Fetchs par heure (défaut : REFRESH_BUDGET_PER_HOUR)")
+    parser.add_argument("--period", type=int, default=3600,
+                        help="Durée couverte par ce passage en secondes (fraction du budget horaire)")
+    args = parser.parse_args()
+
+    proxies = [] if args.no_proxies else load_proxies(args.proxies_file)
+    cache = None
+    if scrapy_settings.HTTP_CACHE_ENABLED and not args.no_cache:
+        cache = HttpCache.from_settings(scrapy_settings)
+    scheduler = None
+    if args.scheduled:
+        scheduler = RefreshScheduler(args.budget) if args.budget else RefreshScheduler()
+    engine = RefreshEngine(
+        concurrency=args.concurrency, per_host=args.per_host, batch_size=args.batch_size,
+        timeout=args.timeout, proxies=proxies, checkpoint_file=args.checkpoint_file,
+        scheduler=scheduler, period=args.period, cache=cache,
+    )
+    asyncio.run(engine.run(resume=args.resume, include_ended=args.include_ended, limit=args.limit))
 
-    cursor.close()
-    conn.close()
-    print(f"Refresh terminé pour {refreshed} produits.")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -1,6 +1,7 @@
 from scrapers.settings import *
 
 DEMO_MODE = True
+REPORTER = "demo"
 LOG_LEVEL = "INFO"
 LOG_FORMAT = '%(message)s'
 TELNETCONSOLE_ENABLED = False
@@ -10,6 +11,7 @@ TELNETCONSOLE_ENABLED = False
 SPIDER_MIDDLEWARES = {
     'scrapy.spidermiddlewares.httperror.HttpErrorMiddleware': None,
     'core.custom_http_error_middleware.CustomHttpErrorMiddleware': 50,
+    'core.metrics_extension.CallbackTimingMiddleware': 950,
 }
 
 LOGGING = {
@@ -0,0 +1,194 @@
+# scrapers/extraction.py
+"""
+Item page extraction for EbaySpider.parse_item.
+
+Selectors and regexes are compiled once at import, and filters that only need the
+title (scrapers/filters.py) run before the DOM is touched. The DOM is then visited as little as possible:
+  - nodes identifiable by their tag (meta, title, script, button) are collected in a
+    single pass filtered by tag name inside lxml;
+  - every other query is only run when its marker (test id, element id, class)
+    appears in the raw page bytes, so a typical page skips most full-tree traversals.
+
+A single //*[...] query matching every node of interest looks like the obvious
+"one pass", but libxml2 evaluates the whole predicate on every element and it ends
+up slower than the separate queries (see benchmarks/bench_parse_item.py).
+"""
+
+import json
+import re
+
+from lxml import etree
+
+PRICE_RE = re.compile(r'[\d,.]+')
+DIGITS_RE = re.compile(r'(\d+)')
+EBAY_TITLE_SUFFIX_RE = re.compile(r"\s*\|\s*ebay\s*$", re.IGNORECASE)
+
+ENDED_PHRASES = (
+    "this listing sold on", "bidding ended on",
+    "this listing was ended by the seller", "item sold on",
+)
+IN_BOX_KEYWORDS = ("in box", "with box", "nib", "mib")
+OUT_BOX_KEYWORDS = ("loose", "oob", "no box", "out of box", "ex-box")
+
+
+def _has_class(name):
+    """XPath equivalent of the CSS .name class selector."""
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+
+# Tags collected in one pass (lxml filters on the tag name in C)
+TAG_NODES = ("meta", "title", "script", "button")
+
+# Other queries, each guarded by a marker that must appear in the raw page
+# (the absence of the marker means the query cannot match). descendant:: is
+# cheaper than // in libxml2 and equivalent from the root.
+STATUS_TEXTS = etree.XPath('descendant::div[@data-testid="d-statusmessage"]//text()')
+BID_TEXTS = etree.XPath('descendant::div[@data-testid="x-bid-count"]//span/text()')
+BIN_PRICE_TEXTS = etree.XPath(f'descendant::div[@data-testid="x-bin-price"]//span[{_has_class("ux-textspans")}]/text()')
+SELLER_TEXTS = etree.XPath('descendant::span[@class="mbg-nw"]/text()')
+SELLER_FALLBACK_TEXTS = etree.XPath('descendant::div[contains(@class,"info__about-seller")]/a/span/text()')
+# Bid / BIN buttons and countdown in one traversal, told apart in Python
+LISTING_TYPE_NODES = etree.XPath(
+    "descendant::*[@id][starts-with(@id, 'bidBtn_btn') or starts-with(@id, 'binBtn_btn') or contains(@id, 'vi-cdown')]"
+)
+# contains() prefilter in XPath, exact class token checked in Python (cheaper than normalize-space)
+TIMER_NODES = etree.XPath("descendant::*[contains(@class, 'ux-timer__text')]")
+_OWN_TEXT = etree.XPath("text()")
+
+GUARDED_QUERIES = (
+    # (markers, field, query)
+    ((b"d-statusmessage",), "status_texts", STATUS_TEXTS),
+    ((b"x-bid-count",), "bid_texts", BID_TEXTS),
+    ((b"x-bin-price",), "bin_price_texts", BIN_PRICE_TEXTS),
+    ((b"mbg-nw",), "seller_texts", SELLER_TEXTS),
+    ((b"info__about-seller",), "seller_fallback_texts", SELLER_FALLBACK_TEXTS),
+    ((b"bidBtn_btn", b"binBtn_btn", b"vi-cdown"), "listing_type_nodes", LISTING_TYPE_NODES),
+    ((b"ux-timer__text",), "timer_nodes", TIMER_NODES),
+)
+
+
+def clean_title(title):
+    """Remove the trailing ' | eBay' from a page or listing title."""
+    return EBAY_TITLE_SUFFIX_RE.sub("", title).strip()
+
+
+def parse_price(text, default=None):
+    """First number in a price string ('US $1,234.56' -> 1234.56)."""
+    if not text:
+        return default
+    match = PRICE_RE.search(text)
+    return float(match.group(0).replace(",", "")) if match else default
+
+
+def in_box_from_title(title_lower):
+    """For used items: whether the title suggests the figure still has its box."""
+    if any(kw in title_lower for kw in IN_BOX_KEYWORDS) and not any(kw in title_lower for kw in OUT_BOX_KEYWORDS):
+        return True
+    if any(kw in title_lower for kw in OUT_BOX_KEYWORDS):
+        return False
+    return True
+
+
+def _first(texts):
+    return texts[0] if texts else None
+
+
+def extract_item_page(response):
+    """
+    Collect the raw values parse_item needs from an item page.
+    """
+    page = {
+        "og_title": None,
+        "page_title": None,
+        "og_image": None,
+        "multi_variation": False,
+        "ld_json": None,
+        "status_texts": [],
+        "bid_texts": [],
+        "bin_price_texts": [],
+        "seller_texts": [],
+        "seller_fallback_texts": [],
+        "listing_type_nodes": [],
+        "timer_nodes": [],
+    }
+    root = response.selector.root
+    for node in root.iter(*TAG_NODES):
+        tag = node.tag
+        if tag == "meta":
+            prop = node.get("property")
+            if prop == "og:title" and page["og_title"] is None:
+                page["og_title"] = node.get("content")
+            elif prop == "og:image" and page["og_image"] is None:
+                page["og_image"] = node.get("content")
+        elif tag == "title":
+            if page["page_title"] is None:
+                page["page_title"] = node.text
+        elif tag == "script":
+            if page["ld_json"] is None and node.get("type") == "application/ld+json":
+                page["ld_json"] = node.text
+        elif node.get("value") == "Select":
+            css_class = node.get("class", "")
+            if "listbox-button__control" in css_class and "btn--form" in css_class:
+                page["multi_variation"] = True
+
+    body = response.body
+    for markers, field, query in GUARDED_QUERIES:
+        if field == "seller_fallback_texts" and page["seller_texts"]:
+            continue  # Fallback only
+        if any(marker in body for marker in markers):
+            page[field] = query(root)
+
+    element_ids = [node.get("id") for node in page.pop("listing_type_nodes")]
+    page["bid_button"] = any(element_id.startswith("bidBtn_btn") for element_id in element_ids)
+    page["bin_button"] = any(element_id.startswith("binBtn_btn") for element_id in element_ids)
+    page["countdown"] = any("vi-cdown" in element_id for element_id in element_ids)
+    page["timer_texts"] = [
+        text
+        for node in page.pop("timer_nodes") if "ux-timer__text" in node.get("class", "").split()
+        for text in _OWN_TEXT(node)
+    ]
+    page["seller"] = _first(page.pop("seller_texts"))
+    page["seller_fallback"] = _first(page.pop("seller_fallback_texts"))
+    page["bin_price_text"] = _first(page.pop("bin_price_texts"))
+    return page
+
+
+def is_ended_message(status_texts):
+    message = " ".join(status_texts).strip().lower()
+    return bool(message) and any(phrase in message for phrase in ENDED_PHRASES)
+
+
+def time_remaining_from(timer_texts):
+    if not timer_texts:
+        return None
+    return timer_texts[1].strip() if len(timer_texts) >= 2 else timer_texts[0].replace("Ends in", "").strip()
+
+
+def bids_count_from(bid_texts):
+    for text in bid_texts:
+        match = DIGITS_RE.search(text)
+        if match:
+            return int(match.group(1))
+    return 0
+
+
+def category_from_ld_json(ld_json):
+    """
+    Category path ('A > B > C', without the eBay root) from the BreadcrumbList ld+json.
+    Returns None when the ld+json holds no BreadcrumbList (single object or list).
+    """
+    if not ld_json:
+        return None
+    data = json.loads(ld_json)
+    entries = data if isinstance(data, list) else [data]
+    breadcrumb = next(
+        (entry for entry in entries if isinstance(entry, dict) and entry.get("@type") == "BreadcrumbList"),
+        None
+    )
+    if breadcrumb is None:
+        return None
+    elements = breadcrumb.get("itemListElement", [])
+    return " > ".join(
+        name for name in (element.get("name", "").strip() for element in elements)
+        if name.lower() != "ebay"
+    )
@@ -0,0 +1,150 @@
+# scrapers/filters.py
+"""
+Listing filters shared by the spider and the pipelines.
+
+The title rules (error page, multi-figure, bundle) are decidable from the title
+alone, so EbaySpider.parse applies them to search results through SearchPrefilter
+and never schedules a detail request for a listing parse_item or the pipeline would
+drop anyway. The prefilter also skips item ids already requested in this crawl and
+items whose price was recorded recently, and counts every detail fetch it avoided.
+
+Settings:
+    PREFILTER_ENABLED       run the prefilter in parse (default True)
+    PREFILTER_RULES         title rules applied on search results (default: all)
+    PREFILTER_DEDUPE        skip item ids already requested in this crawl (default True)
+    PREFILTER_RECENT_HOURS  skip items whose latest price is younger than this (0 = off)
+    BUNDLE_KEYWORDS         title keywords marking a bundle listing
+"""
+
+import logging
+import re
+from collections import Counter
+
+logger = logging.getLogger(__name__)
+
+ERROR_PAGE_TITLES = ("ebay home", "error page")
+BUNDLE_KEYWORDS = ("lot", "bundle", "set")
+
+TITLE_RULES = ("error_page", "multi_figure", "bundle")
+# Rules the pipelines enforce (a bundle can still reach them when the prefilter is off)
+BUNDLE_RULES = ("multi_figure", "bundle")
+
+FILTER_REASONS = {
+    "error_page": "Content unavailable (page not found)",
+    "multi_figure": "Multi-figure listing excluded",
+    "bundle": "Bundle listing excluded",
+    "duplicate": "Already requested in this crawl",
+    "recent": "Price recorded recently",
+}
+
+ITEM_ID_RE = re.compile(r"/itm/([^/?#]+)")
+
+
+def item_id_from_url(url):
+    """eBay item id from an item URL (https://www.ebay.com/itm/<id>?...), or None."""
+    match = ITEM_ID_RE.search(url or "")
+    return match.group(1) if match else None
+
+
+def title_rule(title, rules=TITLE_RULES, bundle_keywords=BUNDLE_KEYWORDS):
+    """
+    Name of the first title rule that excludes the listing, or None.
+    Cheapest checks first.
+    """
+    title_lower = title.lower()
+    if "error_page" in rules and title_lower.strip() in ERROR_PAGE_TITLES:
+        return "error_page"
+    if "multi_figure" in rules and title.count("#") > 1:
+        return "multi_figure"
+    if "bundle" in rules and any(kw in title_lower for kw in bundle_keywords):
+        return "bundle"
+    return None
+
+
+def title_filter_reason(title, rules=TITLE_RULES, bundle_keywords=BUNDLE_KEYWORDS):
+    """Human readable reason the listing is excluded by its title, or None."""
+    rule = title_rule(title, rules, bundle_keywords)
+    return FILTER_REASONS[rule] if rule else None
+
+
+def is_bundle_title(title, bundle_keywords=BUNDLE_KEYWORDS):
+    """Pipeline check: multi-figure or bundle listing."""
+    return title_rule(title, BUNDLE_RULES, bundle_keywords) is not None
+
+
+def load_recent_item_ids(hours):
+    """
+    item_ids whose latest recorded price (product_latest_price) is younger than `hours`.
+    """
+    from core.db_connection import connection
+
+    with connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT p.item_id
+            FROM product p
+            JOIN product_latest_price lp ON lp.product_id = p.product_id
+            WHERE lp.date_scraped >= NOW() - INTERVAL %s HOUR
+        """, (hours,))
+        item_ids = {row[0] for row in cursor.fetchall()}
+        cursor.close()
+    return item_ids
+
+
+class SearchPrefilter:
+    def __init__(self, enabled=True, rules=TITLE_RULES, bundle_keywords=BUNDLE_KEYWORDS,
+                 dedupe=True, recent_hours=0, recent_loader=load_recent_item_ids):
+        self.enabled = enabled
+        self.rules = tuple(rules)
+        self.bundle_keywords = tuple(bundle_keywords)
+        self.dedupe = dedupe
+        self.recent_hours = recent_hours
+        self.recent_loader = recent_loader
+        self.seen = set()
+        self.recent = None
+        self.avoided = Counter()
+
+    @classmethod
+    def from_settings(cls, settings):
+        return cls(
+            enabled=settings.getbool("PREFILTER_ENABLED", True),
+            rules=settings.getlist("PREFILTER_RULES", list(TITLE_RULES)),
+            bundle_keywords=settings.getlist("BUNDLE_KEYWORDS", list(BUNDLE_KEYWORDS)),
+            dedupe=settings.getbool("PREFILTER_DEDUPE", True),
+            recent_hours=settings.getfloat("PREFILTER_RECENT_HOURS", 0),
+        )
+
+    def _recent_item_ids(self):
+        # Loaded once, on the first search page
+        if self.recent is None:
+            self.recent = set()
+            if self.recent_hours > 0:
+                try:
+                    self.recent = self.recent_loader(self.recent_hours)
+                except Exception as e:
+                    logger.warning(f"[Prefilter] Could not load recently scraped items: {e}")
+        return self.recent
+
+    def check(self, title, item_id):
+        """
+        Reason key (see FILTER_REASONS) if the detail request should not be issued,
+        None otherwise. Items that pass are remembered for deduplication.
+        """
+        if not self.enabled:
+            return None
+        rule = title_rule(title, self.rules, self.bundle_keywords) if title else None
+        if rule is None and item_id:
+            if self.dedupe and item_id in self.seen:
+                rule = "duplicate"
+            elif item_id in self._recent_item_ids():
+                rule = "recent"
+        if rule:
+            self.avoided[rule] += 1
+            return rule
+        if item_id:
+            self.seen.add(item_id)
+        return None
+
+    @property
+    def total_avoided(self):
+        return sum(self.avoided.values())
@@ -19,4 +19,5 @@ class EbayItem(scrapy.Item):
     listing_type = scrapy.Field()     # Type d'annonce ("auction", "auction_with_bin", "fixed_price")
     buy_it_now_price = scrapy.Field()
     in_box = scrapy.Field()           # Indique si la figurine est dans sa boîte
-    ended = scrapy.Field()  # Indique si l’annonce est terminée
\ No newline at end of file
+    ended = scrapy.Field()  # Indique si l’annonce est terminée
+    keyword = scrapy.Field()          # Mot-clé de recherche ayant trouvé l'annonce (cluster de valeur de marché)
\ No newline at end of file
@@ -1,9 +1,32 @@
+import time
 from scrapy.exceptions import DropItem
+from twisted.internet import task
 from core.category_mapping import map_category, extract_leaf_category
 from core.db_connection import get_connection
+from core.latest_price import record_latest_price
+from core.market_value import record_market_prices
+from core.metrics import REGISTRY as metrics
+from core.price_rollups import record_price_rollups
+from core.response_cache import invalidate_products
+from scrapers.filters import is_bundle_title, BUNDLE_KEYWORDS
+
+def market_observation(product_id, item):
+    """Relevé de l'item au format de record_market_prices."""
+    return (
+        product_id,
+        item.get("keyword"),
+        item.get("title", ""),
+        item.get("normalized_condition", ""),
+        item.get("in_box"),
+        item.get("signed", False),
+        item.get("price", 0),
+    )
+
 
 class MySQLPipeline:
     def open_spider(self, spider):
+        # Mêmes mots-clés que le préfiltre du spider (scrapers/filters.py)
+        self.bundle_keywords = tuple(spider.settings.getlist("BUNDLE_KEYWORDS", list(BUNDLE_KEYWORDS)))
         try:
             self.conn = get_connection()
             self.cursor = self.conn.cursor()
@@ -22,8 +45,7 @@ class MySQLPipeline:
     def process_item(self, item, spider):
         # --- Filtrage des bundles ---
         title = item.get("title", "")
-        title_lower = title.lower()
-        if title.count("#") > 1 or any(keyword in title_lower for keyword in ["lot", "bundle", "set"]):
+        if is_bundle_title(title, self.bundle_keywords):
             spider.logger.info(f"Drop item bundle: {title}")
             raise DropItem(f"Item bundle dropped: {title}")
 
@@ -32,7 +54,7 @@ class MySQLPipeline:
         # Juste avant le if product_db_id:
         product_db_id = None
         select_sql = "SELECT product_id FROM product WHERE item_id = %s"
-        self.cursor.execute(select_sql, (item.get("item_id"),))
+        self.execute("db/select_product", select_sql, (item.get("item_id"),))
         row_itemid = self.cursor.fetchone()
         if row_itemid:
             product_db_id = row_itemid[0]
@@ -61,7 +83,7 @@ class MySQLPipeline:
                 WHERE product_id = %s
             """
             try:
-                self.cursor.execute(update_sql, (
+                self.execute("db/update_product", update_sql, (
                     item.get("title", ""),
                     item.get("item_condition", ""),
                     item.get("normalized_condition", ""),
@@ -78,7 +100,7 @@ class MySQLPipeline:
                     item.get("category", ""),
                     product_db_id
                 ))
-                self.conn.commit()
+                self.commit()
                 spider.logger.info(f"Produit {product_db_id} mis à jour.")
             except Exception as e:
                 spider.logger.error(f"Erreur lors de la mise à jour du produit: {e}")
@@ -112,8 +134,8 @@ class MySQLPipeline:
 
 
             try:
-                self.cursor.execute(insert_product_sql, product_values)
-                self.conn.commit()
+                self.execute("db/insert_product", insert_product_sql, product_values)
+                self.commit()
                 product_db_id = self.cursor.lastrowid
                 spider.logger.info(f"Nouveau produit inséré avec l'id {product_db_id}")
             except Exception as e:
@@ -122,12 +144,13 @@ class MySQLPipeline:
 
         # 5) Mapping de la catégorie et mise à jour du champ category_id
         scraped_category = item.get("category", "")
-        mapped_category_id = map_category(scraped_category)
+        with metrics.timer("map_category"):
+            mapped_category_id = map_category(scraped_category)
         if mapped_category_id:
             update_cat_sql = "UPDATE product SET category_id = %s WHERE product_id = %s"
             try:
-                self.cursor.execute(update_cat_sql, (mapped_category_id, product_db_id))
-                self.conn.commit()
+                self.execute("db/update_category", update_cat_sql, (mapped_category_id, product_db_id))
+                self.commit()
                 spider.logger.info(f"Produit {product_db_id} mis à jour avec category_id {mapped_category_id}")
             except Exception as e:
                 spider.logger.error(f"Erreur lors de la mise à jour du category_id: {e}")
@@ -141,16 +164,249 @@ class MySQLPipeline:
             VALUES (%s, %s, %s, %s, %s, NOW())
         """
         try:
-            self.cursor.execute(insert_price_sql, (
+            self.execute("db/insert_price_history", insert_price_sql, (
                 product_db_id,
                 item.get("price", 0),
                 item.get("buy_it_now_price"),
                 item.get("bids_count"),
                 item.get("time_remaining")
             ))
-            self.conn.commit()
+            # Projection "dernier relevé" lue par l'API (même transaction que l'historique)
+            with metrics.timer("db/latest_price"):
+                record_latest_price(self.cursor, product_db_id, item.get("price", 0))
+            # Agrégats jour / semaine (voir core/price_rollups.py)
+            with metrics.timer("db/price_rollups"):
+                record_price_rollups(self.cursor, [(product_db_id, item.get("price", 0), item.get("bids_count"), None)])
+            # Valeur de marché du cluster de l'annonce (voir core/market_value.py)
+            with metrics.timer("db/market_value"):
+                record_market_prices(self.cursor, [market_observation(product_db_id, item)])
+            # Invalide les réponses de l'API pour ce produit (cache, voir core/response_cache.py)
+            with metrics.timer("db/invalidate_cache"):
+                invalidate_products(self.cursor, [product_db_id])
+            self.commit()
             spider.logger.info(f"Historique de prix inséré pour le produit {product_db_id}")
         except Exception as e:
             spider.logger.error(f"Erreur lors de l'insertion de l'historique de prix: {e}")
 
         return item
+
+    def execute(self, stage, sql, params):
+        """cursor.execute chronométré sous l'étape `stage` (voir core/metrics.py)."""
+        with metrics.timer(stage):
+            self.cursor.execute(sql, params)
+
+    def commit(self):
+        with metrics.timer("db/commit"):
+            self.conn.commit()
+
+
+class MySQLBatchPipeline(MySQLPipeline):
+    """
+    Variante bufferisée de MySQLPipeline : les items sont accumulés puis écrits
+    par lots, dans une seule transaction par lot :
+      - upsert multi-lignes sur product (INSERT ... ON DUPLICATE KEY UPDATE sur item_id),
+        avec le category_id résolu avant l'écriture ;
+      - insertion multi-lignes dans price_history et mise à jour de product_latest_price
+        et des agrégats jour / semaine.
+    Un lot est écrit dès qu'il atteint MYSQL_BATCH_SIZE items ou toutes les
+    MYSQL_FLUSH_INTERVAL secondes, et au close_spider.
+    Si la transaction du lot échoue, on la rejoue item par item pour isoler et
+    signaler les items fautifs sans perdre les autres.
+    """
+
+    # Requêtes multi-lignes : "{values}" est remplacé par autant de tuples que de lignes du lot
+    upsert_product_sql = """
+        INSERT INTO product
+        (item_id, title, item_condition, normalized_condition, signed, in_box, url, image_url,
+         seller_username, category, listing_type, bids_count, time_remaining, buy_it_now_price, ended,
+         category_id)
+        VALUES {values}
+        ON DUPLICATE KEY UPDATE
+            title = VALUES(title),
+            item_condition = VALUES(item_condition),
+            normalized_condition = VALUES(normalized_condition),
+            signed = VALUES(signed),
+            in_box = VALUES(in_box),
+            url = VALUES(url),
+            image_url = VALUES(image_url),
+            seller_username = VALUES(seller_username),
+            category = VALUES(category),
+            listing_type = VALUES(listing_type),
+            bids_count = VALUES(bids_count),
+            time_remaining = VALUES(time_remaining),
+            buy_it_now_price = VALUES(buy_it_now_price),
+            ended = VALUES(ended),
+            category_id = COALESCE(VALUES(category_id), category_id)
+    """
+    product_row = "(%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)"
+
+    insert_price_sql = """
+        INSERT INTO price_history
+        (product_id, price, buy_it_now_price, bids_count, time_remaining, date_scraped)
+        VALUES {values}
+    """
+    price_row = "(%s, %s, %s, %s, %s, NOW())"
+
+    upsert_latest_price_sql = """
+        INSERT INTO product_latest_price (product_id, price, date_scraped)
+        VALUES {values}
+        ON DUPLICATE KEY UPDATE
+            price = IF(VALUES(date_scraped) >= date_scraped, VALUES(price), price),
+            date_scraped = GREATEST(date_scraped, VALUES(date_scraped))
+    """
+    latest_price_row = "(%s, %s, NOW())"
+
+    def __init__(self, batch_size=100, flush_interval=5.0):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.buffer = []
+        self.last_flush = time.monotonic()
+        self.flush_loop = None
+        self.stats = None
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        pipeline = cls(
+            batch_size=crawler.settings.getint("MYSQL_BATCH_SIZE", 100),
+            flush_interval=crawler.settings.getfloat("MYSQL_FLUSH_INTERVAL", 5.0),
+        )
+        pipeline.stats = crawler.stats
+        return pipeline
+
+    def open_spider(self, spider):
+        super().open_spider(spider)
+        if self.flush_interval > 0:
+            # Flush périodique même si le lot n'est pas plein (crawl lent, fin de pagination...)
+            self.flush_loop = task.LoopingCall(self.flush_if_due, spider)
+            self.flush_loop.start(self.flush_interval, now=False)
+
+    def close_spider(self, spider):
+        if self.flush_loop is not None and self.flush_loop.running:
+            self.flush_loop.stop()
+        self.flush(spider)
+        super().close_spider(spider)
+
+    def process_item(self, item, spider):
+        # --- Filtrage des bundles ---
+        title = item.get("title", "")
+        if is_bundle_title(title, self.bundle_keywords):
+            spider.logger.info(f"Drop item bundle: {title}")
+            raise DropItem(f"Item bundle dropped: {title}")
+
+        # Catégorie résolue avant l'écriture (index en mémoire, pas d'accès DB)
+        with metrics.timer("map_category"):
+            category_id = map_category(item.get("category", ""))
+        self.buffer.append((item, category_id))
+        if len(self.buffer) >= self.batch_size:
+            self.flush(spider)
+        return item
+
+    def flush_if_due(self, spider):
+        if self.buffer and time.monotonic() - self.last_flush >= self.flush_interval:
+            self.flush(spider)
+
+    def flush(self, spider):
+        batch, self.buffer = self.buffer, []
+        self.last_flush = time.monotonic()
+        if not batch:
+            return
+        try:
+            self.write_batch(batch)
+            self.commit()
+            self.inc_stat("mysql/batches")
+            self.inc_stat("mysql/items_written", len(batch))
+            spider.logger.info(f"Lot de {len(batch)} items écrit en base.")
+        except Exception as e:
+            self.rollback(spider)
+            spider.logger.error(f"Échec du lot de {len(batch)} items ({e}), reprise item par item.")
+            self.inc_stat("mysql/batches_failed")
+            for entry in batch:
+                item = entry[0]
+                try:
+                    self.write_batch([entry])
+                    self.commit()
+                    self.inc_stat("mysql/items_written")
+                except Exception as item_error:
+                    self.rollback(spider)
+                    self.inc_stat("mysql/items_failed")
+                    spider.logger.error(
+                        f"Erreur d'écriture pour l'item {item.get('item_id')} "
+                        f"({item.get('title', '')}) : {item_error}"
+                    )
+
+    def write_batch(self, batch):
+        """
+        Écrit un lot sans commit : upsert des produits, récupération de leurs ids,
+        puis historique de prix, projection du dernier prix, agrégats et valeur de marché.
+        """
+        self.execute_rows("db/batch_upsert_product", self.upsert_product_sql, self.product_row, [
+            (
+                item.get("item_id", ""),
+                item.get("title", ""),
+                item.get("item_condition", ""),
+                item.get("normalized_condition", ""),
+                item.get("signed", False),
+                item.get("in_box"),
+                item.get("item_url", ""),
+                item.get("image_url", ""),
+                item.get("seller_username", ""),
+                item.get("category", ""),
+                item.get("listing_type", ""),
+                item.get("bids_count"),
+                item.get("time_remaining"),
+                item.get("buy_it_now_price"),
+                item.get("ended", False),
+                category_id,
+            )
+            for item, category_id in batch
+        ])
+
+        item_ids = list({item.get("item_id", "") for item, _category_id in batch})
+        placeholders = ", ".join(["%s"] * len(item_ids))
+        self.execute(
+            "db/batch_select_products",
+            f"SELECT item_id, product_id FROM product WHERE item_id IN ({placeholders})",
+            item_ids
+        )
+        product_ids = dict(self.cursor.fetchall())
+
+        price_rows = [
+            (
+                product_ids[item.get("item_id", "")],
+                item.get("price", 0),
+                item.get("buy_it_now_price"),
+                item.get("bids_count"),
+                item.get("time_remaining"),
+            )
+            for item, _category_id in batch
+        ]
+        self.execute_rows("db/batch_insert_price_history", self.insert_price_sql, self.price_row, price_rows)
+        self.execute_rows("db/batch_latest_price", self.upsert_latest_price_sql, self.latest_price_row, [
+            (product_id, price) for product_id, price, *_rest in price_rows
+        ])
+        with metrics.timer("db/batch_price_rollups"):
+            record_price_rollups(self.cursor, [
+                (product_id, price, bids_count, None) for product_id, price, _bin, bids_count, _time in price_rows
+            ])
+        with metrics.timer("db/batch_market_value"):
+            record_market_prices(self.cursor, [
+                market_observation(product_ids[item.get("item_id", "")], item) for item, _category_id in batch
+            ])
+        with metrics.timer("db/batch_invalidate_cache"):
+            invalidate_products(self.cursor, product_ids.values())
+
+    def execute_rows(self, stage, sql, row_template, rows):
+        """Exécute une requête multi-lignes (un seul aller-retour pour tout le lot)."""
+        values = ", ".join([row_template] * len(rows))
+        params = [value for row in rows for value in row]
+        self.execute(stage, sql.format(values=values), params)
+
+    def rollback(self, spider):
+        try:
+            self.conn.rollback()
+        except Exception as e:
+            spider.logger.error(f"Erreur lors du rollback : {e}")
+
+    def inc_stat(self, key, count=1):
+        if self.stats is not None:
+            self.stats.inc_value(key, count)
@@ -0,0 +1,490 @@
+# scrapers/reporters.py
+"""
+Console reporters for EbaySpider.
+
+The spider reports crawl events (start, pages, products, notices, closing
+summary) to a reporter instead of printing them itself:
+
+    demo        boxed, coloured terminal output (the original demo display)
+    production  structured key=value log lines: no ANSI codes, no width math,
+                per-product lines at DEBUG so they cost nothing at INFO
+
+Settings:
+    REPORTER    "demo", "production" or the dotted path of a Reporter class
+                (spider argument: -a reporter=...)
+"""
+
+import logging
+import re
+import sys
+import unicodedata
+from functools import lru_cache
+
+from scrapy.utils.misc import load_object
+
+logger = logging.getLogger(__name__)
+
+# ANSI codes for color
+RESET = "\033[38;2;241;241;242m"
+BOLD = "\033[1m"
+BLUE = "\033[38;2;21;149;235m"
+TURQUOISE = "\033[38;2;64;189;191m"
+GREEN = "\033[38;2;80;200;120m"
+RED = "\033[38;2;206;71;96m"
+YELLOW = "\033[38;2;255;204;0m"
+
+# Helper function to strip ANSI escape sequences for length calculation
+ANSI_ESCAPE_RE = re.compile(r'\x1B(?:[@-Z\\-_]|\[[0-?]*[ -/]*[@-~])')
+
+def strip_ansi(text):
+    """Strip ANSI sequences to get the visible length of text."""
+    return ANSI_ESCAPE_RE.sub('', text)
+
+# Helper function to get display width of text including emoji width
+@lru_cache(maxsize=4096)
+def display_width(text):
+    """
+    Calculate the display width of text accounting for wide characters like emojis.
+    Some characters like emojis take up 2 spaces in terminal displays.
+    Cached: section and summary lines repeat from page to page.
+    """
+    text = strip_ansi(text)
+    if text.isascii():
+        return len(text)
+    width = 0
+    for char in text:
+        # East Asian Width property: 'W' (Wide) or 'F' (Fullwidth) count as 2 display cells
+        # Also handle emoji characters which are not correctly categorized by east_asian_width
+        if unicodedata.east_asian_width(char) in ('W', 'F') or ord(char) > 0x1F000:
+            width += 2
+        else:
+            width += 1
+    return width
+
+def shorten_url(url, max_length=60):
+    """Return the shortened URL if it exceeds max_length characters."""
+    return url if len(url) <= max_length else url[:max_length] + "..."
+
+def shorten_text(text, max_length=45):
+    """Return the shortened text if it exceeds max_length characters."""
+    if not text:
+        return "N/A"
+    
+    # Strip ANSI codes for proper length calculation
+    plain_text = strip_ansi(text)
+    
+    if len(plain_text) <= max_length:
+        return text
+    else:
+        # Handle case where text has ANSI codes
+        if text != plain_text:
+            # Find position in original text corresponding to max_length in plain text
+            ansi_position = 0
+            plain_position = 0
+            for i, char in enumerate(text):
+                if plain_position >= max_length - 3:
+                    ansi_position = i
+                    break
+                if strip_ansi(char) != '':
+                    plain_position += 1
+                
+            return text[:ansi_position] + "..."
+        else:
+            return text[:max_length - 3] + "..."
+
+# Box drawing characters
+TOP_LEFT = "╔"
+TOP_RIGHT = "╗"
+BOTTOM_LEFT = "╚"
+BOTTOM_RIGHT = "╝"
+HORIZONTAL = "═"
+VERTICAL = "║"
+
+# Sub-box drawing characters
+SUB_TOP_LEFT = "┌"
+SUB_TOP_RIGHT = "┐"
+SUB_BOTTOM_LEFT = "└"
+SUB_BOTTOM_RIGHT = "┘"
+SUB_HORIZONTAL = "─"
+SUB_VERTICAL = "│"
+
+# Main header box (85 chars wide)
+def main_header_box(title):
+    width = 85
+    top_border = f"{BOLD}{BLUE}{TOP_LEFT}{HORIZONTAL * (width - 2)}{TOP_RIGHT}{RESET}"
+    title_line = f"{BOLD}{BLUE}{VERTICAL}{title.center(width - 2)}{VERTICAL}{RESET}"
+    bottom_border = f"{BOLD}{BLUE}{BOTTOM_LEFT}{HORIZONTAL * (width - 2)}{BOTTOM_RIGHT}{RESET}"
+    return f"{top_border}\n{title_line}\n{bottom_border}"
+
+# Sub header box (85 chars wide)
+def sub_header_box(title):
+    width = 85
+    top_border = f"{BOLD}{TURQUOISE}{SUB_TOP_LEFT}{SUB_HORIZONTAL * (width - 2)}{SUB_TOP_RIGHT}{RESET}"
+    title_line = f"{BOLD}{TURQUOISE}{SUB_VERTICAL}{title.center(width - 2)}{SUB_VERTICAL}{RESET}"
+    bottom_border = f"{BOLD}{TURQUOISE}{SUB_BOTTOM_LEFT}{SUB_HORIZONTAL * (width - 2)}{SUB_BOTTOM_RIGHT}{RESET}"
+    return f"{top_border}\n{title_line}\n{bottom_border}"
+
+# Alert box for notifications (85 chars wide)
+def alert_box(title, icon="⚠️", color=YELLOW):
+    width = 85
+    top_border = f"{BOLD}{color}{icon} {HORIZONTAL * (width - 4)} {icon}{RESET}"
+    content = f"{BOLD}{color}{title.center(width)}{RESET}"
+    bottom_border = f"{BOLD}{color}{icon} {HORIZONTAL * (width - 4)} {icon}{RESET}"
+    return f"{top_border}\n{content}\n{bottom_border}"
+
+# Fixed section box with precise width control
+def section_box(title, lines, width=80):
+    result = []
+    
+    # Add the title in the top border
+    if title:
+        title_with_spaces = f" {title} "
+        visible_len = len(strip_ansi(title_with_spaces))
+        padding = width - visible_len
+        if padding >= 0:
+            result.append(f"{TURQUOISE}{SUB_TOP_LEFT}{title_with_spaces}{SUB_HORIZONTAL * padding}{SUB_TOP_RIGHT}{RESET}")
+        else:
+            # Handle case where title is too long
+            shortened_title = f" {title[:width-5]}... "
+            result.append(f"{TURQUOISE}{SUB_TOP_LEFT}{shortened_title}{SUB_TOP_RIGHT}{RESET}")
+    else:
+        result.append(f"{TURQUOISE}{SUB_TOP_LEFT}{SUB_HORIZONTAL * width}{SUB_TOP_RIGHT}{RESET}")
+    
+    # Add content lines with proper padding, accounting for wide characters
+    for line in lines:
+        content = f"{RESET}{line}"
+        # Calculate display width including emoji width
+        content_display_width = display_width(content)
+        padding = width - content_display_width
+        
+        if padding >= 0:
+            result.append(f"{TURQUOISE}{SUB_VERTICAL}{content}{' ' * padding}{TURQUOISE}{SUB_VERTICAL}{RESET}")
+        else:
+            # Handle case where content is too long
+            # Simplified approach: just cut the line at a safe length
+            shortened_content = shorten_text(content, width - 5)
+            result.append(f"{TURQUOISE}{SUB_VERTICAL}{shortened_content}{' ' * 2}{TURQUOISE}{SUB_VERTICAL}{RESET}")
+    
+    # Add bottom border
+    result.append(f"{TURQUOISE}{SUB_BOTTOM_LEFT}{SUB_HORIZONTAL * width}{SUB_BOTTOM_RIGHT}{RESET}")
+    
+    return "\n".join(result)
+
+# Fixed product box for successful products
+def product_box(product_num, total, item):
+    # Hard-coded box dimensions
+    box_width = 85  # Total box width including borders
+    content_width = box_width - 2  # Content area width (excluding borders)
+    
+    # Prepare main product info
+    header = f"{GREEN}PRODUCT [{product_num:02}/{total}] ✅{RESET}"
+    
+    # Shorten title more aggressively to ensure it fits
+    max_title_length = 65  # Reduced from 70 to ensure it fits
+    display_title = shorten_text(item.get("title", "N/A"), max_title_length)
+    
+    price = item.get('price', 0)
+    price_str = f"${price:.2f}" if isinstance(price, float) else "N/A"
+    
+    # Start the box
+    lines = []
+    lines.append(f"{TURQUOISE}{SUB_TOP_LEFT}{SUB_HORIZONTAL * content_width}{SUB_TOP_RIGHT}{RESET}")
+    
+    # Add header with proper padding
+    header_visible_length = len(strip_ansi(f" {header}"))
+    header_padding = content_width - header_visible_length - 1
+    lines.append(f"{TURQUOISE}{SUB_VERTICAL}{RESET} {header}{' ' * max(0, header_padding)}{TURQUOISE}{SUB_VERTICAL}{RESET}")
+    
+    # Add title with proper padding
+    title_line = f"  Title      : {BOLD}{display_title}{RESET}"
+    title_visible_length = len(strip_ansi(title_line))
+    title_padding = content_width - title_visible_length - 1
+    lines.append(f"{TURQUOISE}{SUB_VERTICAL}{RESET} {title_line}{' ' * max(0, title_padding)}{TURQUOISE}{SUB_VERTICAL}{RESET}")
+    
+    # Add price with proper padding
+    price_line = f"  Price      : {BOLD}{price_str}{RESET}"
+    price_visible_length = len(strip_ansi(price_line))
+    price_padding = content_width - price_visible_length - 1
+    lines.append(f"{TURQUOISE}{SUB_VERTICAL}{RESET} {price_line}{' ' * max(0, price_padding)}{TURQUOISE}{SUB_VERTICAL}{RESET}")
+    
+    # Listing details separator line - Ensure it fits within the box
+    details_prefix = "  Listing Details "
+    details_visible_length = len(strip_ansi(details_prefix))
+    details_suffix_length = content_width - details_visible_length - 1
+    
+    details_line = f"{TURQUOISE}{details_prefix}{SUB_HORIZONTAL * max(0, details_suffix_length)}{RESET}"
+    lines.append(f"{TURQUOISE}{SUB_VERTICAL}{RESET} {details_line}{TURQUOISE}{SUB_VERTICAL}{RESET}")
+    
+    # Add basic details with proper padding
+    condition_text = f"  Condition  : {item.get('normalized_condition', 'N/A')}"
+    condition_visible_length = len(strip_ansi(condition_text))
+    condition_padding = content_width - condition_visible_length - 1
+    lines.append(f"{TURQUOISE}{SUB_VERTICAL}{RESET} {condition_text}{' ' * max(0, condition_padding)}{TURQUOISE}{SUB_VERTICAL}{RESET}")
+    
+    type_text = f"  Type       : {item.get('listing_type', 'N/A')}"
+    type_visible_length = len(strip_ansi(type_text))
+    type_padding = content_width - type_visible_length - 1
+    lines.append(f"{TURQUOISE}{SUB_VERTICAL}{RESET} {type_text}{' ' * max(0, type_padding)}{TURQUOISE}{SUB_VERTICAL}{RESET}")
+    
+    # Add seller username with proper padding (shortened more if needed)
+    seller_username = shorten_text(item.get('seller_username', 'N/A'), 45)  # Shortened from 50
+    seller_text = f"  Seller     : {seller_username}"
+    seller_visible_length = len(strip_ansi(seller_text))
+    seller_padding = content_width - seller_visible_length - 1
+    lines.append(f"{TURQUOISE}{SUB_VERTICAL}{RESET} {seller_text}{' ' * max(0, seller_padding)}{TURQUOISE}{SUB_VERTICAL}{RESET}")
+    
+    # Add item ID with proper padding (shortened more if needed)
+    item_id = shorten_text(item.get('item_id', 'N/A'), 45)  # Shortened from 50
+    item_id_text = f"  Item ID    : {item_id}"
+    item_id_visible_length = len(strip_ansi(item_id_text))
+    item_id_padding = content_width - item_id_visible_length - 1
+    lines.append(f"{TURQUOISE}{SUB_VERTICAL}{RESET} {item_id_text}{' ' * max(0, item_id_padding)}{TURQUOISE}{SUB_VERTICAL}{RESET}")
+    
+    # Add listing-specific details with proper padding
+    if item.get("listing_type") == "Auction":
+        bids_text = f"  Bids       : {item.get('bids_count', 0)}"
+        bids_visible_length = len(strip_ansi(bids_text))
+        bids_padding = content_width - bids_visible_length - 1
+        lines.append(f"{TURQUOISE}{SUB_VERTICAL}{RESET} {bids_text}{' ' * max(0, bids_padding)}{TURQUOISE}{SUB_VERTICAL}{RESET}")
+        
+        time_text = f"  Time Left  : {item.get('time_remaining', 'N/A')}"
+        time_visible_length = len(strip_ansi(time_text))
+        time_padding = content_width - time_visible_length - 1
+        lines.append(f"{TURQUOISE}{SUB_VERTICAL}{RESET} {time_text}{' ' * max(0, time_padding)}{TURQUOISE}{SUB_VERTICAL}{RESET}")
+    
+    elif item.get("listing_type") == "Auction + BIN":
+        bin_price = item.get('buy_it_now_price')
+        bin_price_str = f"${bin_price:.2f}" if isinstance(bin_price, float) else "N/A"
+        bin_text = f"  BIN Price  : {bin_price_str}"
+        bin_visible_length = len(strip_ansi(bin_text))
+        bin_padding = content_width - bin_visible_length - 1
+        lines.append(f"{TURQUOISE}{SUB_VERTICAL}{RESET} {bin_text}{' ' * max(0, bin_padding)}{TURQUOISE}{SUB_VERTICAL}{RESET}")
+        
+        bids_text = f"  Bids       : {item.get('bids_count', 0)}"
+        bids_visible_length = len(strip_ansi(bids_text))
+        bids_padding = content_width - bids_visible_length - 1
+        lines.append(f"{TURQUOISE}{SUB_VERTICAL}{RESET} {bids_text}{' ' * max(0, bids_padding)}{TURQUOISE}{SUB_VERTICAL}{RESET}")
+        
+        time_text = f"  Time Left  : {item.get('time_remaining', 'N/A')}"
+        time_visible_length = len(strip_ansi(time_text))
+        time_padding = content_width - time_visible_length - 1
+        lines.append(f"{TURQUOISE}{SUB_VERTICAL}{RESET} {time_text}{' ' * max(0, time_padding)}{TURQUOISE}{SUB_VERTICAL}{RESET}")
+    
+    # Close the box
+    lines.append(f"{TURQUOISE}{SUB_BOTTOM_LEFT}{SUB_HORIZONTAL * content_width}{SUB_BOTTOM_RIGHT}{RESET}")
+    
+    return "\n".join(lines)
+
+def create_progress_bar(value, total, width=40, char="█"):
+    """Create a visual progress bar."""
+    percent = value / total if total > 0 else 0
+    bar_width = int(width * percent)
+    return char * bar_width + " " * (width - bar_width)
+
+
+class Reporter:
+    """Reporter interface: every event is a no-op, subclasses render the ones they need."""
+
+    def crawl_started(self, spider):
+        pass
+
+    def page_started(self, page):
+        pass
+
+    def page_finished(self, page, elapsed, found, skipped):
+        pass
+
+    def product_scraped(self, number, total, item):
+        pass
+
+    def product_filtered(self, number, total, reason):
+        pass
+
+    def notice(self, level, message):
+        """Warning, note or error about one listing (level is a logging level)."""
+
+    def demo_limit_reached(self, limit):
+        pass
+
+    def crawl_finished(self, summary):
+        """summary: reason, attempted, processed, filtered, avoided, pages, elapsed, rate."""
+
+    def section(self, title, lines, banner=False):
+        """A block of the closing summary; banner titles it with a header instead of a box title."""
+
+    def condition_summary(self, new_count, used_count):
+        pass
+
+
+NOTICE_LABELS = {logging.WARNING: "WARNING", logging.INFO: "NOTE", logging.ERROR: "ERROR"}
+
+
+class DemoReporter(Reporter):
+    """Boxed, coloured terminal output, written and flushed once per event."""
+
+    def __init__(self, stream=None):
+        self.stream = stream
+
+    def emit(self, *blocks):
+        # Resolved on each write so that contextlib.redirect_stdout still applies
+        stream = self.stream or sys.stdout
+        stream.write("".join(f"{block}\n" for block in blocks))
+        stream.flush()
+
+    def crawl_started(self, spider):
+        others = f" (+{len(spider.keywords) - 1} more)" if len(spider.keywords) > 1 else ""
+        config = {
+            "Download Delay": 1.5,
+            "AutoThrottle Start Delay": 1.0,
+            "AutoThrottle Max Delay": 5.0,
+            "Proxy Rotation": "Enabled",
+            "User-Agent Rotation": "Enabled",
+            "Anti-blocking delays": "Enabled",
+            "Demo Mode": True
+        }
+        network_lines = [
+            f"  Download Delay       : {config['Download Delay']}s",
+            f"  Proxy Rotation       : {config['Proxy Rotation']}",
+            f"  User-Agent Rotation  : {config['User-Agent Rotation']}",
+            f"  Anti-blocking Delays : {config['Anti-blocking delays']}"
+        ]
+        throttle_lines = [
+            f"  AutoThrottle         : ON",
+            f"  Initial Delay        : {config['AutoThrottle Start Delay']}s",
+            f"  Maximum Delay        : {config['AutoThrottle Max Delay']}s"
+        ]
+        mode_lines = [
+            f"  Demo Mode            : {config['Demo Mode']}  ({spider.demo_limit} product limit)"
+        ]
+        self.emit(
+            main_header_box("PRICETRACKER"),
+            f"\n{BOLD}🔍 Keyword:{RESET} {spider.original_keyword}{others}\n",
+            main_header_box("CONFIGURATION"),
+            "\n" + section_box("Network Settings", network_lines),
+            "\n" + section_box("Throttle Control", throttle_lines),
+            "\n" + section_box("Mode", mode_lines),
+            "",
+            main_header_box("PRODUCT SCRAPING"),
+            "",
+        )
+
+    def page_started(self, page):
+        self.emit(sub_header_box(f"RETRIEVING PRODUCTS (Page {page})"))
+
+    def page_finished(self, page, elapsed, found, skipped):
+        page_summary_lines = [
+            f"  Page processed in {elapsed:.2f} seconds",
+            f"  Found {found} products on this page",
+            f"  Skipped {skipped} before the detail request"
+        ]
+        self.emit(section_box("Page Summary", page_summary_lines), "")
+
+    def product_scraped(self, number, total, item):
+        self.emit(product_box(number, total, item), "")
+
+    def product_filtered(self, number, total, reason):
+        self.emit(f"{RED}PRODUCT [{number:02}/{total}] ❌ FILTERED: {reason}{RESET}\n")
+
+    def notice(self, level, message):
+        self.emit(f"{BOLD}{RED}[{NOTICE_LABELS.get(level, 'NOTE')}] {message}{RESET}")
+
+    def demo_limit_reached(self, limit):
+        self.emit(
+            alert_box(f"DEMO LIMIT REACHED: {limit} PRODUCTS PROCESSED", "⚠️"),
+            alert_box("STOPPING THE SCRAPER", "🛑", RED),
+            "",
+        )
+
+    def crawl_finished(self, summary):
+        summary_lines = [
+            f"  Reason for closure       : {summary['reason']}",
+            f"  Total products attempted : {summary['attempted']}",
+            f"  Successfully processed   : {summary['processed']}",
+            f"  Filtered products        : {summary['filtered']}",
+            f"  Detail fetches avoided   : {summary['avoided']}",
+            f"  Total pages crawled      : {summary['pages']}",
+            f"  Execution time           : {summary['elapsed']:.2f} seconds",
+            f"  Processing rate          : {summary['rate']:.2f} products/min"
+        ]
+        self.emit(main_header_box("SCRAPING COMPLETED"), "\n" + section_box("Summary", summary_lines), "")
+
+    def section(self, title, lines, banner=False):
+        if banner:
+            self.emit(sub_header_box(title), section_box("", lines), "")
+        else:
+            self.emit(section_box(title, lines), "")
+
+    def condition_summary(self, new_count, used_count):
+        total = new_count + used_count
+        if total > 0:
+            new_bar = create_progress_bar(new_count, total, 40)
+            used_bar = create_progress_bar(used_count, total, 40)
+            condition_lines = [
+                f"  New  : {new_bar} {new_count} ({new_count / total * 100:.1f}%)",
+                f"  Used : {used_bar} {used_count} ({used_count / total * 100:.1f}%)"
+            ]
+        else:
+            condition_lines = [
+                f"  No condition stats available (no items processed)"
+            ]
+        self.section("CONDITION SUMMARY", condition_lines, banner=True)
+
+
+SPACES_RE = re.compile(r"\s+")
+
+
+class ProductionReporter(Reporter):
+    """
+    Structured log lines for headless runs. Arguments are passed to the logger
+    unformatted, so a disabled level costs one isEnabledFor check.
+    """
+
+    def __init__(self, log=None):
+        self.log = log or logger
+
+    def crawl_started(self, spider):
+        self.log.info("crawl started keyword=%r keywords=%d demo_limit=%d",
+                      spider.original_keyword, len(spider.keywords), spider.demo_limit)
+
+    def page_finished(self, page, elapsed, found, skipped):
+        self.log.info("page done page=%d found=%d skipped=%d elapsed=%.3f", page, found, skipped, elapsed)
+
+    def product_scraped(self, number, total, item):
+        self.log.debug("item scraped n=%d item_id=%s price=%s type=%r condition=%s",
+                       number, item.get("item_id"), item.get("price"), item.get("listing_type"),
+                       item.get("normalized_condition"))
+
+    def product_filtered(self, number, total, reason):
+        self.log.debug("item filtered n=%d reason=%r", number, reason)
+
+    def notice(self, level, message):
+        self.log.log(level, message)
+
+    def demo_limit_reached(self, limit):
+        self.log.info("demo limit reached limit=%d", limit)
+
+    def crawl_finished(self, summary):
+        self.log.info("crawl finished reason=%r attempted=%d processed=%d filtered=%d avoided=%d "
+                      "pages=%d elapsed=%.2f rate_per_min=%.2f",
+                      summary["reason"], summary["attempted"], summary["processed"], summary["filtered"],
+                      summary["avoided"], summary["pages"], summary["elapsed"], summary["rate"])
+
+    def section(self, title, lines, banner=False):
+        if self.log.isEnabledFor(logging.INFO):
+            self.log.info("%s: %s", title.lower(), "; ".join(SPACES_RE.sub(" ", line).strip() for line in lines))
+
+    def condition_summary(self, new_count, used_count):
+        self.log.info("conditions new=%d used=%d", new_count, used_count)
+
+
+REPORTERS = {
+    "demo": DemoReporter,
+    "production": ProductionReporter,
+}
+
+
+def make_reporter(name):
+    """Reporter instance for a REPORTER value: a registered name or a class path."""
+    name = name or "demo"
+    reporter_class = REPORTERS[name] if name in REPORTERS else load_object(name)
+    return reporter_class()
@@ -43,6 +43,16 @@ def dashboard(product_id):
     """
     cursor.execute(sql, (product_id,))
     rows = cursor.fetchall()
+
+    # Statistiques lues dans les agrégats hebdomadaires (une ligne par semaine)
+    # plutôt que recalculées sur tous les relevés bruts
+    cursor.execute("""
+        SELECT MIN(min_price), MAX(max_price), SUM(sum_price) / SUM(price_count)
+        FROM price_rollup_weekly
+        WHERE product_id = %s
+    """, (product_id,))
+    min_price, max_price, avg_price = (float(value) if value is not None else 0
+                                       for value in cursor.fetchone())
     cursor.close()
     conn.close()
     
@@ -50,14 +60,6 @@ def dashboard(product_id):
     dates = [row[0] for row in rows]
     prices = [float(row[1]) for row in rows]
     
-    # Calculer quelques statistiques (exemple : prix min, max, moyenne)
-    if prices:
-        min_price = min(prices)
-        max_price = max(prices)
-        avg_price = sum(prices) / len(prices)
-    else:
-        min_price = max_price = avg_price = 0
-    
     return render_template(
         'dashboard.html',
         product_id=product_id,
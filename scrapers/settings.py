@@ -30,15 +30,74 @@ RETRY_HTTP_CODES = [429, 500, 503]
 
 DOWNLOADER_MIDDLEWARES = {
     'core.middlewares.RandomUserAgentMiddleware': 400,
+    # Avant les proxies et le délai de politesse : un hit ne prend ni l'un ni l'autre
+    'core.http_cache_middleware.HttpCacheMiddleware': 580,
+    # Enregistrement d'archive pour le rejeu hors ligne (actif si REPLAY_RECORD_DIR est défini)
+    'core.replay.ArchiveRecorderMiddleware': 590,
     'scrapy.downloadermiddlewares.useragent.UserAgentMiddleware': None,
-    'core.random_delay_middleware.RandomDelayMiddleware': 500,
     'core.middlewares.ProxyMiddleware': 600, 
+    # Après ProxyMiddleware : le délai est tenu par slot (domaine + proxy)
+    'core.random_delay_middleware.RandomDelayMiddleware': 605,
     'core.captcha_middleware.CaptchaDetectionMiddleware': 610, 
 }
 
+# Délai aléatoire (non bloquant) entre deux requêtes d'un même slot
+RANDOM_DELAY_MIN = 2.0
+RANDOM_DELAY_MAX = 5.0
+
 
 PROXIES_FILE = 'webshare_proxies.txt'
 
+# Pool de proxies (core/middlewares.py) : choix pondéré par taux de succès et latence
+PROXY_POOL_MAX_IN_FLIGHT = 1          # requêtes simultanées par proxy avant d'en préférer un autre
+PROXY_POOL_FAILURE_THRESHOLD = 3      # échecs consécutifs avant quarantaine (un CAPTCHA suffit)
+PROXY_POOL_QUARANTINE_BASE = 60.0     # secondes, doublées à chaque quarantaine successive
+PROXY_POOL_QUARANTINE_MAX = 1800.0
+
+# Détection de CAPTCHA (core/captcha_middleware.py) : nouvel essai sur un autre proxy
+CAPTCHA_MAX_RETRIES = 3        # essais avant d'abandonner la requête
+CAPTCHA_BACKOFF_BASE = 30.0    # secondes avant le 1er essai, doublées ensuite
+CAPTCHA_BACKOFF_MAX = 300.0
+CAPTCHA_SCAN_BYTES = 32768     # octets du corps où chercher le <title>
+
+# Cache HTTP sur disque des pages de recherche et d'annonce (core/http_cache.py),
+# partagé avec refresh_products.py. Distinct du HTTPCACHE_* intégré à Scrapy.
+HTTP_CACHE_ENABLED = True
+HTTP_CACHE_DIR = '.httpcache'
+HTTP_CACHE_MAX_MB = 1024
+HTTP_CACHE_TTL = {          # secondes, par type de page
+    'search': 600,
+    'auction': 300,         # enchère en cours
+    'item': 6 * 3600,       # prix fixe en cours
+    'ended': 30 * 86400,    # annonce terminée
+}
+
+# Archive des réponses pour le rejeu hors ligne (core/replay.py), ex. :
+#   scrapy crawl ebay_spider -a keyword="..." -s REPLAY_RECORD_DIR=archives/doom
+REPLAY_RECORD_DIR = None
+
+# Préfiltre des résultats de recherche (scrapers/filters.py) : pas de requête de
+# détail pour les annonces que parse_item ou le pipeline écarteraient
+PREFILTER_ENABLED = True
+PREFILTER_RULES = ["error_page", "multi_figure", "bundle"]
+PREFILTER_DEDUPE = True          # item ids déjà demandés dans ce crawl
+PREFILTER_RECENT_HOURS = 6       # prix enregistré il y a moins de N heures (0 = désactivé)
+BUNDLE_KEYWORDS = ["lot", "bundle", "set"]
+
+# Instrumentation du crawl (core/metrics.py) : temps par étape, files, compteurs
+EXTENSIONS = {
+    'core.metrics_extension.MetricsExtension': 500,
+}
+SPIDER_MIDDLEWARES = {
+    # Au plus près du spider : mesure le temps passé dans parse / parse_item
+    'core.metrics_extension.CallbackTimingMiddleware': 950,
+}
+METRICS_ENABLED = True
+METRICS_INTERVAL = 5.0        # secondes entre deux relevés des files et statistiques
+METRICS_PORT = 0              # endpoint Prometheus (/metrics, /report) ; 0 = désactivé
+METRICS_HOST = '127.0.0.1'
+METRICS_REPORT_FILE = None    # rapport JSON écrit en fin de crawl, ex. 'metrics.json'
+
 AUTOTHROTTLE_ENABLED = True
 AUTOTHROTTLE_START_DELAY = 2.0
 AUTOTHROTTLE_MAX_DELAY = 10.0
@@ -47,9 +106,19 @@ AUTOTHROTTLE_TARGET_CONCURRENCY = 1.0
 
 LOG_LEVEL = "INFO"
 
+# Sortie console du spider (scrapers/reporters.py) : "production" (lignes de log
+# structurées) ou "demo" (boîtes colorées, voir demo_settings.py)
+REPORTER = "production"
+
 #ITEM_PIPELINES = {
  #   'scrapers.pipelines.MySQLPipeline': 300,
 #}
+# Variante par lots (une transaction par lot, requêtes multi-lignes) :
+#ITEM_PIPELINES = {
+ #   'scrapers.pipelines.MySQLBatchPipeline': 300,
+#}
+MYSQL_BATCH_SIZE = 100        # items par lot
+MYSQL_FLUSH_INTERVAL = 5.0    # secondes max avant l'écriture d'un lot incomplet
 
 # ---- Export FEEDS configuration to output a structured JSON file ----
 FEEDS = {